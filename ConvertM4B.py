@@ -1,22 +1,54 @@
+import logging
+import os
 import requests
+import threading
 import time
-from datetime import datetime, timedelta, time as time2
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List
 
 from audiobookshelfapi import api, Config
+from audiobookshelfapi.concurrency import AdaptiveConcurrency
+from audiobookshelfapi.conditional_get import ConditionalCache
+from audiobookshelfapi.disk_cache import DiskCache
+from audiobookshelfapi.encode_history import EncodeHistory, EncodePredictor, EncodeRecord
+from audiobookshelfapi.encode_journal import EncodeJournal, FINISHED
+from audiobookshelfapi.scheduler import EncodeScheduler, PinnedFirst, POLICIES
+from audiobookshelfapi.sync import LibrarySyncer
+from audiobookshelfapi.tracing import get_tracer
 import Objects as ob
 import json
 import audiobookshelfenums
+from audiobookshelfenums import SocketEvent
 
 #Settings
 NUM_BOOKS_TO_ENCODE = Config.Number_of_books_to_encode
-TIME_BETWEEN_CHECKS = Config.Time_between_checks
+MIN_BOOKS_TO_ENCODE = Config.MinBooksToEncode
+MAX_BOOKS_TO_ENCODE = Config.MaxBooksToEncode
+TIME_BETWEEN_CHECKS = Config.TIME_BETWEEN_CHECKS
+USE_SOCKET_EVENTS = Config.UseSocketEvents
+SOCKET_CHECK_INTERVAL = Config.SocketCheckInterval
 START_TIME = Config.StartTime
 END_TIME = Config.EndTime
+ENCODE_POLICY = Config.EncodePolicy
+PINNED_BOOKS = Config.PinnedBooks
+ENCODE_SPEED = Config.EncodeSpeed
+SERVERS = Config.Servers
+STATUS_INTERVAL = Config.StatusInterval
 
 
 IP = Config.URL
 APITOKEN = Config.APIToken
 LIBRARYNAME = Config.LibraryName
+CACHE_PATH = Config.CachePath
+ENCODE_HISTORY_PATH = Config.EncodeHistoryPath
+ENCODE_JOURNAL_PATH = Config.EncodeJournalPath
+TRACE_PATH = Config.TracePath
+TRACE_ENDPOINT = Config.TraceEndpoint
+
+# the number of most recent encodes the encode time model is fitted to
+HISTORY_RECORDS = 500
 
 # functions for time conversions
 def sec_to_time_str(seconds):
@@ -42,41 +74,174 @@ def sec_to_time_str(seconds):
     return time
 
 
-def is_hour_between(start_hour, end_hour, target_hour):
-    # Convert start_hour, end_hour, and target_hour to time objects
-    start_time = time2(start_hour, 0)
-    end_time = time2(end_hour, 0)
-    target_time = time2(target_hour, 0)
-
-    # If start time is before end time, check if target time is between them
-    if start_time <= end_time:
-        return start_time <= target_time <= end_time
-    # If start time is after end time, check if target time is not between them
-    else:
-        return not (end_time < target_time < start_time)
-
-
-def time_to_seconds(t):
-    return t.hour * 3600 + t.minute * 60 + t.second
-
-
-def seconds_between_now_and_start(start_hour):
-    # Get current time
-    current_time = datetime.now().time()
-
-    # Convert start_hour to a time object
-    start_time = time2(start_hour, 0)
-
-    # Convert current time and start time to seconds
-    current_seconds = time_to_seconds(current_time)
-    start_seconds = time_to_seconds(start_time)
-
-    # Calculate the difference
-    if current_seconds <= start_seconds:
-        return start_seconds - current_seconds
-    else:
-        # If start time is after current time, calculate the remaining seconds until the start time of the next day
-        return (24 * 3600 - current_seconds) + start_seconds
+# a server to encode on, the libraries on it to encode, and its own time window and bounds of concurrent encodes
+@dataclass
+class EncodeServer:
+    name: str
+    url: str
+    api_token: str
+    libraries: List[str]
+    start_time: int = START_TIME
+    end_time: int = END_TIME
+    books_to_encode: int = NUM_BOOKS_TO_ENCODE
+    min_books_to_encode: int = MIN_BOOKS_TO_ENCODE
+    max_books_to_encode: int = MAX_BOOKS_TO_ENCODE
+
+
+# the servers in Config.Servers, or the single URL and LibraryName if there are none
+def load_servers():
+    if not SERVERS:
+        return [EncodeServer('', IP, APITOKEN, [LIBRARYNAME])]
+    servers = []
+    for i, server in enumerate(SERVERS):
+        try:
+            servers.append(EncodeServer(server.get('Name') or f"server{i + 1}", server['URL'], server['APIToken'],
+                                        server['Libraries'], server.get('StartTime', START_TIME),
+                                        server.get('EndTime', END_TIME),
+                                        server.get('BooksToEncode', NUM_BOOKS_TO_ENCODE),
+                                        server.get('MinBooksToEncode', MIN_BOOKS_TO_ENCODE),
+                                        server.get('MaxBooksToEncode', MAX_BOOKS_TO_ENCODE)))
+        except KeyError as e:
+            raise Exception(f"Server {i + 1} in Config.Servers is missing {e}")
+    names = [server.name for server in servers]
+    if len(set(names)) != len(names):
+        raise Exception(f"Server names in Config.Servers must be unique, got {', '.join(names)}")
+    return servers
+
+
+# the file of a server's cache, history or journal, the one in Config with the server's name before the extension
+def server_path(path, server):
+    if not path or not server.name:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{server.name}{ext}"
+
+
+# the books that still need encoding, the multitrack ones. The syncers only download the books updated since the
+# last poll, and encoded books come back updated with a single audio file
+def get_multitrack_books(syncers):
+    books = []
+    for syncer in syncers:
+        syncer.sync()
+        books.extend(book for book in syncer.items.values() if book.media.numAudioFiles > 1)
+    return books
+
+
+# the scheduler picking the books to encode, as set in Config, with their encode times estimated by predictor
+def make_scheduler(predictor, concurrency, start_time=START_TIME, end_time=END_TIME):
+    if ENCODE_POLICY not in POLICIES:
+        raise Exception(f"Unknown encode policy {ENCODE_POLICY}, expected one of {', '.join(POLICIES)}")
+    policy = POLICIES[ENCODE_POLICY]()
+    if PINNED_BOOKS:
+        policy = PinnedFirst(PINNED_BOOKS, policy)
+    return EncodeScheduler(concurrency.slots, policy, start_time, end_time,
+                           estimate=lambda book: predictor.predict(book, concurrency.slots))
+
+
+# estimated seconds until every multitrack book is encoded, the waiting books and what is left of the running ones,
+# spread over the concurrent encodes
+def library_eta(predictor, waiting_books, encoding_books_time, slots):
+    now = datetime.now()
+    seconds = sum(predictor.predict(book, slots) for book in waiting_books)
+    seconds += sum(max(0.0, predictor.predict(book, slots) - (now - start).total_seconds())
+                   for book, start in encoding_books_time)
+    return seconds / max(1, slots)
+
+
+# the full library item has the codec and bit rate of the audio files for the history, the minified one does not
+def history_item(a, book, history):
+    if history is None:
+        return book
+    try:
+        return a.get_library_item(book.id)
+    except Exception:
+        return book
+
+
+# an encode job as a span, from its request until the book is single track or the encode fails. The job spans
+# outlive the loop iterations, so they are started without becoming the current span
+def start_encode_span(tracer, book, started, server, concurrent, resumed=False):
+    return tracer.start_span('encode_m4b', {
+        'abs.item_id': book.id,
+        'abs.library_id': book.libraryId,
+        'abs.title': book.media.metadata.title,
+        'abs.duration': book.media.duration,
+        'abs.num_audio_files': book.media.numAudioFiles,
+        'abs.server': server.name or None,
+        'abs.concurrent': concurrent,
+        'abs.resumed': resumed,
+    }, start_time=int(started.timestamp() * 1e9))
+
+
+def end_encode_span(tracer, span, elapsed, error=None):
+    if span is None:
+        return
+    span.set_attribute('abs.encode_seconds', elapsed)
+    if error is not None:
+        tracer.set_error(span, error)
+    span.end(int(datetime.now().timestamp() * 1e9))
+
+
+# the IDs of the library items the server is encoding, None if it cannot tell
+def running_encode_ids(a):
+    try:
+        tasks = a.get_tasks()
+    except Exception as e:
+        print(f"Could not get the server's tasks, waiting for every encode left running: {e}")
+        return None
+    return {task['data']['libraryItemId'] for task in tasks
+            if task.get('action') == 'encode-m4b' and not task.get('isFinished')}
+
+
+class ServerStatus:
+    # the progress of the encodes on one server, a line of the status view of every server. Messages are printed as
+    # they come, prefixed with the server's name, instead of rewriting the progress line
+    print_lock = threading.Lock()
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.state = 'starting'
+        # multitrack books by library name
+        self.libraries = {}
+        self.total_books = 0
+        self.converted = 0
+        self.slots = 0
+        # (title, seconds encoding) of the books encoding
+        self.encoding = []
+        self.eta = None
+
+    def print(self, message):
+        message = message.replace('\r\033[K', '').strip('\n')
+        if message:
+            # whole lines, the servers' threads print at the same time
+            with ServerStatus.print_lock:
+                print(f"[{self.name}] {message}")
+
+    def update(self, **fields):
+        with self.lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def line(self):
+        with self.lock:
+            libraries = ', '.join(f"{name} {count}" for name, count in self.libraries.items())
+            encoding = ', '.join(f"{title} {sec_to_time_str(seconds)}" for title, seconds in self.encoding)
+            eta = f", ETA {sec_to_time_str(int(self.eta))}" if self.eta is not None else ""
+            return (f"{self.name}: {self.state}, multitrack {libraries or 0} of {self.total_books} books,"
+                    f" {self.converted} converted, {len(self.encoding)}/{self.slots} encoding{eta}"
+                    + (f" ({encoding})" if encoding else ""))
+
+
+# the status of every server, and the totals over all of them
+def status_view(statuses):
+    multitrack = sum(sum(status.libraries.values()) for status in statuses)
+    encoding = sum(len(status.encoding) for status in statuses)
+    converted = sum(status.converted for status in statuses)
+    lines = [f"\n===== {datetime.now():%Y-%m-%d %H:%M:%S} {len(statuses)} servers, {multitrack} multitrack books,"
+             f" {encoding} encoding, {converted} converted ====="]
+    lines += [status.line() for status in statuses]
+    return '\n'.join(lines)
 
 
 # conditions for when a book is no longer encoding
@@ -84,88 +249,293 @@ def can_encode(lib_item):
     return (not lib_item.isMissing) and (not lib_item.isInvalid) and lib_item.media.numAudioFiles > 1
 
 
-def encode_books(a, lib):
-    # Get the initial count of multitrack books
-    books = a.get_all_library_items(lib.id)
-    # Remove any books that are not multitrack
-    books = [book for book in books if book.media.numAudioFiles > 1]
+class EncodeWatcher:
+    # collects the encodes the server reports finished over the socket, and wakes the encode loop on each one
+    def __init__(self):
+        self.wake = threading.Event()
+        # whether each encode reported finished failed, by library item ID. Written on the event stream's threads
+        self.finished = {}
+        self._lock = threading.Lock()
+        self.events = None
+
+    # subscribes to the event stream of the api, which closes it
+    def connect(self, a):
+        try:
+            self.events = a.events()
+            self.events.on(SocketEvent.TASK_FINISHED, self._on_task_finished)
+        except Exception as e:
+            print(f"Socket events unavailable, checking every {TIME_BETWEEN_CHECKS} seconds: {e}")
+            self.events = None
+
+    def _on_task_finished(self, task):
+        if task.get('action') != 'encode-m4b':
+            return
+        with self._lock:
+            self.finished[task['data']['libraryItemId']] = task.get('isFailed', False)
+        self.wake.set()
+
+    # a copy of the encodes reported finished, safe to read while events keep arriving
+    def finished_encodes(self):
+        with self._lock:
+            return dict(self.finished)
+
+    # waits until an encode finishes or it is time to check anyway. Polling stays at TIME_BETWEEN_CHECKS while the
+    # socket is down, the client reconnects in the background
+    def wait(self):
+        connected = self.events is not None and self.events.connected
+        self.wake.wait(SOCKET_CHECK_INTERVAL if connected else TIME_BETWEEN_CHECKS)
+        self.wake.clear()
+
+
+# encodes the multitrack books of one or more libraries of a server, the concurrent encodes shared between them.
+# With a status, progress goes to it instead of the progress line
+def encode_books(a, lib, disk_cache=None, watcher=None, scheduler=None, concurrency=None, history=None,
+                 journal=None, server=None, status=None):
+    libs = lib if isinstance(lib, list) else [lib]
+    server = server or EncodeServer('', IP, APITOKEN, [library.name for library in libs])
+    out = print if status is None else status.print
+    # without socket events, every check waits the full TIME_BETWEEN_CHECKS
+    watcher = watcher or EncodeWatcher()
+    # the number of books encoded at the same time, adjusted to the throughput of the finished encodes
+    concurrency = concurrency or AdaptiveConcurrency(server.books_to_encode, server.min_books_to_encode,
+                                                     server.max_books_to_encode)
+    # encode times are estimated from the history of encodes, once there is enough of it
+    predictor = EncodePredictor(fallback_speed=ENCODE_SPEED)
+    if history is not None:
+        predictor.fit(history.records(limit=HISTORY_RECORDS))
+    scheduler = scheduler or make_scheduler(predictor, concurrency, server.start_time, server.end_time)
+    scheduler.slots = concurrency.slots
+    library_names = {library.id: library.name for library in libs}
+
+    # Get the initial count of multitrack books, starting from the cached libraries if there are any
+    syncers = [LibrarySyncer(a, library.id, minified=True, lazy=True, cache=disk_cache) for library in libs]
+    books = get_multitrack_books(syncers)
 
     converted_ids = []
     encoding_books_time = []
-
-    while len(books) > 0:
+    # the library item and the number of encodes running when each encode started, for the history
+    started_items = {}
+    # the span of each encode job, if the client traces
+    tracer = a.tracer
+    encode_spans = {}
+
+    # the encodes a previous run left running on the server are waited for, not requested again
+    if journal is not None:
+        for entry in journal.reconcile(running_encode_ids(a), {book.id for book in books}):
+            book = next(book for book in books if book.id == entry.libraryItemId)
+            encoding_books_time.append((book, datetime.fromtimestamp(entry.startedAt)))
+            out(f'Resuming encode of {book.media.metadata.title}, started at {encoding_books_time[-1][1]}')
+            converted_ids.append(book.id)
+            started_items[book.id] = (history_item(a, book, history), entry.concurrent or len(encoding_books_time))
+            if tracer is not None:
+                encode_spans[book.id] = start_encode_span(tracer, book, encoding_books_time[-1][1], server,
+                                                          started_items[book.id][1], resumed=True)
+
+    while len(books) > 0 or len(encoding_books_time) > 0:
         # if outside of time to update books then wait
-        if not is_hour_between(START_TIME, END_TIME, datetime.now().hour):
-            sleep_time = seconds_between_now_and_start(START_TIME)
-            print(f"\nSleeping until {START_TIME}, {sleep_time} seconds")
+        sleep_time = scheduler.seconds_until_window()
+        if sleep_time > 0:
+            out(f"\nSleeping until {scheduler.start_hour}, {int(sleep_time)} seconds")
+            if status is not None:
+                status.update(state=f"sleeping until {scheduler.start_hour}:00")
             time.sleep(sleep_time)
 
-        print("\n-----------------------------------------------------------------------------")
-        # get the list books that are multitrack and sort them by duration
-        books = a.get_all_library_items(lib.id)
-        total_books = len(books)
-        books = [book for book in books if book.media.numAudioFiles > 1 and book.id not in converted_ids]
-        books.sort(key=lambda x: x.media.duration)
-
-        # print status of the library
-        print(f"Total Books: {total_books}, Multitrack books: {str(len(books))},"
-              f" Books converted: {str(len(converted_ids))}")
-
-        # Fill the encoding_books list until full or there are no books left
-        while len(books) > 0 and len(encoding_books_time) < NUM_BOOKS_TO_ENCODE:
-            new_multitrack_book = books.pop(0)
+        # get the list books that are multitrack, and the number of books in the libraries
+        books = get_multitrack_books(syncers)
+        total_books = sum(len(syncer.items) for syncer in syncers)
+        books = [book for book in books if book.id not in converted_ids]
+
+        # print status of the libraries
+        if status is not None:
+            counts = Counter(library_names.get(book.libraryId) for book in books)
+            status.update(state='encoding', total_books=total_books, converted=len(converted_ids),
+                          slots=scheduler.slots, libraries={name: counts[name] for name in library_names.values()})
+        else:
+            print("\n-----------------------------------------------------------------------------")
+            print(f"Total Books: {total_books}, Multitrack books: {str(len(books))},"
+                  f" Books converted: {str(len(converted_ids))}"
+                  + (f", Encoded over all runs: {journal.count(FINISHED)}" if journal is not None else ""))
+
+        # Fill the free slots with the books the scheduler picks, those expected to finish before END_TIME
+        for new_multitrack_book in scheduler.pick(books, len(encoding_books_time)):
             encoding_books_time.append((new_multitrack_book, datetime.now()))
-            print(f'Starting encode of {new_multitrack_book.media.metadata['title']},'
+            out(f'Starting encode of {new_multitrack_book.media.metadata.title},'
                   f' Duration: {str(timedelta(seconds=new_multitrack_book.media.duration))} at {datetime.now()}')
-            a.post_encode_m4b(new_multitrack_book.id)
+            # journaled before the request, so a crash in between is settled against the server on restart
+            if journal is not None:
+                journal.submitting(new_multitrack_book.id, len(encoding_books_time))
+            if tracer is not None:
+                # the request is a child of the job's span
+                span = encode_spans[new_multitrack_book.id] = start_encode_span(
+                    tracer, new_multitrack_book, encoding_books_time[-1][1], server, len(encoding_books_time))
+                with tracer.use_span(span):
+                    a.post_encode_m4b(new_multitrack_book.id)
+            else:
+                a.post_encode_m4b(new_multitrack_book.id)
+            if journal is not None:
+                journal.started(new_multitrack_book.id)
+            concurrency.started(new_multitrack_book.id)
             converted_ids.append(new_multitrack_book.id)
-
-        while len(encoding_books_time) == NUM_BOOKS_TO_ENCODE:
-            # Wait between checking on the books
-            time.sleep(TIME_BETWEEN_CHECKS)
-
-            # update the list of books
-            server_books = a.get_all_library_items(lib.id)
-            multitrack_books_ids = [book.id for book in server_books if book.media.numAudioFiles > 1]
+            started_items[new_multitrack_book.id] = (history_item(a, new_multitrack_book, history),
+                                                     len(encoding_books_time))
+
+        # nothing is encoding and no book fits in what is left of the window, so wait for the next one
+        if len(encoding_books_time) == 0:
+            if len(books) > 0:
+                sleep_time = scheduler.seconds_until_next_window()
+                out(f"\nNo book fits before {scheduler.end_hour}, sleeping until {scheduler.start_hour},"
+                    f" {int(sleep_time)} seconds")
+                if status is not None:
+                    status.update(state=f"sleeping until {scheduler.start_hour}:00")
+                time.sleep(sleep_time)
+            continue
+
+        # wait until an encode finishes, then fill its slot
+        num_encoding = len(encoding_books_time)
+        while len(encoding_books_time) == num_encoding:
+            # Wait for an encode to finish, or between checking on the books
+            watcher.wait()
+
+            # update the list of books. A book reported finished over the socket is done even if the server has
+            # not rescanned its files yet
+            server_books = get_multitrack_books(syncers)
+            finished = watcher.finished_encodes()
+            multitrack_books_ids = {book.id for book in server_books} - finished.keys()
 
             # check if each book being encoded is not in the list of multitrack books
             completed_book_time = []
             progress_str = '\r\033[KCurrent Books Encoding'
             for i, book_time in enumerate(encoding_books_time):
                 time_elapsed = (datetime.now() - book_time[1]).seconds
-                if book_time[0].id not in multitrack_books_ids:
-                    print(f"\r\033[KSuccessfully encoded! Book: {book_time[0].media.metadata['title']},"
-                          f" Time encoding: {sec_to_time_str(time_elapsed)}", end="\n")
+                if finished.get(book_time[0].id):
+                    out(f"\r\033[KEncode failed! Book: {book_time[0].media.metadata.title},"
+                          f" Time encoding: {sec_to_time_str(time_elapsed)}")
+                    concurrency.failed(book_time[0].id)
+                    started_items.pop(book_time[0].id, None)
+                    if journal is not None:
+                        journal.failed(book_time[0].id)
+                    end_encode_span(tracer, encode_spans.pop(book_time[0].id, None),
+                                    (datetime.now() - book_time[1]).total_seconds(), error='encode failed')
+                elif book_time[0].id not in multitrack_books_ids:
+                    out(f"\r\033[KSuccessfully encoded! Book: {book_time[0].media.metadata.title},"
+                          f" Time encoding: {sec_to_time_str(time_elapsed)}")
+                    elapsed = (datetime.now() - book_time[1]).total_seconds()
+                    concurrency.finished(book_time[0].id, book_time[0].media.duration, elapsed)
+                    scheduler.slots = concurrency.slots
+                    item, concurrent = started_items.pop(book_time[0].id)
+                    if journal is not None:
+                        journal.finished(book_time[0].id)
+                    end_encode_span(tracer, encode_spans.pop(book_time[0].id, None), elapsed)
+                    if history is not None:
+                        history.add(EncodeRecord.from_book(item, concurrent, elapsed))
+                        predictor.fit(history.records(limit=HISTORY_RECORDS))
                 else:
-                    progress_str += (f", Book: {book_time[0].media.metadata['title']},"
+                    progress_str += (f", Book: {book_time[0].media.metadata.title},"
                                      f" Time encoding: {sec_to_time_str(time_elapsed)}")
 
             # remove books that have been converted
             encoding_books_time = [book_time for book_time in encoding_books_time if book_time[0].id in multitrack_books_ids]
 
-            # print the updated if there are any books being updated
+            # print the updated if there are any books being updated, and how long the rest of the library takes
             if len(progress_str) > 30:
-                print(progress_str, end='')
-
+                waiting_books = [book for book in server_books if book.id not in converted_ids]
+                eta = library_eta(predictor, waiting_books, encoding_books_time, scheduler.slots)
+                if status is not None:
+                    status.update(eta=eta, slots=scheduler.slots, encoding=[
+                        (book.media.metadata.title, (datetime.now() - start).seconds)
+                        for book, start in encoding_books_time])
+                else:
+                    print(f"{progress_str}, Library ETA: {sec_to_time_str(int(eta))}", end='')
+
+    if status is not None:
+        status.update(state='done', encoding=[], eta=None)
+
+
+def find_library(a, name=LIBRARYNAME, cached=True):
+    for lib in a.get_all_libraries(cached=cached):
+        if lib.name == name:
+            return lib
+    return None
+
+
+# encodes the libraries of one server, through one client, and so one connection pool and socket, shared by them
+def run_server(server, status=None):
+    out = print if status is None else status.print
+    # the cache of the libraries from the last run, if enabled
+    disk_cache = DiskCache(server_path(CACHE_PATH, server), server.url) if CACHE_PATH else None
+    # the encodes of every run, to estimate encode times from
+    history = EncodeHistory(server_path(ENCODE_HISTORY_PATH, server)) if ENCODE_HISTORY_PATH else None
+    # the encodes requested, to resume those still running after a restart
+    journal = EncodeJournal(server_path(ENCODE_JOURNAL_PATH, server)) if ENCODE_JOURNAL_PATH else None
+    # the spans of the API calls and encode jobs, if tracing is enabled
+    tracer = get_tracer(server_path(TRACE_PATH, server), TRACE_ENDPOINT, 'audiobookshelf-encoder')
+
+    # initialize the api, the connections are closed when the with block exits
+    try:
+        # unchanged responses to the polls are answered 304 Not Modified and not decoded again
+        with api.AudiobookshelfAPI(server.url, server.api_token, disk_cache=disk_cache,
+                                   conditional_cache=ConditionalCache(), tracer=tracer) as a:
+            # get the libraries, from the server if they are not cached yet
+            libraries = []
+            for name in server.libraries:
+                library = find_library(a, name)
+                if library is None and disk_cache is not None:
+                    library = find_library(a, name, cached=False)
+                if library is None:
+                    out(f"No Library found with name: {name}")
+                    continue
+                out('lib id: ' + library.id)
+                libraries.append(library)
+            if not libraries:
+                if status is not None:
+                    status.update(state='no library found')
+                return
+
+            # finished encodes are pushed over the socket, if it connects
+            watcher = EncodeWatcher()
+            if USE_SOCKET_EVENTS:
+                watcher.connect(a)
+            encode_books(a, libraries, disk_cache, watcher, history=history, journal=journal, server=server,
+                         status=status)
+    except Exception as e:
+        if status is not None:
+            status.update(state=f"failed: {e}", encoding=[], eta=None)
+        raise
+    finally:
+        if disk_cache is not None:
+            disk_cache.close()
+        if history is not None:
+            history.close()
+        if journal is not None:
+            journal.close()
+        if tracer is not None:
+            tracer.close()
+
+
+# encodes on every server at once, a thread each, printing the status of all of them every STATUS_INTERVAL seconds
+def run_servers(servers):
+    statuses = [ServerStatus(server.name) for server in servers]
+    threads = [threading.Thread(target=run_server, args=(server, status), name=server.name, daemon=True)
+               for server, status in zip(servers, statuses)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        deadline = time.time() + STATUS_INTERVAL
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.time()))
+        with ServerStatus.print_lock:
+            print(status_view(statuses))
 
 
 def main():
-
-    # initialize the api
-    a = api.AudiobookshelfAPI(IP, APITOKEN)
-    library = None
-
-    # get larry's library
-    for lib in a.get_all_libraries():
-        if lib.name == LIBRARYNAME:
-            library = lib
-            print('lib id: ' + library.id)
-
-    if library is None:
-        print("No Library found with name: ", LIBRARYNAME)
-        exit()
-
-    encode_books(a, library)
+    servers = load_servers()
+    # the decisions on the number of concurrent encodes are logged, with the server they were made for
+    log_format = '%(asctime)s %(message)s' if len(servers) == 1 else '%(asctime)s [%(threadName)s] %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_format)
+    if len(servers) == 1:
+        run_server(servers[0])
+    else:
+        run_servers(servers)
 
 
 if __name__ == "__main__":
@@ -1,66 +1,274 @@
+import sys
 import typing
 from dataclasses import dataclass, asdict, fields
 from typing import Optional, List, Union, Type
 
 __all__ = ['AudioFile', 'AudioMetaTags', 'AudioTrack', 'Author', 'AuthorExpanded', 'AuthorMinified', 'Book',
-           'BookExpanded', 'BookMinified', 'BookMetadata', 'BookMetadataExpanded', 'BookMetadataMinified', 'Collection',
-           'CollectionExpanded', 'EBookFile', 'FileMetadata', 'Folder', 'Library', 'LibraryFile', 'LibraryFilterData',
-           'LibraryItem', 'LibraryItemExpanded', 'LibraryItemMinified', 'LibrarySettings', 'Playlist', 'PlaylistExpanded', 'PlaylistItem', 'PlaylistItemExpanded', 'Podcast', 'PodcastExpanded', 'PodcastMinified', 'PodcastEpisode',
+           'BookExpanded', 'BookMinified', 'BookChapter', 'BookMetadata', 'BookMetadataExpanded',
+           'BookMetadataMinified', 'Collection', 'CollectionExpanded', 'EBookFile', 'FileMetadata', 'Folder', 'Library',
+           'LibraryFile', 'LibraryFilterData', 'LibraryItem', 'LibraryItemExpanded', 'LibraryItemMinified',
+           'LibraryItemsPage', 'LibrarySettings', 'Playlist', 'PlaylistExpanded', 'PlaylistItem',
+           'PlaylistItemExpanded', 'Podcast', 'PodcastExpanded', 'PodcastMinified', 'PodcastEpisode',
            'PodcastEpisodeExpanded', 'PodcastEpisodeDownload', 'PodcastEpisodeEnclosure', 'PodcastMetadata',
            'PodcastMetadataExpanded', 'PodcastMetadataMinified', 'Series', 'SeriesBooks', 'SeriesNumBooks',
            'SeriesSequence']
 
 
+# decoders generated by _compile_decoder, keyed by class
+_decoders = {}
+
+# globals of the generated decoders, holds decode_<class name> and cls_<class name> for every model class so the
+# decoders can call each other
+_decoder_namespace = {}
+
+# lazy decoders generated by _compile_lazy_decoder, keyed by class, and the globals of their field converters
+_lazy_decoders = {}
+_lazy_decoder_namespace = {}
+
+
+def _unwrap_type(tp):
+    # Type['X'] annotations resolve to Type[X], the field holds an X
+    if typing.get_origin(tp) is type:
+        return typing.get_args(tp)[0]
+    return tp
+
+
+def _union_members(tp):
+    """
+    Returns the classes of a Union annotation other than None, or an empty list if tp is not a Union.
+    """
+    if typing.get_origin(tp) is not Union:
+        return []
+    return [_unwrap_type(arg) for arg in typing.get_args(tp) if arg is not type(None)]
+
+
+def _field_decoder_source(tp, var, depth=0):
+    """
+    Builds the source of an expression that converts var, a raw JSON value, to the type annotated by tp.
+
+    Args:
+        tp: The resolved annotation of the field.
+        var (str): The name of the variable holding the raw value, which is not None.
+        depth (int): How deeply nested in lists the expression is, used to name the loop variables.
+
+    Returns:
+        str or None: The expression, or None if the raw value is used as is.
+    """
+    tp = _unwrap_type(tp)
+    if isinstance(tp, type) and issubclass(tp, Base):
+        return f'decode_{tp.__name__}({var})'
+    if typing.get_origin(tp) is list:
+        item = f'i{depth}'
+        source = _field_decoder_source(typing.get_args(tp)[0], item, depth + 1)
+        return None if source is None else f'[{source} for {item} in {var}]'
+    members = _union_members(tp)
+    if len(members) == 1:
+        # Optional[X]
+        return _field_decoder_source(members[0], var, depth)
+    return None
+
+
+def _field_source(cls, field_name, hints, var, namespace):
+    """
+    Builds the source of an expression that converts var, the raw value of a field of cls, or None if the raw
+    value is used as is. Union selectors the expression calls are added to namespace.
+    """
+    if field_name in cls._union_selectors:
+        selector = f'select_{cls.__name__}_{field_name}'
+        namespace[selector] = cls._union_selectors[field_name]
+        decoders = ', '.join(f'decode_{member.__name__}' for member in _union_members(hints[field_name]))
+        return f'({decoders},)[{selector}(data)]({var})'
+    return _field_decoder_source(hints[field_name], var)
+
+
+def _compile_decoder(cls, namespace):
+    """
+    Generates the function that builds an instance of cls, and every nested model object, from a dictionary.
+
+    The annotations are resolved here, once, and each field's conversion is baked into the generated source:
+    nested classes are decoded by their own generated decoders, lists element by element, Optional fields only
+    when not None, and Unions with the member picked by the class's `_union_selectors`.
+
+    The instance is created without calling __init__ and its fields are set one by one in declaration order, keys
+    missing from the dictionary set to None. Set that way, the attributes of a plain dataclass stay in the
+    instance's compact value array rather than a dictionary of their own, so a decoded tree allocates fewer
+    objects for the garbage collector to track, which is most of the cost of decoding a large listing.
+
+    Args:
+        cls (Type[Base]): The dataclass to generate a decoder for.
+        namespace (dict): The globals of the generated decoder. It must end up holding decode_<class name> for
+            every class nested in cls.
+
+    Returns:
+        Callable[[dict], Base]: The decoder function.
+    """
+    name = cls.__name__
+    hints = typing.get_type_hints(cls)
+    lines = [f"def decode_{name}(data):",
+             "    get = data.get",
+             f"    obj = new(cls_{name})"]
+    for index, field in enumerate(fields(cls)):
+        var = f'f{index}'
+        source = _field_source(cls, field.name, hints, var, namespace)
+        if source is None:
+            lines.append(f"    obj.{field.name} = get({field.name!r})")
+        else:
+            lines += [f"    {var} = get({field.name!r})",
+                      f"    obj.{field.name} = None if {var} is None else {source}"]
+    lines.append("    return obj")
+
+    namespace['new'] = object.__new__
+    namespace[f'cls_{name}'] = cls
+    exec('\n'.join(lines), namespace)
+    return namespace[f'decode_{name}']
+
+
+def _compile_decoders(classes, namespace):
+    """
+    Compiles the decoders of every class into one shared namespace.
+    """
+    return {cls: _compile_decoder(cls, namespace) for cls in classes}
+
+
+def _lazy_getattr(self, name):
+    # only called for attributes not set yet, decodes the field from the raw dictionary and caches it
+    converter = self._lazy_converters.get(name)
+    if converter is None:
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+    value = self.__dict__[name] = converter(self._raw)
+    return value
+
+
+def _lazy_eq(self, other):
+    # equal to an instance of the same class, lazy or not, with the same fields, materializing them to compare
+    base = type(self).__bases__[0]
+    if not isinstance(other, base):
+        return NotImplemented
+    return all(getattr(self, field.name) == getattr(other, field.name) for field in fields(base))
+
+
+def _compile_lazy_decoder(cls, namespace):
+    """
+    Generates the function that wraps a dictionary in a lazy instance of cls.
+
+    The lazy instance is a subclass of cls that keeps the raw dictionary and decodes each field the first time it
+    is read, caching the result as a regular attribute. Nested model objects are lazy too, so only the fields that
+    are read are ever built.
+
+    Args:
+        cls (Type[Base]): The dataclass to generate a lazy decoder for.
+        namespace (dict): The globals of the generated field converters. It must end up holding the lazy
+            decode_<class name> for every class nested in cls.
+
+    Returns:
+        Callable[[dict], Base]: The decoder function.
+    """
+    name = cls.__name__
+    hints = typing.get_type_hints(cls)
+    converters = {}
+    for field in fields(cls):
+        source = _field_source(cls, field.name, hints, 'value', namespace)
+        converter = f'lazy_{name}_{field.name}'
+        lines = [f"def {converter}(data):",
+                 f"    value = data.get({field.name!r})"]
+        if source is not None:
+            lines += ["    if value is not None:",
+                      f"        value = {source}"]
+        lines.append("    return value")
+        exec('\n'.join(lines), namespace)
+        converters[field.name] = namespace[converter]
+
+    lazy_cls = type(f'Lazy{name}', (cls,), {'__slots__': ('_raw',),
+                                               '__module__': cls.__module__,
+                                               '__getattr__': _lazy_getattr,
+                                               '__eq__': _lazy_eq,
+                                               '__hash__': None,
+                                               '_lazy_converters': converters})
+    # a module attribute, so pickle finds the class of lazy instances by name
+    setattr(sys.modules[cls.__module__], lazy_cls.__name__, lazy_cls)
+    new = object.__new__
+
+    def decode(data):
+        obj = new(lazy_cls)
+        obj._raw = data
+        return obj
+
+    namespace[f'decode_{name}'] = decode
+    return decode
+
+
+def _compile_lazy_decoders(classes, namespace):
+    """
+    Compiles the lazy decoders of every class into one shared namespace.
+    """
+    return {cls: _compile_lazy_decoder(cls, namespace) for cls in classes}
+
+
+def _get_decoder(cls, lazy):
+    if lazy:
+        decoder = _lazy_decoders.get(cls)
+        if decoder is None:
+            decoder = _lazy_decoders[cls] = _compile_lazy_decoder(cls, _lazy_decoder_namespace)
+    else:
+        decoder = _decoders.get(cls)
+        if decoder is None:
+            decoder = _decoders[cls] = _compile_decoder(cls, _decoder_namespace)
+    return decoder
+
+
 @dataclass
 class Base:
+    # no instance dictionary of its own, so slotted subclasses (see SlottedObjects) have none at all
+    __slots__ = ()
+
+    # maps a Union field's name to a function picking, from the raw dictionary of the instance, the index of the
+    # Union member to decode the field as
+    _union_selectors = {}
+
     def to_dict(self):
         return asdict(self)
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, lazy=False):
         """
         Create a class instance from a dictionary.
 
         This method constructs a class instance by mapping keys in a dictionary
-        to attributes of the class. It automatically converts nested dictionaries
-        into instances of their respective classes.
+        to attributes of the class. Keys missing from the dictionary are set to None.
+        Nested dictionaries and lists of dictionaries are converted into instances of
+        the classes their fields are annotated with.
 
         Args:
             cls (Type[Base]): The class type to instantiate.
             data (dict): The dictionary containing data to populate the instance.
+            lazy (bool): Whether to keep the dictionary and only decode each field, including nested
+                objects, the first time it is read.
 
         Returns:
             Base: An instance of the class with attributes populated from the dictionary.
 
         Note:
-            This method may not work for unions. If you need to handle unions,
-            consider using `__postinit__` methods to convert to specific types.
+            Union fields are only converted if the class names them in `_union_selectors`,
+            otherwise they are left as dictionaries.
         """
-        valid_data = {field.name: data[field.name] if field.name in data else None for field in fields(cls)}
-
-        new_instance = cls(**valid_data)
-
-        for field in fields(new_instance):
-            new_instance._convert_field_to_class(field)
-
-        return new_instance
-
-    def _convert_field_to_class(self, field):
-        # this does not work for unions, therefore __postinit__ are required to
-        # convert the unions to a specific type
+        return _get_decoder(cls, lazy)(data)
 
-        # if the class to convert to is specified use that, useful for unions
+    @classmethod
+    def from_list(cls, data, lazy=False):
+        """
+        Create a list of class instances from a list of dictionaries, such as the results of a listing.
 
-        if (isinstance(field.type, Base)):
-            # converts dict into class
-            setattr(self, field.type, field.type.from_dict(getattr(self, field.name)))
+        Args:
+            cls (Type[Base]): The class type to instantiate.
+            data (List[dict]): The dictionaries containing data to populate the instances.
+            lazy (bool): Whether to keep the dictionaries and only decode each field, including nested
+                objects, the first time it is read.
 
-        elif isinstance(field.type, List) and hasattr(field.type, '__args__') and len(
-            field.type.__args__) > 0 and isinstance(field.type.__args__[0], Base):
-            # converts the list of dicts to a list of classes
-            converted_list = [field.type.__args__[0].from_dict(item)
-                              for item in getattr(self, field.name)]
-            setattr(self, field.name, converted_list)
+        Returns:
+            List[Base]: The instances, in the order of data.
+        """
+        decoder = _get_decoder(cls, lazy)
+        return [decoder(item) for item in data]
 
 
 @dataclass
@@ -733,13 +941,8 @@ class LibraryItem(Base):
     media: Union[Type['Book'], Type['Podcast']]
     libraryFiles: Optional[List[Type['LibraryFile']]]
 
-    def __post_init__(self):
-        # updates the media attribute from a dict to Book or Podcast
-        if type(self.media) is dict:
-            if self.mediaType == 'book':
-                self.media = Book.from_dict(self.media)
-            else:
-                self.media = Podcast.from_dict(self.media)
+    # decodes media as a Book or a Podcast depending on mediaType
+    _union_selectors = {'media': lambda data: 0 if data.get('mediaType') == 'book' else 1}
 
 
 @dataclass
@@ -793,15 +996,11 @@ class LibraryItemExpanded(Base):
     libraryFiles: List[LibraryFile]
     size: int
 
-    def __post_init__(self):
-        # updates the media attribute from a dict to Book or Podcast
-        if type(self.media) is dict:
-            if self.mediaType == 'book':
-                self.media = BookExpanded.from_dict(self.media)
-            else:
-                self.media = PodcastExpanded.from_dict(self.media)
+    # decodes media as a BookExpanded or a PodcastExpanded depending on mediaType
+    _union_selectors = {'media': lambda data: 0 if data.get('mediaType') == 'book' else 1}
 
 
+@dataclass
 class LibraryItemMinified(Base):
     """
     Represents a minified version of a library item.
@@ -845,13 +1044,39 @@ class LibraryItemMinified(Base):
     numFiles: int
     size: int
 
-    def __post_init__(self):
-        # updates the media attribute from a dict to BookMinified or PodcastMinified
-        if type(self.media) is dict:
-            if self.mediaType == 'book':
-                self.media = BookMinified.from_dict(self.media)
-            else:
-                self.media = PodcastMinified.from_dict(self.media)
+    # decodes media as a BookMinified or a PodcastMinified depending on mediaType
+    _union_selectors = {'media': lambda data: 0 if data.get('mediaType') == 'book' else 1}
+
+
+@dataclass
+class LibraryItemsPage(Base):
+    """
+    Represents one page of a library's items.
+
+    Attributes:
+        results (List[LibraryItem]): The library items of the page.
+        total (int): The total number of library items matching the filter, over all pages.
+        limit (int): The maximum number of library items per page. 0 means no limit.
+        page (int): The index of the page, starting at 0.
+        sortBy (str or None): The field the library items are sorted by.
+        sortDesc (bool): Whether the library items are sorted in descending order.
+        filterBy (str or None): The filter the library items were selected by.
+        mediaType (str): What kind of media the library items contain. Will be book or podcast.
+        minified (bool): Whether the library items are minified.
+        collapseseries (bool): Whether the books of a series are collapsed into one item.
+        include (str): The extra fields included in the library items.
+    """
+    results: List['LibraryItem']
+    total: int
+    limit: int
+    page: int
+    sortBy: Optional[str]
+    sortDesc: bool
+    filterBy: Optional[str]
+    mediaType: str
+    minified: bool
+    collapseseries: bool
+    include: str
 
 
 @dataclass
@@ -957,12 +1182,8 @@ class PlaylistItemExpanded(Base):
     episode: Type['PodcastEpisodeExpanded']
     libraryItem: Union[Type['LibraryItemExpanded'], Type['LibraryItemMinified']]
 
-    def __post_init__(self):
-        if type(self.libraryItem) is dict:
-            if self.episodeId is not None:
-                self.libraryItem = LibraryItemMinified.to_dict(self.libraryItem)
-            else:
-                self.libraryItem = LibraryItemExpanded.to_dict(self.libraryItem)
+    # decodes libraryItem as a LibraryItemMinified for podcast episodes, otherwise as a LibraryItemExpanded
+    _union_selectors = {'libraryItem': lambda data: 0 if data.get('episodeId') is None else 1}
 
 
 @dataclass
@@ -1387,3 +1608,7 @@ class SeriesSequence(Base):
     id: str
     name: str
     sequence: Optional[str]
+
+
+_decoders.update(_compile_decoders(Base.__subclasses__(), _decoder_namespace))
+_lazy_decoders.update(_compile_lazy_decoders(Base.__subclasses__(), _lazy_decoder_namespace))
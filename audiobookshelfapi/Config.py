@@ -18,3 +18,61 @@ Number_of_books_to_encode = 2
 
 # Time between requests to the server to check if the book has finished converting in seconds
 TIME_BETWEEN_CHECKS = 60
+
+# Path of the file caching the library between runs, so the script starts without downloading the whole library.
+# Leave empty to disable the cache
+CachePath = "audiobookshelf_cache.sqlite3"
+
+# Notice finished encodes from the server's socket events as they happen, polling only while the socket is down.
+# Requires python-socketio, install it with pip install "python-socketio[client]"
+UseSocketEvents = True
+
+# Time between checks while socket events are received, in case one was missed, in seconds
+SocketCheckInterval = 600
+
+# The order to encode books in: "shortest" first, "largest" audio files first, "oldest" added first, or "author",
+# taking turns between authors
+EncodePolicy = "shortest"
+
+# IDs of library items to encode before any other, in this order
+PinnedBooks = []
+
+# Seconds of audio an encode gets through per second, to estimate whether a book finishes before EndTime. Books
+# that would not are left for the next night
+EncodeSpeed = 40
+
+# Bounds of the number of books encoded at the same time. It starts at Number_of_books_to_encode and is adjusted
+# within them from the measured encode throughput. Set both to Number_of_books_to_encode to keep it fixed
+MinBooksToEncode = 1
+MaxBooksToEncode = 4
+
+# Path of the file keeping the history of encodes, which encode times are estimated from once it holds enough of
+# them. Leave empty to estimate from EncodeSpeed only
+EncodeHistoryPath = "encode_history.sqlite3"
+
+# Path of the file journaling every encode as it is requested and finishes, so a run that was stopped resumes the
+# encodes still running on the server instead of requesting them again. Leave empty to disable the journal
+EncodeJournalPath = "encode_journal.sqlite3"
+
+# Servers to encode on from one process, each with its own libraries, time window and number of concurrent
+# encodes. Settings left out default to the ones above. Leave empty to encode LibraryName on URL. For example:
+# Servers = [
+#     {"Name": "home", "URL": "http://192.168.1.10:13378", "APIToken": "...", "Libraries": ["Audiobooks", "Kids"]},
+#     {"Name": "nas", "URL": "http://192.168.1.20:13378", "APIToken": "...", "Libraries": ["Books"],
+#      "StartTime": 1, "EndTime": 7, "BooksToEncode": 1, "MinBooksToEncode": 1, "MaxBooksToEncode": 2},
+# ]
+# The cache, history and journal files of each server get its name before their extension
+Servers = []
+
+# Time between printing the status of every server when encoding on several, in seconds
+StatusInterval = 60
+
+# Path of the file to trace the API calls and encode jobs to, a line of OTLP JSON per span, which the
+# OpenTelemetry collector's otlpjsonfile receiver reads. Leave empty to disable tracing to a file
+TracePath = ""
+
+# URL of the OTLP/HTTP traces endpoint of a collector to export the spans to instead, e.g.
+# "http://localhost:4318/v1/traces", or "otel" for the tracer provider set up by opentelemetry-instrument.
+# Requires opentelemetry-api, and for a URL opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http. Leave
+# empty to disable
+TraceEndpoint = ""
@@ -1,13 +1,156 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from typing import List, Union, Optional
+from requests.adapters import HTTPAdapter
+from typing import Iterator, List, Union, Optional
+import Objects
 from Objects import *
 from audiobookshelfenums import *
+from audiobookshelfapi.conditional_get import ConditionalCache
+from audiobookshelfapi.disk_cache import DiskCache
+from audiobookshelfapi.events import EventStream
+from audiobookshelfapi.instrumentation import Instrumentation, RequestRecord, endpoint_template
+from audiobookshelfapi.json_backend import get_backend
+from audiobookshelfapi.response_cache import ResponseCache
+from audiobookshelfapi.streaming import iter_json_array
 import json
 
+# the span attributes of the arguments of the traced methods holding IDs
+_TRACED_IDS = {'library_id': 'abs.library_id', 'item_id': 'abs.item_id', 'book_id': 'abs.item_id',
+               'itemID': 'abs.item_id'}
+
+
+# the subclasses with their public methods traced, by the class they trace
+_TRACED_CLASSES = {}
+
+
+def _traced_class(cls):
+    # a subclass of cls wrapping its public methods in spans, leaving cls and its untraced instances alone
+    traced_cls = _TRACED_CLASSES.get(cls)
+    if traced_cls is None:
+        methods = {name: _traced(f"{cls.__name__}.{name}", method)
+                   for name, method in inspect.getmembers(cls, inspect.isfunction)
+                   if not name.startswith('_') and name not in ('close', 'events')}
+        traced_cls = _TRACED_CLASSES[cls] = type(f"Traced{cls.__name__}", (cls,),
+                                                 {'__module__': cls.__module__, **methods})
+    return traced_cls
+
+
+def _traced(span_name: str, method):
+    # a span per call of method, with the IDs it was called with and the number of results it returned
+    signature = inspect.signature(method)
+    id_params = {param: _TRACED_IDS[param] for param in signature.parameters if param in _TRACED_IDS}
+
+    def attributes(self, args, kwargs):
+        if not id_params:
+            return None
+        bound = signature.bind_partial(self, *args, **kwargs).arguments
+        return {key: bound.get(param) for param, key in id_params.items()}
+
+    if inspect.isgeneratorfunction(method):
+        # the span covers the iteration. It is the current one while the generator runs, for the requests it makes
+        # and the threads it starts, but not while the caller holds the generator
+        @functools.wraps(method)
+        def traced_generator(self, *args, **kwargs):
+            span = self.tracer.start_span(span_name, attributes(self, args, kwargs))
+            generator = method(self, *args, **kwargs)
+            count = 0
+            try:
+                while True:
+                    with self.tracer.use_span(span):
+                        try:
+                            value = next(generator)
+                        except StopIteration:
+                            break
+                    count += 1
+                    yield value
+            except GeneratorExit:
+                # the caller stopped iterating early, which is not a failure
+                raise
+            except BaseException as e:
+                span.record_exception(e)
+                raise
+            finally:
+                with self.tracer.use_span(span):
+                    generator.close()
+                span.set_attribute('abs.results', count)
+                span.end()
+        return traced_generator
+
+    @functools.wraps(method)
+    def traced(self, *args, **kwargs):
+        with self.tracer.span(span_name, attributes(self, args, kwargs)) as span:
+            value = method(self, *args, **kwargs)
+            if isinstance(value, list):
+                span.set_attribute('abs.results', len(value))
+            return value
+    return traced
+
+
+def _trace_request(tracer, record: RequestRecord):
+    # a request to the server as a child span of the method call that made it
+    start = int(record.started_at * 1e9)
+    span = tracer.start_span(f"{record.method} {record.endpoint}", {
+        'http.request.method': record.method,
+        'url.full': record.url,
+        'http.response.status_code': record.status,
+        'http.request.body.size': record.request_bytes,
+        'http.response.body.size': record.response_bytes,
+        'abs.wait': record.wait,
+        'abs.download': record.download,
+        'abs.parse': record.parse,
+        'abs.decode': record.decode,
+    }, start_time=start, client=True)
+    if record.error is not None:
+        tracer.set_error(span, record.error)
+    span.end(start + int(record.total * 1e9))
+
 
 class AudiobookshelfAPI:
 
-    def __init__(self, url, api_token):
+    def __init__(self, url, api_token, pool_connections: int = 10, pool_maxsize: int = 10,
+                 pool_block: bool = False, keep_alive_timeout: Optional[float] = 60, models=Objects,
+                 json_backend='auto', disk_cache: Optional[DiskCache] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 conditional_cache: Optional[ConditionalCache] = None,
+                 instrumentation: Optional[Instrumentation] = None, tracer=None):
+        """
+        Args:
+            url (str): URL of the Audiobookshelf server.
+            api_token (str): API token of the user to act as.
+            pool_connections (int): The number of hosts to keep connection pools for.
+            pool_maxsize (int): The maximum number of connections kept open to a single host.
+            pool_block (bool): Whether to wait for a free connection when a host's pool is exhausted instead of
+                opening an extra, unpooled connection.
+            keep_alive_timeout (float or None): Seconds without any request after which every pooled connection is
+                dropped instead of reused, as the server has most likely closed them by then. Connections are not
+                timed one by one, a pool kept busy by some requests keeps all of its connections. None keeps idle
+                connections open indefinitely.
+            models (module): The module of model classes responses are decoded into, Objects or the more
+                compact SlottedObjects.
+            json_backend (str or JSONBackend): The JSON implementation for request and response bodies, see
+                json_backend.get_backend. 'auto' picks the fastest one installed.
+            disk_cache (DiskCache or None): A persistent cache get_all_libraries answers from, see disk_cache.
+            response_cache (ResponseCache or None): An in-memory cache of the responses of read-mostly endpoints,
+                see response_cache. Writes through this instance invalidate the entries they make stale.
+            conditional_cache (ConditionalCache or None): The last responses of the library, library items,
+                collections and playlists endpoints, revalidated with ETags so unchanged responses are neither
+                downloaded nor decoded again, see conditional_get.
+            instrumentation (Instrumentation or None): Receives the record of every call to the server, its status,
+                sizes and the time spent waiting, downloading, parsing and decoding, see instrumentation.
+            tracer (FileTracer or OpenTelemetryTracer or None): Traces every call of a public method in a span, and
+                every request to the server in a child span of it, see tracing. None wraps nothing.
+
+        Note:
+            All requests share one keep-alive connection pool. Use the instance as a context manager, or call
+            `close`, to release the pooled connections.
+        """
         self.api_token = api_token
         self.headers = {
             'Content-Type': 'application/json',
@@ -18,14 +161,141 @@ class AudiobookshelfAPI:
         self.libraries_url = self.api_url + '/libraries'
         self.items_url = self.api_url + '/items'
         self.tools_url = self.api_url + '/tools/item'
+        self.models = models
+        self.json = get_backend(json_backend)
+        self.disk_cache = disk_cache
+        self.response_cache = response_cache
+        self.conditional_cache = conditional_cache
+        self.instrumentation = instrumentation
+        # the record of the call in progress on each thread, when instrumented
+        self._local = threading.local()
+        self.tracer = tracer
+        if tracer is not None:
+            # the requests become spans from their records, which the hooks of instrumentation get as well
+            hooks = [functools.partial(_trace_request, tracer)]
+            if instrumentation is not None:
+                hooks.append(instrumentation.emit)
+            self.instrumentation = Instrumentation(hooks)
+            # the traced class looks the tracer up on the instance, so neither holds the other in a cycle
+            self.__class__ = _traced_class(type(self))
+
+        self._events = None
+        self._events_lock = threading.Lock()
+
+        self.keep_alive_timeout = keep_alive_timeout
+        self._last_request_time = None
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                    pool_block=pool_block)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+
         if not self.ping():
-            raise "Failed to ping server"
+            self.close()
+            raise Exception("Failed to ping server")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Closes every pooled connection to the server, and the event stream if it was opened.
+        """
+        if self._events is not None:
+            self._events.close()
+        self.session.close()
+
+    def events(self, workers: int = 4, max_pending: int = 1000, timeout: float = 10) -> EventStream:
+        """
+        Returns the stream of events the server pushes, such as library scans, item updates and podcast episode
+        downloads, with their payloads decoded into the models. The stream keeps one authenticated socket
+        connection, opened on the first call and shared by every later one; its arguments only apply to the
+        first call.
 
-    def _send_get_request(self, url: str, json_data: dict = None) -> requests.Response:
+        Args:
+            workers (int): The number of threads handlers are called on.
+            max_pending (int): The default number of events queued for a handler before its oldest are dropped.
+            timeout (float): Seconds to wait for the server to accept the token.
+
+        Returns:
+            EventStream: The stream, register handlers with its `on` method.
+
+        Raises:
+            Exception: If python-socketio is not installed, or the server cannot be reached or does not accept the
+                token.
+
+        Example:
+            ```
+            a.events().on(SocketEvent.ITEM_UPDATED, lambda item: print(item.media.metadata.title))
+            ```
+        """
+        with self._events_lock:
+            if self._events is None:
+                events = EventStream(self.base_url, self.api_token, models=self.models, workers=workers,
+                                     max_pending=max_pending)
+                try:
+                    events.connect(timeout=timeout)
+                except Exception:
+                    events.close()
+                    raise
+                self._events = events
+        return self._events
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        # drop the pooled connections if no request was sent for the keep-alive timeout, the server has most likely
+        # closed them
+        now = time.monotonic()
+        if (self.keep_alive_timeout is not None and self._last_request_time is not None
+                and now - self._last_request_time > self.keep_alive_timeout):
+            self._adapter.poolmanager.clear()
+        self._last_request_time = now
+        if self.instrumentation is None:
+            return self.session.request(method, url, **kwargs)
+        with self._instrumented() as record:
+            record.method, record.url, record.endpoint = method, url, endpoint_template(url)
+            record.request_bytes = len(kwargs.get('data') or b'')
+            start = time.perf_counter()
+            response = self.session.request(method, url, **kwargs)
+            record.status = response.status_code
+            # requests measures until the headers are parsed, the body is read after
+            record.wait = response.elapsed.total_seconds()
+            if kwargs.get('stream'):
+                record.response_bytes = int(response.headers.get('Content-Length', 0))
+            else:
+                record.response_bytes = len(response.content)
+                record.download = max(0.0, time.perf_counter() - start - record.wait)
+            return response
+
+    @contextmanager
+    def _instrumented(self):
+        # the record of a call, from its request to decoding its response, emitted when the outermost block exits.
+        # Nested blocks on the same thread, such as _request inside _get_decoded, fill in the same record
+        record = getattr(self._local, 'record', None)
+        if record is not None or self.instrumentation is None:
+            yield record
+            return
+        record = self._local.record = RequestRecord()
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._local.record = None
+            record.total = time.perf_counter() - start
+            self.instrumentation.emit(record)
+
+    def _send_get_request(self, url: str, json_data: dict = None, params: dict = None,
+                          headers: dict = None) -> requests.Response:
         if json_data is None:
             json_data = {}
         try:
-            response = requests.get(url, headers=self.headers, json=json_data)
+            response = self._request('GET', url, params=params, headers=headers, data=self.json.dumps(json_data))
             response.raise_for_status()  # Raise an exception for non-2xx status codes
             # Uncomment line below to print the response from the server
             #print(json.dumps(response.json(), indent=4), response.status_code)
@@ -37,7 +307,7 @@ class AudiobookshelfAPI:
 
     def _send_patch_request(self, url: str, json_data: dict) -> requests.Response:
         try:
-            response = requests.patch(url, headers=self.headers, json=json_data)
+            response = self._request('PATCH', url, data=self.json.dumps(json_data))
             response.raise_for_status()  # Raise an exception for non-2xx status codes
             return response
         except requests.exceptions.RequestException as e:
@@ -49,7 +319,7 @@ class AudiobookshelfAPI:
         if json_data is None:
             json_data = {}
         try:
-            response = requests.post(url, headers=self.headers, json=json_data)
+            response = self._request('POST', url, data=self.json.dumps(json_data))
             response.raise_for_status()  # Raise an exception for non-2xx status codes
             # Uncomment line below to print the response from the server
             #print(json.dumps(response.json(), indent=4), response.status_code)
@@ -59,6 +329,55 @@ class AudiobookshelfAPI:
         except json.JSONDecodeError as e:
             raise Exception(f"JSON parsing error: {e}")
 
+    def _cached(self, endpoint: str, key, fetch):
+        if self.response_cache is None:
+            return fetch()
+        return self.response_cache.get_or_fetch(endpoint, key, fetch)
+
+    def _refreshed(self, endpoint: str, key, fetch):
+        if self.response_cache is None:
+            return fetch()
+        return self.response_cache.refresh(endpoint, key, fetch)
+
+    def _invalidate(self, endpoint: str, key=None):
+        if self.response_cache is not None:
+            self.response_cache.invalidate(endpoint, key)
+
+    def _get_decoded(self, url: str, decode, params: dict = None, variant=None):
+        # GETs url and decodes its JSON, revalidating the last response through the conditional_cache if there is
+        # one. variant tells apart decodings of the same response, e.g. lazy and eager
+        with self._instrumented():
+            if self.conditional_cache is None:
+                return self._decode(self._send_get_request(url, params=params), decode)
+            key = (url, tuple(sorted(params.items())) if params else (), variant)
+            response = self._send_get_request(url, params=params,
+                                              headers=self.conditional_cache.request_headers(key))
+            return self.conditional_cache.resolve(key, response, lambda response: self._decode(response, decode),
+                                                  lambda: self._send_get_request(url, params=params))
+
+    def _decode(self, response: requests.Response, decode):
+        # parses the JSON of a response and decodes it, timing both for the instrumentation
+        data = self._parse_json(response)
+        record = getattr(self._local, 'record', None) if self.instrumentation is not None else None
+        if record is None:
+            return decode(data)
+        start = time.perf_counter()
+        value = decode(data)
+        record.decode += time.perf_counter() - start
+        return value
+
+    def _parse_json(self, response: requests.Response):
+        # parse the raw bytes, skipping the str requests' response.json() decodes them to first
+        record = getattr(self._local, 'record', None) if self.instrumentation is not None else None
+        start = time.perf_counter()
+        try:
+            data = self.json.loads(response.content)
+        except ValueError as e:
+            raise Exception(f"JSON parsing error: {e}")
+        if record is not None:
+            record.parse += time.perf_counter() - start
+        return data
+
     def ping(self):
         url = f"{self.base_url}/ping"
         response = self._send_get_request(url=url)
@@ -97,31 +416,58 @@ class AudiobookshelfAPI:
             ```
         """
         url = self.libraries_url
-        d = {}
-        for folder in folders_path:
-            d.update({'fullPath': folder})
         payload = {
             "name": name,
-            "folders": [d],
+            "folders": [{'fullPath': folder} for folder in folders_path],
             "icon": icon.value,
             "mediaType": media_type,
             "provider": provider.value
         }
-        response = requests.post(url, headers=self.headers, json=payload)
-        if response.status_code != 200:
-            print(json.dumps(payload, indent=2), response.text, response.reason, response.status_code)
-            raise "Invalid Response from server. Failed to create library!"
-        return Library.from_dict(json.loads(response.text))
-
-    def get_all_libraries(self) -> List[Library]:
+        with self._instrumented():
+            response = self._request('POST', url, data=self.json.dumps(payload))
+            if response.status_code != 200:
+                print(json.dumps(payload, indent=2, default=str), response.text, response.reason,
+                      response.status_code)
+                raise Exception("Invalid Response from server. Failed to create library!")
+            self._invalidate('libraries')
+            return self._decode(response, self.models.Library.from_dict)
+
+    def get_all_libraries(self, cached: bool = True) -> List[Library]:
         """
         Get all the libraries in the Audiobookshelf instance
+
+        With a response_cache, the libraries are served from it until they expire. With a disk_cache, the cached
+        libraries are returned right away and refreshed from the server in a background thread. When none are
+        cached, or cached is False, they are fetched and cached.
+
+        Args:
+            cached (bool): Whether the libraries may be served from the response_cache or the disk_cache.
+
         Returns: (List[Library]) all libraries in Audiobookshelf instance
 
        """
+        if cached:
+            return self._cached('libraries', None, self._get_all_libraries)
+        return self._refreshed('libraries', None, lambda: self._get_all_libraries(cached=False))
+
+    def _get_all_libraries(self, cached: bool = True) -> List[Library]:
+        if self.disk_cache is not None and cached:
+            libraries = self.disk_cache.get_libraries()
+            if libraries:
+                threading.Thread(target=self._refresh_cached_libraries, daemon=True).start()
+                return libraries
         url = self.libraries_url
-        response = self._send_get_request(url=url)
-        return [Library.from_dict(library) for library in response.json()['libraries']]
+        libraries = self._get_decoded(url, lambda data: self.models.Library.from_list(data['libraries']))
+        if self.disk_cache is not None:
+            self.disk_cache.put_libraries(libraries)
+        return libraries
+
+    def _refresh_cached_libraries(self):
+        try:
+            self.get_all_libraries(cached=False)
+        except Exception:
+            # the cached libraries stay in place until the next refresh
+            pass
 
     def get_library(self, library_id: str) -> Library:
         """
@@ -134,8 +480,8 @@ class AudiobookshelfAPI:
 
         """
         url = f"{self.libraries_url}/{library_id}"
-        response = self._send_get_request(url=url)
-        return Library.from_dict(json.loads(response.text))
+        return self._cached('library', library_id,
+                            lambda: self._get_decoded(url, self.models.Library.from_dict))
 
     def update_library(self,
                        id: str,
@@ -193,34 +539,255 @@ class AudiobookshelfAPI:
         if not payload:
             raise Exception("No fields to update")
 
-        response = self._send_patch_request(url, json_data=payload)
-        return Library.from_dict(response.json())
-
-    def get_all_library_items(self, library_id: str) -> list[LibraryItem]:
+        with self._instrumented():
+            response = self._send_patch_request(url, json_data=payload)
+            self._invalidate('library', id)
+            self._invalidate('libraries')
+            return self._decode(response, self.models.Library.from_dict)
+
+    @staticmethod
+    def _library_items_params(limit: Optional[int] = None, page: Optional[int] = None,
+                              sort: Optional[Union[SortField, str]] = None, desc: bool = False,
+                              filter: Optional[str] = None, minified: bool = False) -> dict:
+        # the query parameters of /libraries/{id}/items, leaving out the ones the server should default
+        params = {}
+        if limit is not None:
+            params['limit'] = limit
+        if page is not None:
+            params['page'] = page
+        if sort is not None:
+            params['sort'] = sort.value if isinstance(sort, SortField) else sort
+            params['desc'] = int(desc)
+        if filter is not None:
+            params['filter'] = filter
+        if minified:
+            params['minified'] = 1
+        return params
+
+    def _library_item_class(self, minified: bool):
+        return self.models.LibraryItemMinified if minified else self.models.LibraryItem
+
+    def get_all_library_items(self, library_id: str, lazy: bool = False,
+                              sort: Optional[Union[SortField, str]] = None, desc: bool = False,
+                              filter: Optional[str] = None,
+                              minified: bool = False) -> list[Union[LibraryItem, LibraryItemMinified]]:
         """
         Retrieve all library items for a specific library.
 
         Args:
             library_id (str): The ID of the library.
+            lazy (bool): Whether to decode each item's fields, including its media, only when first read.
+                Cheaper when only a few fields of each item are used.
+            sort (SortField or str or None): The field the server sorts the library items by. None leaves them
+                in the server's order.
+            desc (bool): Whether to sort in descending order.
+            filter (str or None): The server's filter expression selecting the library items to return, built
+                with FilterGroup.filter. None returns every item.
+            minified (bool): Whether to request minified library items, which leave out the audio files,
+                chapters and tracks of the media and are decoded as LibraryItemMinified.
+
+        Returns:
+            List[LibraryItem or LibraryItemMinified]: A list of instances representing the library items.
+
+        Raises:
+            Exception: Raises an exception if the request to the server fails or if the response is invalid.
+
+        Example:
+            ```
+            # the multitrack books, shortest first
+            books = a.get_all_library_items(library_id, sort=SortField.DURATION,
+                                            filter=FilterGroup.TRACKS.filter(TracksFilter.MULTI), minified=True)
+            ```
+        """
+        url = f"{self.libraries_url}/{library_id}/items"
+        params = self._library_items_params(sort=sort, desc=desc, filter=filter, minified=minified)
+        cls = self._library_item_class(minified)
+        return self._get_decoded(url, lambda data: cls.from_list(data['results'], lazy=lazy), params=params,
+                                 variant=lazy)
+
+    def get_library_items_page(self, library_id: str, limit: int, page: int = 0,
+                               sort: Optional[Union[SortField, str]] = None, desc: bool = False,
+                               filter: Optional[str] = None, minified: bool = False,
+                               lazy: bool = False) -> LibraryItemsPage:
+        """
+        Retrieve one page of the library items of a library.
+
+        Args:
+            library_id (str): The ID of the library.
+            limit (int): The maximum number of library items on the page. 0 returns every item on one page.
+            page (int): The index of the page, starting at 0.
+            sort (SortField or str or None): The field to sort the library items by. None leaves them in the
+                server's order.
+            desc (bool): Whether to sort in descending order.
+            filter (str or None): The server's filter expression for the library items, built with
+                FilterGroup.filter.
+            minified (bool): Whether to request minified library items, decoded as LibraryItemMinified.
+            lazy (bool): Whether to decode each item's fields, including its media, only when first read.
 
         Returns:
-            List[LibraryItem]: A list of LibraryItem instances representing the library items.
+            LibraryItemsPage: The page, with its library items in results and the number of matching items in total.
 
         Raises:
             Exception: Raises an exception if the request to the server fails or if the response is invalid.
         """
         url = f"{self.libraries_url}/{library_id}/items"
-        response = self._send_get_request(url)
-        return [LibraryItem.from_dict(item) for item in response.json()['results']]
+        params = self._library_items_params(limit, page, sort, desc, filter, minified)
+        cls = self._library_item_class(minified)
+
+        def decode(data):
+            library_items_page = self.models.LibraryItemsPage.from_dict({**data, 'results': None})
+            library_items_page.results = cls.from_list(data.get('results') or [], lazy=lazy)
+            return library_items_page
+
+        return self._get_decoded(url, decode, params=params, variant=lazy)
+
+    def iter_library_item_pages(self, library_id: str, page_size: int = 500, prefetch: int = 4,
+                                sort: Optional[Union[SortField, str]] = None, desc: bool = False,
+                                filter: Optional[str] = None, minified: bool = False,
+                                lazy: bool = False) -> Iterator[LibraryItemsPage]:
+        """
+        Iterate over the library items of a library page by page, downloading the next pages in the background.
+
+        The first page is requested right away to learn the number of pages. While the caller works through a page,
+        up to prefetch of the following pages are requested on a thread pool, so the server prepares several pages
+        at once and memory stays bounded by prefetch + 1 pages however large the library is.
+
+        Args:
+            library_id (str): The ID of the library.
+            page_size (int): The maximum number of library items per page.
+            prefetch (int): The number of pages requested ahead of the one being consumed. Keep it at most
+                pool_maxsize, or the extra requests open connections that are not pooled.
+            sort (SortField or str or None): The field to sort the library items by.
+            desc (bool): Whether to sort in descending order.
+            filter (str or None): The server's filter expression for the library items, built with
+                FilterGroup.filter.
+            minified (bool): Whether to request minified library items, decoded as LibraryItemMinified.
+            lazy (bool): Whether to decode each item's fields, including its media, only when first read.
+
+        Returns:
+            Iterator[LibraryItemsPage]: The pages, in order.
+
+        Raises:
+            Exception: Raises an exception if the request for any page fails or if its response is invalid.
+
+        Note:
+            Pages are requested independently, so items added or removed while iterating can shift an item onto
+            a page that was already fetched or one not fetched yet. Sort by a field that does not change, such as
+            SortField.ADDED_AT, to keep the pages stable.
+
+        Example:
+            ```
+            for page in a.iter_library_item_pages(library_id, page_size=200):
+                for item in page.results:
+                    ...
+            ```
+        """
+        if page_size < 1:
+            raise Exception("page_size must be at least 1")
+
+        def get_page(page):
+            return self.get_library_items_page(library_id, page_size, page, sort=sort, desc=desc, filter=filter,
+                                               minified=minified, lazy=lazy)
+
+        first = get_page(0)
+        yield first
+        num_pages = -(-first.total // page_size)
+        if num_pages <= 1:
+            return
+        prefetch = max(prefetch, 1)
+        with ThreadPoolExecutor(max_workers=prefetch) as executor:
+            # the pages are requested in the caller's context, so their spans are children of the caller's span
+            pending = deque(executor.submit(contextvars.copy_context().run, get_page, page)
+                            for page in range(1, min(prefetch + 1, num_pages)))
+            next_page = prefetch + 1
+            try:
+                while pending:
+                    library_items_page = pending.popleft().result()
+                    # keep prefetch pages in flight while the caller works through this one
+                    if next_page < num_pages:
+                        pending.append(executor.submit(contextvars.copy_context().run, get_page, next_page))
+                        next_page += 1
+                    yield library_items_page
+            finally:
+                # the caller stopped early or a page failed, do not wait for pages nobody will read
+                for future in pending:
+                    future.cancel()
+
+    def iter_library_items(self, library_id: str, lazy: bool = False,
+                           sort: Optional[Union[SortField, str]] = None, desc: bool = False,
+                           filter: Optional[str] = None, minified: bool = False,
+                           chunk_size: int = 64 * 1024) -> Iterator[Union[LibraryItem, LibraryItemMinified]]:
+        """
+        Iterate over all library items of a library while the response is downloaded.
+
+        Unlike get_all_library_items, the response is parsed incrementally and one LibraryItem is decoded at a
+        time, so memory stays bounded by the chunk and item sizes however large the library is, and the first
+        item is available before the download finishes.
+
+        Args:
+            library_id (str): The ID of the library.
+            lazy (bool): Whether to decode each item's fields, including its media, only when first read.
+            sort (SortField or str or None): The field the server sorts the library items by.
+            desc (bool): Whether to sort in descending order.
+            filter (str or None): The server's filter expression for the library items, built with
+                FilterGroup.filter.
+            minified (bool): Whether to request minified library items, decoded as LibraryItemMinified.
+            chunk_size (int): The number of bytes read from the connection at a time.
+
+        Returns:
+            Iterator[LibraryItem or LibraryItemMinified]: The library items, in the order of the response.
+
+        Raises:
+            Exception: Raises an exception if the request to the server fails or if the response is invalid.
+
+        Example:
+            ```
+            for item in a.iter_library_items(library_id, lazy=True):
+                if item.media.numAudioFiles > 1:
+                    ...
+            ```
+        """
+        url = f"{self.libraries_url}/{library_id}/items"
+        params = self._library_items_params(sort=sort, desc=desc, filter=filter, minified=minified)
+        decode = self._library_item_class(minified).from_dict
+        try:
+            with self._request('GET', url, params=params, data=self.json.dumps({}), stream=True) as response:
+                response.raise_for_status()  # Raise an exception for non-2xx status codes
+                for item in iter_json_array(response.iter_content(chunk_size), 'results'):
+                    yield decode(item, lazy=lazy)
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Request error: {e}")
+        except ValueError as e:
+            raise Exception(f"JSON parsing error: {e}")
+
+    def get_library_item(self, item_id: str, expanded: bool = False) -> Union[LibraryItem, LibraryItemExpanded]:
+        """
+        Gets a library item from its id
+
+        Args:
+            item_id (str): The ID of the library item.
+            expanded (bool): Whether to get the expanded library item.
+
+        Returns:
+            LibraryItem or LibraryItemExpanded: The library item.
+        """
+        url = f"{self.items_url}/{item_id}"
+        model = self.models.LibraryItemExpanded if expanded else self.models.LibraryItem
+        with self._instrumented():
+            response = self._send_get_request(url, params={'expanded': 1} if expanded else None)
+            return self._decode(response, model.from_dict)
 
     # untested
     def get_all_library_podcast_episode_downloads(self, library_id: str) -> List[PodcastEpisodeDownload]:
         url = f"{self.libraries_url}/{library_id}/episode-downloads"
-        response = self._send_get_request(url)
-        downloads = [PodcastEpisodeDownload.from_dict(response.json()['currentDownload'])]
-        for download in response.json()['queue']:
-            downloads.append(PodcastEpisodeDownload.from_dict(download))
-        return downloads
+        def decode(data):
+            downloads = [self.models.PodcastEpisodeDownload.from_dict(data['currentDownload'])]
+            for download in data['queue']:
+                downloads.append(self.models.PodcastEpisodeDownload.from_dict(download))
+            return downloads
+
+        with self._instrumented():
+            return self._decode(self._send_get_request(url), decode)
 
     def get_library_series(self, library_id: str) -> List[SeriesBooks]:
         """
@@ -232,9 +799,12 @@ class AudiobookshelfAPI:
 
         """
         url = f"{self.libraries_url}/{library_id}/series"
-        response = self._send_get_request(url)
-        print(json.dumps(response.json(), indent=2))
-        return [SeriesBooks.from_dict(result) for result in response.json()['results']]
+        def decode(data):
+            print(json.dumps(data, indent=2))
+            return self.models.SeriesBooks.from_list(data['results'])
+
+        with self._instrumented():
+            return self._decode(self._send_get_request(url), decode)
 
     def get_library_collections(self, library_id: str) -> List[CollectionExpanded]:
         """
@@ -245,22 +815,35 @@ class AudiobookshelfAPI:
 
         """
         url = f"{self.libraries_url}/{library_id}/collections"
-        response = self._send_get_request(url)
-        # Uncomment line to print response
-        # print(json.dumps(response.json(), indent=2))
-        return [CollectionExpanded.from_dict(result) for result in response.json()['results']]
+        return self._cached('library_collections', library_id, lambda: self._get_decoded(
+            url, lambda data: self.models.CollectionExpanded.from_list(data['results'])))
 
     # tested?
     def get_user_playlists(self, library_id: str):
         url = f"{self.libraries_url}/{library_id}/playlists"
-        response = self._send_get_request(url)
-        return [PlaylistExpanded.from_dict(result) for result in response.json()['results']]
+        return self._cached('user_playlists', library_id, lambda: self._get_decoded(
+            url, lambda data: self.models.PlaylistExpanded.from_list(data['results'])))
 
     def post_encode_m4b(self, book_id: str):
         url = f"{self.tools_url}/{book_id}/encode-m4b"
         #print(url)
         response = self._send_post_request(url)
+        # collections and playlists embed the library item, whose files the encode replaces
+        self._invalidate('library_collections')
+        self._invalidate('user_playlists')
         return response
+
+    def get_tasks(self) -> List[dict]:
+        """
+        Gets the tasks the server is running or recently finished, such as M4B encodes and library scans.
+
+        Returns:
+            list of dict: The tasks as parsed JSON, with their action, data, isFinished and isFailed.
+        """
+        url = f"{self.api_url}/tasks"
+        with self._instrumented():
+            return self._decode(self._send_get_request(url), lambda data: data['tasks'])
+
     def temp(self, itemID: str):
         url = f"{self.items_url}/{itemID}/media"
         response = self._send_patch_request(url, {})
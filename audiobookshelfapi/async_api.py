@@ -0,0 +1,247 @@
+import asyncio
+from typing import List, Optional, Tuple
+import Objects
+from Objects import *
+from audiobookshelfenums import *
+from audiobookshelfapi.json_backend import get_backend
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncAudiobookshelfAPI:
+    """
+    asyncio counterpart of AudiobookshelfAPI. Requires the optional aiohttp: `pip install aiohttp`.
+
+    Every method is a coroutine returning the same Objects dataclasses as the synchronous client. Requests are
+    bounded by a semaphore for the server, so many calls can be gathered at once without flooding it.
+
+    Example:
+        ```
+        async with AsyncAudiobookshelfAPI(url, api_token) as a:
+            items = await a.get_all_library_items(library_id)
+            expanded = await a.get_library_items([item.id for item in items])
+        ```
+    """
+
+    def __init__(self, url, api_token, max_concurrency: int = 10, keep_alive_timeout: float = 60, models=Objects,
+                 json_backend='auto'):
+        """
+        Args:
+            url (str): URL of the Audiobookshelf server.
+            api_token (str): API token of the user to act as.
+            max_concurrency (int): The maximum number of requests in flight to the server at once.
+            keep_alive_timeout (float): Seconds a pooled connection may sit idle before it is closed.
+            models (module): The module of model classes responses are decoded into, Objects or the more
+                compact SlottedObjects.
+            json_backend (str or JSONBackend): The JSON implementation for request and response bodies, see
+                json_backend.get_backend. 'auto' picks the fastest one installed.
+
+        Raises:
+            Exception: If aiohttp is not installed.
+
+        Note:
+            The HTTP session is opened by `open` or when entering `async with`, which also pings the server.
+        """
+        if aiohttp is None:
+            raise Exception('The asyncio client requires aiohttp, install it with pip install aiohttp')
+        self.api_token = api_token
+        self.headers = {
+            'Content-Type': 'application/json',
+            'Authorization': 'Bearer ' + self.api_token
+        }
+        self.base_url = url
+        self.api_url = self.base_url + "/api"
+        self.libraries_url = self.api_url + '/libraries'
+        self.items_url = self.api_url + '/items'
+        self.tools_url = self.api_url + '/tools/item'
+        self.models = models
+        self.json = get_backend(json_backend)
+
+        self.max_concurrency = max_concurrency
+        self.keep_alive_timeout = keep_alive_timeout
+        self.session = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def open(self):
+        """
+        Opens the HTTP session and checks that the server responds.
+        """
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.max_concurrency,
+                                         keepalive_timeout=self.keep_alive_timeout)
+        self.session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+        if not await self.ping():
+            await self.close()
+            raise Exception("Failed to ping server")
+
+    async def close(self):
+        """
+        Closes the HTTP session and every pooled connection to the server.
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _send_request(self, method: str, url: str,
+                            json_data: dict = None) -> Tuple['aiohttp.ClientResponse', bytes]:
+        data = None if json_data is None else self.json.dumps(json_data)
+        async with self._semaphore:
+            try:
+                async with self.session.request(method, url, data=data) as response:
+                    response.raise_for_status()  # Raise an exception for non-2xx status codes
+                    # the body can only be read before the connection goes back to the pool
+                    return response, await response.read()
+            except aiohttp.ClientError as e:
+                raise Exception(f"Request error: {e}")
+
+    def _parse_json(self, body: bytes):
+        try:
+            return self.json.loads(body)
+        except ValueError as e:
+            raise Exception(f"JSON parsing error: {e}")
+
+    async def _get_json(self, url: str):
+        _, body = await self._send_request('GET', url)
+        return self._parse_json(body)
+
+    async def ping(self):
+        url = f"{self.base_url}/ping"
+        response, body = await self._send_request('GET', url)
+        return response.status == 200 and body == b'{"success":true}'
+
+    async def create_library(self, name: str, folders_path: List[str], icon: Icon,
+                             media_type: str, provider: Provider) -> Library:
+        """
+        Creates a new library with the provided attributes. See AudiobookshelfAPI.create_library.
+
+        Returns:
+            Library: The newly created Library object.
+        """
+        payload = {
+            "name": name,
+            "folders": [{'fullPath': folder} for folder in folders_path],
+            "icon": icon.value,
+            "mediaType": media_type,
+            "provider": provider.value
+        }
+        _, body = await self._send_request('POST', self.libraries_url, json_data=payload)
+        return self.models.Library.from_dict(self._parse_json(body))
+
+    async def get_all_libraries(self) -> List[Library]:
+        """
+        Get all the libraries in the Audiobookshelf instance
+        Returns: (List[Library]) all libraries in Audiobookshelf instance
+
+        """
+        data = await self._get_json(self.libraries_url)
+        return self.models.Library.from_list(data['libraries'])
+
+    async def get_library(self, library_id: str) -> Library:
+        """
+        Gets a library from its id
+
+        Args:
+          library_id: id of the library to get
+
+        Returns: (Library) library from the provided id
+
+        """
+        return self.models.Library.from_dict(await self._get_json(f"{self.libraries_url}/{library_id}"))
+
+    async def update_library(self,
+                             id: str,
+                             name: Optional[str] = None,
+                             folders: Optional[List[Folder]] = None,
+                             display_order: Optional[int] = None,
+                             icon: Optional[Icon] = None,
+                             provider: Optional[Provider] = None,
+                             settings: Optional[LibrarySettings] = None) -> Library:
+        """
+        Update the library with the specified ID. See AudiobookshelfAPI.update_library.
+
+        Returns:
+            Library: The updated Library object with the specified changes.
+
+        Raises:
+            Exception: If no fields to update are provided, an exception is raised.
+        """
+        payload = {}
+        if name is not None:
+            payload["name"] = name
+        if folders is not None:
+            payload["folders"] = folders
+        if display_order is not None:
+            payload["displayOrder"] = display_order
+        if icon is not None:
+            payload["icon"] = icon
+        if provider is not None:
+            payload["provider"] = provider
+        if settings is not None:
+            payload["settings"] = settings
+
+        if not payload:
+            raise Exception("No fields to update")
+
+        _, body = await self._send_request('PATCH', f"{self.libraries_url}/{id}", json_data=payload)
+        return self.models.Library.from_dict(self._parse_json(body))
+
+    async def get_all_library_items(self, library_id: str, lazy: bool = False) -> List[LibraryItem]:
+        """
+        Retrieve all library items for a specific library.
+
+        Args:
+            library_id (str): The ID of the library.
+            lazy (bool): Whether to decode each item's fields, including its media, only when first read.
+
+        Returns:
+            List[LibraryItem]: A list of LibraryItem instances representing the library items.
+        """
+        data = await self._get_json(f"{self.libraries_url}/{library_id}/items")
+        return self.models.LibraryItem.from_list(data['results'], lazy=lazy)
+
+    async def get_library_item(self, item_id: str) -> LibraryItemExpanded:
+        """
+        Retrieve a single, expanded library item.
+
+        Args:
+            item_id (str): The ID of the library item.
+
+        Returns:
+            LibraryItemExpanded: The library item with its expanded media.
+        """
+        data = await self._get_json(f"{self.items_url}/{item_id}?expanded=1")
+        return self.models.LibraryItemExpanded.from_dict(data)
+
+    async def get_library_items(self, item_ids: List[str]) -> List[LibraryItemExpanded]:
+        """
+        Retrieve many expanded library items concurrently, bounded by max_concurrency.
+
+        Args:
+            item_ids (List[str]): The IDs of the library items.
+
+        Returns:
+            List[LibraryItemExpanded]: The library items, in the order of item_ids.
+        """
+        return list(await asyncio.gather(*(self.get_library_item(item_id) for item_id in item_ids)))
+
+    async def get_library_collections(self, library_id: str) -> List[CollectionExpanded]:
+        data = await self._get_json(f"{self.libraries_url}/{library_id}/collections")
+        return self.models.CollectionExpanded.from_list(data['results'])
+
+    async def get_user_playlists(self, library_id: str) -> List[PlaylistExpanded]:
+        data = await self._get_json(f"{self.libraries_url}/{library_id}/playlists")
+        return self.models.PlaylistExpanded.from_list(data['results'])
+
+    async def post_encode_m4b(self, book_id: str) -> 'aiohttp.ClientResponse':
+        url = f"{self.tools_url}/{book_id}/encode-m4b"
+        response, _ = await self._send_request('POST', url)
+        return response
@@ -0,0 +1,161 @@
+"""
+Adaptive concurrency of M4B encodes.
+
+The server encodes books in parallel, up to the number of encodes it is asked for. Too few leave it idle, too
+many make every encode crawl. `AdaptiveConcurrency` measures the throughput of the finished encodes, in seconds of
+audio encoded per wall second, and sets the number of concurrent encodes AIMD style: one more at a time until an
+extra encode stops paying off, then a multiplicative cut, and probing up again from there.
+"""
+import logging
+from dataclasses import dataclass
+from statistics import mean
+from typing import Dict, List, Optional
+
+__all__ = ['AdaptiveConcurrency', 'ConcurrencyDecision']
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConcurrencyDecision:
+    """
+    A change, or not, of the number of concurrent encodes.
+
+    Attributes:
+        slots (int): The number of concurrent encodes measured.
+        throughput (float): The throughput measured at that number, in seconds of audio per wall second.
+        previous_throughput (float or None): The throughput of the measurement before, None for the first one.
+        new_slots (int): The number of concurrent encodes from now on.
+        action (str): 'increase', 'decrease' or 'hold', when the bounds keep the number where it is.
+    """
+    slots: int
+    throughput: float
+    previous_throughput: Optional[float]
+    new_slots: int
+    action: str
+
+
+class AdaptiveConcurrency:
+    """
+    Sets the number of concurrent encodes from the throughput of the finished ones.
+
+    Every encode is recorded with the number of concurrent encodes when it started, and with the most encodes that
+    ran at once, itself included, until it finished. Once sample_size encodes started at the current number have
+    finished, the throughput at that number is the mean speed of those encodes, audio duration over elapsed time,
+    times the mean of the most encodes they ran alongside: slots left idle, for lack of books to encode, add
+    nothing.
+
+    The number is then increased by one, unless the measurement signals congestion: the last increase raised
+    throughput by no more than tolerance, or at an unchanged number throughput fell by more than tolerance.
+    Congestion multiplies the number by decrease_factor, rounded down. The number stays within min_slots and
+    max_slots.
+
+    Example:
+        ```
+        concurrency = AdaptiveConcurrency(initial=2, min_slots=1, max_slots=6)
+        concurrency.started(book.id)
+        ...
+        concurrency.finished(book.id, book.media.duration, elapsed_seconds)
+        scheduler.slots = concurrency.slots
+        ```
+    """
+
+    def __init__(self, initial: int, min_slots: int = 1, max_slots: int = 8, sample_size: Optional[int] = None,
+                 tolerance: float = 0.05, decrease_factor: float = 0.75):
+        """
+        Args:
+            initial (int): The number of concurrent encodes to start at.
+            min_slots (int): The lowest number of concurrent encodes.
+            max_slots (int): The highest number of concurrent encodes.
+            sample_size (int or None): The finished encodes a measurement takes. None takes as many as there are
+                concurrent encodes, and at least 2.
+            tolerance (float): The relative change of throughput treated as noise.
+            decrease_factor (float): The factor the number of concurrent encodes is cut by on congestion.
+
+        Raises:
+            Exception: If the bounds are empty or initial is outside them.
+        """
+        if not 1 <= min_slots <= initial <= max_slots:
+            raise Exception(f"Expected 1 <= min_slots <= initial <= max_slots, got {min_slots}, {initial},"
+                            f" {max_slots}")
+        self.slots = initial
+        self.min_slots = min_slots
+        self.max_slots = max_slots
+        self.sample_size = sample_size
+        self.tolerance = tolerance
+        self.decrease_factor = decrease_factor
+        self.decisions: List[ConcurrencyDecision] = []
+        # number of concurrent encodes when each running encode started
+        self._started: Dict[str, int] = {}
+        # most encodes running at once, itself included, since each running encode started
+        self._peak_running: Dict[str, int] = {}
+        # speeds of the encodes started at the current number of concurrent encodes, and their peak running encodes
+        self._speeds: List[float] = []
+        self._running: List[int] = []
+        self._throughput: Optional[float] = None
+        self._measured_slots: Optional[int] = None
+
+    def started(self, book_id: str):
+        """
+        Records that an encode started.
+        """
+        self._started[book_id] = self.slots
+        running = len(self._started)
+        self._peak_running[book_id] = running
+        for other, peak in self._peak_running.items():
+            if peak < running:
+                self._peak_running[other] = running
+
+    def failed(self, book_id: str):
+        """
+        Records that an encode failed, it is not measured.
+        """
+        self._started.pop(book_id, None)
+        self._peak_running.pop(book_id, None)
+
+    def finished(self, book_id: str, audio_seconds: float, elapsed: float) -> Optional[ConcurrencyDecision]:
+        """
+        Records that an encode finished, and decides on the number of concurrent encodes once enough have.
+
+        Args:
+            book_id (str): The ID of the library item encoded.
+            audio_seconds (float): The duration of the book.
+            elapsed (float): The wall seconds the encode took.
+
+        Returns:
+            ConcurrencyDecision or None: The decision, if one was made.
+        """
+        slots = self._started.pop(book_id, None)
+        running = self._peak_running.pop(book_id, 0)
+        # encodes started before the last decision ran at another number of concurrent encodes
+        if slots != self.slots or elapsed <= 0:
+            return None
+        self._speeds.append(audio_seconds / elapsed)
+        self._running.append(running)
+        if len(self._speeds) < (self.sample_size or max(2, self.slots)):
+            return None
+        return self._decide(mean(self._speeds) * mean(self._running))
+
+    def _decide(self, throughput: float) -> ConcurrencyDecision:
+        previous = self._throughput
+        congested = previous is not None and (
+            (self._measured_slots < self.slots and throughput <= previous * (1 + self.tolerance))
+            or (self._measured_slots == self.slots and throughput < previous * (1 - self.tolerance)))
+        if congested:
+            new_slots, action = max(self.min_slots, int(self.slots * self.decrease_factor)), 'decrease'
+        else:
+            new_slots, action = min(self.max_slots, self.slots + 1), 'increase'
+        if new_slots == self.slots:
+            action = 'hold'
+
+        decision = ConcurrencyDecision(self.slots, throughput, previous, new_slots, action)
+        self.decisions.append(decision)
+        logger.info(f"Encode throughput {throughput:.1f}x realtime at {self.slots} concurrent encodes"
+                    + (f", was {previous:.1f}x" if previous is not None else "")
+                    + f": {action}, {new_slots} concurrent encodes")
+        self._measured_slots = self.slots
+        self.slots = new_slots
+        self._throughput = throughput
+        self._speeds = []
+        self._running = []
+        return decision
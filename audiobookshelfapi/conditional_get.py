@@ -0,0 +1,137 @@
+"""
+Revalidation of GET responses, so an unchanged response is neither downloaded nor decoded again.
+
+`ConditionalCache` keeps, per URL, the validators the server sent with the last response, its ETag and
+Last-Modified, along with a hash of its body and the objects it was decoded to. The next request for the URL sends
+the validators as If-None-Match and If-Modified-Since; a 304 Not Modified answer is served from the decoded objects
+without transferring or parsing the body. When the server sends no validators, or answers in full anyway, a body
+identical to the last one is recognized by its hash and still not decoded again.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+import requests
+
+__all__ = ['ConditionalCache', 'ConditionalStats']
+
+
+@dataclass
+class ConditionalStats:
+    """
+    Counters of a ConditionalCache.
+
+    Attributes:
+        not_modified (int): The responses the server answered with 304 Not Modified.
+        unchanged (int): The full responses whose body hashed the same as the last one.
+        decoded (int): The responses that were new or changed and had to be decoded.
+        evictions (int): The entries dropped to make room for newer ones.
+    """
+    not_modified: int = 0
+    unchanged: int = 0
+    decoded: int = 0
+    evictions: int = 0
+
+
+@dataclass
+class _Entry:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body_hash: bytes
+    value: Any
+
+
+def _body_hash(content: bytes) -> bytes:
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+class ConditionalCache:
+    """
+    The validators, body hashes and decoded objects of the last responses to GET requests, by URL.
+
+    The decoded objects are shared by every caller that gets them from the cache, so they should be treated as
+    read only.
+
+    Example:
+        ```
+        a = AudiobookshelfAPI(url, api_token, conditional_cache=ConditionalCache())
+        a.get_all_library_items(library_id)
+        a.get_all_library_items(library_id)  # 304 Not Modified, nothing is downloaded or decoded
+        ```
+    """
+
+    def __init__(self, max_entries: int = 32):
+        """
+        Args:
+            max_entries (int): The maximum number of responses kept before the least recently used one is dropped.
+                Each entry holds the decoded objects of a whole response, e.g. a library's items.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = ConditionalStats()
+
+    def request_headers(self, key: Hashable) -> dict:
+        """
+        Returns the If-None-Match and If-Modified-Since headers to revalidate the response cached for key.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag is not None:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def resolve(self, key: Hashable, response: requests.Response, decode: Callable[[requests.Response], Any],
+                refetch: Callable[[], requests.Response]) -> Any:
+        """
+        Returns the decoded objects of a response to a request revalidating key.
+
+        Args:
+            key (Hashable): The URL and anything else the decoded objects depend on.
+            response (requests.Response): The response, a 304 or a full one.
+            decode (Callable[[requests.Response], Any]): Parses and decodes the body of a full response.
+            refetch (Callable[[], requests.Response]): Requests the response again without validators, for a 304
+                to validators whose entry another thread evicted in the meantime.
+
+        Returns:
+            Any: The cached objects if the response is a 304 or its body is unchanged, otherwise decode(response).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if response.status_code == 304:
+            if entry is not None:
+                self.stats.not_modified += 1
+                return entry.value
+            # the 304 confirms a response that is no longer cached, it has no body to decode
+            response = refetch()
+
+        body_hash = _body_hash(response.content)
+        if entry is not None and entry.body_hash == body_hash:
+            self.stats.unchanged += 1
+            value = entry.value
+        else:
+            self.stats.decoded += 1
+            value = decode(response)
+        with self._lock:
+            self._entries[key] = _Entry(response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                                        body_hash, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+        return value
+
+    def clear(self):
+        """
+        Drops every cached response.
+        """
+        with self._lock:
+            self._entries.clear()
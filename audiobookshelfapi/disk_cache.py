@@ -0,0 +1,262 @@
+"""
+A persistent SQLite cache of libraries and library items, so a run can start from what the last run saw.
+
+Libraries, library items and the books of library items are stored as JSON in their own tables, next to the
+columns they are looked up by, with indexes on the item ID, libraryId, updatedAt and numAudioFiles. The database
+runs in WAL mode, so another process reading the cache is never blocked by this one writing to it.
+
+Invalidation policy:
+    - Library items are never served without revalidation. LibrarySyncer loads a cached snapshot in place of its
+      first full listing, then syncs incrementally from the cached watermark, so items changed while nothing was
+      running are updated and deleted ones removed, through a full listing, before the snapshot is used.
+    - Libraries are served straight from the cache and refreshed in the background, see
+      `AudiobookshelfAPI.get_all_libraries`. A library that is not in the cache is always fetched.
+    - A snapshot whose last full listing is older than max_age is discarded. This bounds how long changes that do
+      not bump updatedAt, which incremental syncs cannot see, can go unnoticed.
+    - Snapshots are kept per library and per minified, since minified and full items do not mix.
+    - The whole cache is cleared when it was written for another server or by another version of its schema.
+"""
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import Objects
+from audiobookshelfapi.json_backend import get_backend
+
+__all__ = ['DiskCache']
+
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS libraries (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    displayOrder INTEGER,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    libraryId TEXT NOT NULL,
+    minified INTEGER NOT NULL,
+    watermark INTEGER,
+    fullSyncAt REAL NOT NULL,
+    PRIMARY KEY (libraryId, minified)
+);
+CREATE TABLE IF NOT EXISTS library_items (
+    id TEXT NOT NULL,
+    minified INTEGER NOT NULL,
+    libraryId TEXT NOT NULL,
+    updatedAt INTEGER,
+    data BLOB NOT NULL,
+    PRIMARY KEY (id, minified)
+);
+CREATE INDEX IF NOT EXISTS library_items_libraryId ON library_items (libraryId, minified);
+CREATE INDEX IF NOT EXISTS library_items_updatedAt ON library_items (libraryId, updatedAt);
+CREATE TABLE IF NOT EXISTS books (
+    libraryItemId TEXT NOT NULL,
+    minified INTEGER NOT NULL,
+    numAudioFiles INTEGER,
+    duration REAL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (libraryItemId, minified)
+);
+CREATE INDEX IF NOT EXISTS books_numAudioFiles ON books (numAudioFiles);
+"""
+
+
+def _as_dict(obj):
+    # a lazy instance still holds the dictionary it was decoded from, which is cheaper than to_dict
+    raw = getattr(obj, '_raw', None)
+    return raw if raw is not None else obj.to_dict()
+
+
+class DiskCache:
+    """
+    A SQLite database of libraries and library item snapshots.
+
+    An instance can be shared by threads, its statements are serialized by a lock.
+
+    Example:
+        ```
+        with DiskCache('audiobookshelf.sqlite3', a.base_url) as cache:
+            syncer = LibrarySyncer(a, library_id, minified=True, cache=cache)
+            syncer.sync()
+        ```
+    """
+
+    def __init__(self, path: str, server_url: str, max_age: Optional[float] = 7 * 24 * 3600, models=Objects,
+                 json_backend='auto'):
+        """
+        Args:
+            path (str): The path of the database file, created if missing.
+            server_url (str): The URL of the server the cache is for. A cache written for another server is cleared.
+            max_age (float or None): Seconds after the last full listing of a library that its snapshot is
+                discarded. None keeps snapshots indefinitely.
+            models (module): The module of model classes cached objects are decoded into.
+            json_backend (str or JSONBackend): The JSON implementation the rows are stored with.
+        """
+        self.path = path
+        self.server_url = server_url
+        self.max_age = max_age
+        self.models = models
+        self.json = get_backend(json_backend)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # durable up to the last checkpoint, losing the last writes only costs a resync
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._check_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Closes the database.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def _check_meta(self):
+        self._connection.executescript(_SCHEMA)
+        meta = dict(self._connection.execute("SELECT key, value FROM meta"))
+        if meta.get('schema_version') != str(_SCHEMA_VERSION) or meta.get('server_url') != self.server_url:
+            with self._connection:
+                self._connection.execute("BEGIN")
+                for table in ('libraries', 'snapshots', 'library_items', 'books', 'meta'):
+                    self._connection.execute(f"DELETE FROM {table}")
+                self._connection.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                                             [('schema_version', str(_SCHEMA_VERSION)),
+                                              ('server_url', self.server_url)])
+
+    def clear(self, library_id: Optional[str] = None):
+        """
+        Drops the cached libraries and snapshots, or only the snapshots of one library.
+
+        Args:
+            library_id (str or None): The library whose snapshots to drop, None for everything.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            if library_id is None:
+                self._connection.execute("DELETE FROM libraries")
+                self._connection.execute("DELETE FROM snapshots")
+                self._connection.execute("DELETE FROM books")
+                self._connection.execute("DELETE FROM library_items")
+            else:
+                self._delete_snapshot(library_id, None)
+
+    def get_libraries(self) -> List[Objects.Library]:
+        """
+        Returns the cached libraries, in display order. Empty if none were cached.
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT data FROM libraries ORDER BY displayOrder").fetchall()
+        return self.models.Library.from_list([self.json.loads(data) for data, in rows])
+
+    def put_libraries(self, libraries: List[Objects.Library]):
+        """
+        Replaces the cached libraries.
+        """
+        rows = [(library.id, library.name, library.displayOrder, self.json.dumps(_as_dict(library)))
+                for library in libraries]
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.execute("DELETE FROM libraries")
+            self._connection.executemany(
+                "INSERT INTO libraries (id, name, displayOrder, data) VALUES (?, ?, ?, ?)", rows)
+
+    def load_snapshot(self, library_id: str, minified: bool) -> Optional[Tuple[Dict[str, Objects.Base], int]]:
+        """
+        Loads the snapshot of a library saved by save_snapshot.
+
+        Args:
+            library_id (str): The ID of the library.
+            minified (bool): Whether to load the snapshot of minified library items.
+
+        Returns:
+            tuple or None: The library items by ID and the watermark of the snapshot, or None if there is no
+                snapshot or it is older than max_age.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT watermark, fullSyncAt FROM snapshots WHERE libraryId = ?"
+                                           " AND minified = ?", (library_id, minified)).fetchone()
+            if row is None:
+                return None
+            watermark, full_sync_at = row
+            if self.max_age is not None and time.time() - full_sync_at > self.max_age:
+                return None
+            rows = self._connection.execute(
+                "SELECT library_items.data, books.data FROM library_items LEFT JOIN books"
+                " ON books.libraryItemId = library_items.id AND books.minified = library_items.minified"
+                " WHERE library_items.libraryId = ? AND library_items.minified = ?", (library_id, minified)).fetchall()
+        loads = self.json.loads
+        items = []
+        for item_data, book_data in rows:
+            item = loads(item_data)
+            if book_data is not None:
+                item['media'] = loads(book_data)
+            items.append(item)
+        cls = self.models.LibraryItemMinified if minified else self.models.LibraryItem
+        decoded = cls.from_list(items)
+        return {item.id: item for item in decoded}, watermark
+
+    def save_snapshot(self, library_id: str, minified: bool, watermark: Optional[int], upserted, removed=(),
+                      full: bool = False):
+        """
+        Writes the changes of a sync to the snapshot of a library.
+
+        Args:
+            library_id (str): The ID of the library.
+            minified (bool): Whether the library items are minified.
+            watermark (int or None): The watermark of the syncer after the sync.
+            upserted (Iterable[LibraryItem]): The library items added or updated.
+            removed (Iterable[str]): The IDs of the library items removed.
+            full (bool): Whether upserted is the whole library, which replaces the snapshot.
+        """
+        item_rows = []
+        book_rows = []
+        dumps = self.json.dumps
+        for item in upserted:
+            data = dict(_as_dict(item))
+            if data.get('mediaType') == 'book' and data.get('media') is not None:
+                book = data.pop('media')
+                book_rows.append((item.id, minified, book.get('numAudioFiles'), book.get('duration'), dumps(book)))
+            item_rows.append((item.id, minified, library_id, data.get('updatedAt'), dumps(data)))
+        removed_rows = [(item_id, minified) for item_id in removed]
+
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            if full:
+                self._delete_snapshot(library_id, minified)
+                self._connection.execute("INSERT INTO snapshots (libraryId, minified, watermark, fullSyncAt)"
+                                         " VALUES (?, ?, ?, ?)", (library_id, minified, watermark, time.time()))
+            else:
+                self._connection.execute("UPDATE snapshots SET watermark = ? WHERE libraryId = ? AND minified = ?",
+                                         (watermark, library_id, minified))
+            self._connection.executemany("DELETE FROM library_items WHERE id = ? AND minified = ?", removed_rows)
+            self._connection.executemany("DELETE FROM books WHERE libraryItemId = ? AND minified = ?", removed_rows)
+            # an item that stopped being a book must not keep its old book row
+            self._connection.executemany("DELETE FROM books WHERE libraryItemId = ? AND minified = ?",
+                                         [row[:2] for row in item_rows])
+            self._connection.executemany("INSERT OR REPLACE INTO library_items (id, minified, libraryId, updatedAt,"
+                                         " data) VALUES (?, ?, ?, ?, ?)", item_rows)
+            self._connection.executemany("INSERT OR REPLACE INTO books (libraryItemId, minified, numAudioFiles,"
+                                         " duration, data) VALUES (?, ?, ?, ?, ?)", book_rows)
+
+    def _delete_snapshot(self, library_id: str, minified: Optional[bool]):
+        # minified None deletes both snapshots of the library
+        condition = "libraryId = ?" if minified is None else "libraryId = ? AND minified = ?"
+        args = (library_id,) if minified is None else (library_id, minified)
+        self._connection.execute(f"DELETE FROM snapshots WHERE {condition}", args)
+        self._connection.execute(f"DELETE FROM books WHERE (libraryItemId, minified) IN"
+                                 f" (SELECT id, minified FROM library_items WHERE {condition})", args)
+        self._connection.execute(f"DELETE FROM library_items WHERE {condition}", args)
@@ -0,0 +1,275 @@
+"""
+A persisted history of M4B encodes, and a model of encode times fitted to it.
+
+`EncodeHistory` stores, for every finished encode, what the book looked like (duration, number of audio files,
+size, codec and bit rate), how many encodes ran alongside it and how long it took, in a SQLite database.
+`EncodePredictor` fits encode time to those features by regularized least squares and estimates the encode time
+of books waiting to be encoded, for the scheduler to only start books that finish before the window closes.
+"""
+import sqlite3
+import threading
+import time
+from dataclasses import astuple, dataclass, fields
+from typing import Iterable, List, Optional, Sequence
+
+from audiobookshelfapi.scheduler import book_size
+
+__all__ = ['EncodeRecord', 'EncodeHistory', 'EncodePredictor']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS encodes (
+    libraryItemId TEXT NOT NULL,
+    duration REAL NOT NULL,
+    numAudioFiles INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    codec TEXT,
+    bitRate INTEGER,
+    concurrent INTEGER NOT NULL,
+    elapsed REAL NOT NULL,
+    finishedAt REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS encodes_finishedAt ON encodes (finishedAt);
+"""
+
+
+@dataclass
+class EncodeRecord:
+    """
+    A finished encode.
+
+    Attributes:
+        libraryItemId (str): The ID of the library item encoded.
+        duration (float): The length (in seconds) of the book.
+        numAudioFiles (int): The number of audio files the book had.
+        size (int): The total size (in bytes) of the book's audio files.
+        codec (str or None): The codec of the book's audio files, the most common one if they differ. Will be None
+            if unknown, as for minified library items.
+        bitRate (int or None): The mean bit rate (in bit/s) of the book's audio files. Will be None if unknown.
+        concurrent (int): The number of encodes running, this one included, when it started.
+        elapsed (float): The wall seconds the encode took.
+        finishedAt (float): The time (in s since POSIX epoch) when the encode finished.
+    """
+    libraryItemId: str
+    duration: float
+    numAudioFiles: int
+    size: int
+    codec: Optional[str]
+    bitRate: Optional[int]
+    concurrent: int
+    elapsed: float
+    finishedAt: float
+
+    @classmethod
+    def from_book(cls, book, concurrent: int, elapsed: float, finished_at: Optional[float] = None) -> 'EncodeRecord':
+        """
+        Creates the record of the encode of a library item, minified or full.
+
+        Args:
+            book (LibraryItem or LibraryItemMinified): The library item as it was before the encode.
+            concurrent (int): The number of encodes running, this one included, when it started.
+            elapsed (float): The wall seconds the encode took.
+            finished_at (float or None): The time (in s since POSIX epoch) when it finished, None for now.
+        """
+        codec, bit_rate = _audio_format(book)
+        return cls(book.id, book.media.duration, book.media.numAudioFiles, book_size(book), codec, bit_rate,
+                   concurrent, elapsed, time.time() if finished_at is None else finished_at)
+
+
+_COLUMNS = ', '.join(field.name for field in fields(EncodeRecord))
+_PLACEHOLDERS = ', '.join('?' for _ in fields(EncodeRecord))
+
+
+def _audio_format(book):
+    # the codec and mean bit rate of the audio files of a full library item, None for a minified one
+    audio_files = getattr(book.media, 'audioFiles', None)
+    if not audio_files:
+        return None, None
+    codecs = [audio_file.codec for audio_file in audio_files]
+    bit_rates = [audio_file.bitRate for audio_file in audio_files if audio_file.bitRate]
+    return max(set(codecs), key=codecs.count), int(sum(bit_rates) / len(bit_rates)) if bit_rates else None
+
+
+class EncodeHistory:
+    """
+    A SQLite database of finished encodes.
+
+    An instance can be shared by threads, its statements are serialized by a lock.
+
+    Example:
+        ```
+        with EncodeHistory('encode_history.sqlite3') as history:
+            history.add(EncodeRecord.from_book(book, concurrent=2, elapsed=840.0))
+            predictor = EncodePredictor()
+            predictor.fit(history.records())
+        ```
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The path of the database file, created if missing.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._lock:
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Closes the database.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def add(self, record: EncodeRecord):
+        """
+        Stores a finished encode.
+        """
+        with self._lock:
+            self._connection.execute(f"INSERT INTO encodes ({_COLUMNS}) VALUES ({_PLACEHOLDERS})", astuple(record))
+
+    def records(self, limit: Optional[int] = None) -> List[EncodeRecord]:
+        """
+        Returns the stored encodes, oldest first.
+
+        Args:
+            limit (int or None): Only return the most recent ones, None for all of them.
+        """
+        with self._lock:
+            rows = self._connection.execute(f"SELECT {_COLUMNS} FROM encodes ORDER BY finishedAt DESC"
+                                            + (" LIMIT ?" if limit is not None else ""),
+                                            (limit,) if limit is not None else ()).fetchall()
+        return [EncodeRecord(*row) for row in reversed(rows)]
+
+
+def _features(duration: float, num_audio_files: int, size: int, codec: Optional[str], bit_rate: Optional[int],
+              concurrent: int) -> List[float]:
+    # in hours of audio and gigabytes, so the coefficients are of similar scale. Encoding time grows with the audio
+    # to encode, slower for the many small files of a book and for encodes sharing the server, and depends on the
+    # source codec and bit rate; unknown bit rates count as 128 kbit/s
+    hours = duration / 3600
+    return [
+        1.0,
+        hours,
+        float(num_audio_files),
+        size / 1e9,
+        hours if codec == 'aac' else 0.0,
+        hours * (bit_rate or 128000) / 128000,
+        hours * (concurrent - 1),
+    ]
+
+
+_NUM_FEATURES = len(_features(0, 0, 0, None, None, 1))
+
+
+def _solve(a: List[List[float]], b: List[float]) -> List[float]:
+    # Gaussian elimination with partial pivoting, the system is tiny
+    n = len(b)
+    m = [row[:] + [b[i]] for i, row in enumerate(a)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        m[col], m[pivot] = m[pivot], m[col]
+        if m[col][col] == 0:
+            continue
+        for r in range(col + 1, n):
+            factor = m[r][col] / m[col][col]
+            for c in range(col, n + 1):
+                m[r][c] -= factor * m[col][c]
+    x = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        if m[r][r] != 0:
+            x[r] = (m[r][n] - sum(m[r][c] * x[c] for c in range(r + 1, n))) / m[r][r]
+    return x
+
+
+class EncodePredictor:
+    """
+    Estimates how long encoding a book takes, from the history of finished encodes.
+
+    Encode time is fitted as a linear function of the hours of audio, the number of audio files, the size, the
+    hours of AAC audio, the hours weighted by bit rate and the hours times the other encodes running, by least
+    squares with a ridge penalty that keeps the fit stable on a short or uniform history. Until the history holds
+    min_records encodes, a book is estimated at its duration over fallback_speed.
+
+    Example:
+        ```
+        predictor = EncodePredictor(fallback_speed=40)
+        predictor.fit(history.records(limit=500))
+        scheduler = EncodeScheduler(2, estimate=predictor.predict)
+        ```
+    """
+
+    def __init__(self, fallback_speed: float = 40, min_records: int = 2 * _NUM_FEATURES, ridge: float = 1e-3):
+        """
+        Args:
+            fallback_speed (float): Seconds of audio encoded per second, used until there is enough history.
+            min_records (int): The number of finished encodes needed to fit the model.
+            ridge (float): The weight of the penalty on large coefficients, the intercept excluded.
+        """
+        self.fallback_speed = fallback_speed
+        self.min_records = min_records
+        self.ridge = ridge
+        self.coefficients: Optional[List[float]] = None
+
+    @property
+    def fitted(self) -> bool:
+        """
+        Whether the model was fitted, rather than estimating from fallback_speed.
+        """
+        return self.coefficients is not None
+
+    def fit(self, records: Sequence[EncodeRecord]):
+        """
+        Fits the model to finished encodes. Too few of them leave it estimating from fallback_speed.
+        """
+        if len(records) < self.min_records:
+            self.coefficients = None
+            return
+        xtx = [[0.0] * _NUM_FEATURES for _ in range(_NUM_FEATURES)]
+        xty = [0.0] * _NUM_FEATURES
+        for record in records:
+            x = _features(record.duration, record.numAudioFiles, record.size, record.codec, record.bitRate,
+                          record.concurrent)
+            for i in range(_NUM_FEATURES):
+                xty[i] += x[i] * record.elapsed
+                for j in range(_NUM_FEATURES):
+                    xtx[i][j] += x[i] * x[j]
+        for i in range(1, _NUM_FEATURES):
+            xtx[i][i] += self.ridge * len(records)
+        self.coefficients = _solve(xtx, xty)
+
+    def predict(self, book, concurrent: int = 1) -> float:
+        """
+        Estimates the wall seconds encoding a library item, minified or full, takes.
+
+        Args:
+            book (LibraryItem or LibraryItemMinified): The library item.
+            concurrent (int): The number of encodes running, this one included.
+
+        Returns:
+            float: The estimated encode time in seconds, at least one.
+        """
+        codec, bit_rate = _audio_format(book)
+        return self._predict(book.media.duration, book.media.numAudioFiles, book_size(book), codec, bit_rate,
+                             concurrent)
+
+    def predict_records(self, records: Iterable[EncodeRecord]) -> List[float]:
+        """
+        Estimates the encode time of recorded encodes, to measure the error of the model.
+        """
+        return [self._predict(record.duration, record.numAudioFiles, record.size, record.codec, record.bitRate,
+                              record.concurrent) for record in records]
+
+    def _predict(self, duration, num_audio_files, size, codec, bit_rate, concurrent) -> float:
+        if self.coefficients is None:
+            return duration / self.fallback_speed
+        x = _features(duration, num_audio_files, size, codec, bit_rate, concurrent)
+        return max(1.0, sum(c * v for c, v in zip(self.coefficients, x)))
@@ -0,0 +1,200 @@
+"""
+A crash-safe journal of M4B encodes, so a restarted run resumes the encodes of the one before.
+
+Every step of an encode is appended to a SQLite table as it happens: `submitting` before the encode is requested,
+`started` once the server accepted it, then `finished` or `failed`. Rows are never updated, the state of an encode
+is its last row, and every append is synced to disk before the call returns. A run that dies leaves the encodes it
+had open as `submitting` or `started`; `EncodeJournal.reconcile` checks those against what the server is encoding
+and what it already encoded, so the next run waits for them instead of requesting them again.
+"""
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Collection, Dict, List, Optional
+
+__all__ = ['EncodeJournal', 'JournalEntry', 'SUBMITTING', 'STARTED', 'FINISHED', 'FAILED', 'LOST']
+
+SUBMITTING = 'submitting'
+STARTED = 'started'
+FINISHED = 'finished'
+FAILED = 'failed'
+# an open encode the server is neither running nor has finished, after a restart of the run or of the server
+LOST = 'lost'
+
+_OPEN_STATES = (SUBMITTING, STARTED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    libraryItemId TEXT NOT NULL,
+    state TEXT NOT NULL,
+    concurrent INTEGER,
+    startedAt REAL NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS journal_libraryItemId ON journal (libraryItemId, seq);
+"""
+
+
+@dataclass
+class JournalEntry:
+    """
+    The last journaled step of the encode of a library item.
+
+    Attributes:
+        libraryItemId (str): The ID of the library item encoded.
+        state (str): 'submitting', 'started', 'finished', 'failed' or 'lost'.
+        concurrent (int or None): The number of encodes running, this one included, when it was submitted.
+        startedAt (float): The time (in s since POSIX epoch) when the encode was submitted.
+        at (float): The time (in s since POSIX epoch) of this step.
+    """
+    libraryItemId: str
+    state: str
+    concurrent: Optional[int]
+    startedAt: float
+    at: float
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Whether the encode was submitted and not seen finishing, failing or lost.
+        """
+        return self.state in _OPEN_STATES
+
+
+class EncodeJournal:
+    """
+    An append-only SQLite journal of encodes.
+
+    An instance can be shared by threads, its statements are serialized by a lock.
+
+    Example:
+        ```
+        with EncodeJournal('encode_journal.sqlite3') as journal:
+            for entry in journal.reconcile(running_ids, multitrack_ids):
+                ...  # still encoding on the server, wait for it
+            journal.submitting(book.id, concurrent=2)
+            a.post_encode_m4b(book.id)
+            journal.started(book.id)
+        ```
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The path of the database file, created if missing.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # every append is on disk before it returns, the journal is what a crashed run is resumed from
+        self._connection.execute("PRAGMA synchronous=FULL")
+        with self._lock:
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Closes the database.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def _append(self, item_id: str, state: str, concurrent: Optional[int] = None, started_at: Optional[float] = None):
+        now = time.time()
+        with self._lock:
+            if started_at is None or concurrent is None:
+                row = self._connection.execute(
+                    "SELECT concurrent, startedAt FROM journal WHERE libraryItemId = ? ORDER BY seq DESC LIMIT 1",
+                    (item_id,)).fetchone()
+                if row is not None:
+                    concurrent = row[0] if concurrent is None else concurrent
+                    started_at = row[1] if started_at is None else started_at
+            self._connection.execute(
+                "INSERT INTO journal (libraryItemId, state, concurrent, startedAt, at) VALUES (?, ?, ?, ?, ?)",
+                (item_id, state, concurrent, now if started_at is None else started_at, now))
+
+    def submitting(self, item_id: str, concurrent: int):
+        """
+        Journals that the encode of a library item is about to be requested.
+
+        Args:
+            item_id (str): The ID of the library item.
+            concurrent (int): The number of encodes running, this one included.
+        """
+        self._append(item_id, SUBMITTING, concurrent, time.time())
+
+    def started(self, item_id: str):
+        """
+        Journals that the server accepted the encode of a library item.
+        """
+        self._append(item_id, STARTED)
+
+    def finished(self, item_id: str):
+        """
+        Journals that the encode of a library item finished.
+        """
+        self._append(item_id, FINISHED)
+
+    def failed(self, item_id: str):
+        """
+        Journals that the encode of a library item failed.
+        """
+        self._append(item_id, FAILED)
+
+    def entries(self) -> Dict[str, JournalEntry]:
+        """
+        Returns the last journaled step of every library item, by library item ID.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT libraryItemId, state, concurrent, startedAt, at FROM journal"
+                " WHERE seq IN (SELECT MAX(seq) FROM journal GROUP BY libraryItemId) ORDER BY seq").fetchall()
+        return {row[0]: JournalEntry(*row) for row in rows}
+
+    def open_entries(self) -> List[JournalEntry]:
+        """
+        Returns the encodes submitted and not seen finishing, failing or lost, oldest first.
+        """
+        return [entry for entry in self.entries().values() if entry.is_open]
+
+    def count(self, state: str) -> int:
+        """
+        Returns the number of library items whose last journaled step is state.
+        """
+        return sum(1 for entry in self.entries().values() if entry.state == state)
+
+    def reconcile(self, running_ids: Optional[Collection[str]], multitrack_ids: Collection[str]) \
+            -> List[JournalEntry]:
+        """
+        Settles the encodes a previous run left open against the state of the server.
+
+        An open encode the server is running is still encoding. One whose library item is no longer multitrack
+        finished while nothing was watching, and is journaled finished. Any other one never reached the server or
+        was dropped by it, and is journaled lost so it can be requested again.
+
+        Args:
+            running_ids (collection of str or None): The IDs of the library items the server is encoding. None if
+                the server could not tell, every open encode whose library item is still multitrack is then taken
+                to be encoding, so none is requested twice.
+            multitrack_ids (collection of str): The IDs of the library items still multitrack.
+
+        Returns:
+            list of JournalEntry: The open encodes still encoding, oldest first.
+        """
+        encoding = []
+        for entry in self.open_entries():
+            if entry.libraryItemId not in multitrack_ids:
+                self.finished(entry.libraryItemId)
+            elif running_ids is None or entry.libraryItemId in running_ids:
+                encoding.append(entry)
+            else:
+                self._append(entry.libraryItemId, LOST)
+        return encoding
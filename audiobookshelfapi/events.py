@@ -0,0 +1,245 @@
+"""
+Typed subscriptions to the events the Audiobookshelf server pushes over socket.io.
+
+`EventStream` keeps one authenticated SocketClient and decodes the payload of each event once, into the model it
+carries, e.g. item_updated into a LibraryItemExpanded. Handlers are called on a fixed pool of worker threads,
+rather than on the thread python-socketio starts for every event. Every handler has its own bounded queue, drained
+by one worker at a time, so a handler sees its events one at a time and in the order they were queued, and a slow
+handler only falls behind on its own: once its queue is full its oldest events are dropped, and counted, instead
+of piling up threads or holding up the other handlers.
+
+Events are queued in the order their threads reach the stream, which is the order they arrived unless two arrive
+within moments of each other.
+"""
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from functools import partial
+from typing import Any, Callable, Optional, Union
+
+import Objects
+from audiobookshelfapi.socket_client import SocketClient
+from audiobookshelfenums import SocketEvent
+
+__all__ = ['EventStream', 'EventStats', 'EVENT_MODELS']
+
+logger = logging.getLogger(__name__)
+
+# the name of the model each event's payload is decoded into, looked up in the models module of the stream. A list
+# payload, as of items_added, is decoded into a list of the model. Events not listed are passed on as parsed JSON
+EVENT_MODELS = {
+    SocketEvent.ITEM_ADDED: 'LibraryItemExpanded',
+    SocketEvent.ITEM_UPDATED: 'LibraryItemExpanded',
+    SocketEvent.ITEM_REMOVED: 'LibraryItemExpanded',
+    SocketEvent.ITEMS_ADDED: 'LibraryItemExpanded',
+    SocketEvent.ITEMS_UPDATED: 'LibraryItemExpanded',
+    SocketEvent.LIBRARY_ADDED: 'Library',
+    SocketEvent.LIBRARY_UPDATED: 'Library',
+    SocketEvent.LIBRARY_REMOVED: 'Library',
+    SocketEvent.EPISODE_DOWNLOAD_QUEUED: 'PodcastEpisodeDownload',
+    SocketEvent.EPISODE_DOWNLOAD_STARTED: 'PodcastEpisodeDownload',
+    SocketEvent.EPISODE_DOWNLOAD_FINISHED: 'PodcastEpisodeDownload',
+}
+
+_MODELS_BY_NAME = {event.value: model for event, model in EVENT_MODELS.items()}
+
+# events a worker hands to one handler before giving other handlers a turn
+_BATCH_SIZE = 16
+
+
+@dataclass
+class EventStats:
+    """
+    Counters of an EventStream.
+
+    Attributes:
+        received (int): The events received that had at least one handler.
+        handled (int): The calls of handlers that returned.
+        failed (int): The calls of handlers that raised, and the events whose payload could not be decoded.
+        dropped (int): The events dropped from the queue of a handler that had fallen behind.
+    """
+    received: int = 0
+    handled: int = 0
+    failed: int = 0
+    dropped: int = 0
+
+
+class _Subscription:
+    # a handler and the events queued for it. scheduled is True while a worker is draining the queue
+    def __init__(self, handler: Callable[[Any], None], max_pending: int):
+        self.handler = handler
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.scheduled = False
+
+
+class EventStream:
+    """
+    Dispatches the server's events, decoded, to handlers on a pool of worker threads.
+
+    Decoded objects are shared by every handler of the event, so they should be treated as read only.
+
+    Example:
+        ```
+        with EventStream(url, api_token) as events:
+            events.on(SocketEvent.ITEM_UPDATED, lambda item: print(item.media.metadata.title))
+            events.on(SocketEvent.SCAN_COMPLETE, lambda scan: print(scan['name']))
+            events.connect()
+            ...
+        ```
+    """
+
+    def __init__(self, url: str, api_token: str, models=Objects, workers: int = 4, max_pending: int = 1000,
+                 reconnection: bool = True):
+        """
+        Args:
+            url (str): URL of the Audiobookshelf server.
+            api_token (str): API token of the user to act as.
+            models (module): The module of model classes payloads are decoded into, Objects or SlottedObjects.
+            workers (int): The number of threads handlers are called on.
+            max_pending (int): The default number of events queued for a handler before its oldest are dropped.
+            reconnection (bool): Whether to reconnect when the connection drops.
+
+        Raises:
+            Exception: If python-socketio is not installed.
+        """
+        self.models = models
+        self.max_pending = max_pending
+        self.stats = EventStats()
+        self._socket = SocketClient(url, api_token, reconnection=reconnection)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='audiobookshelf-events')
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def connected(self) -> bool:
+        """
+        Whether the connection is up and authenticated, i.e. events are being received.
+        """
+        return self._socket.connected
+
+    def on(self, event: Union[SocketEvent, str], handler: Callable[[Any], None], max_pending: Optional[int] = None):
+        """
+        Registers a handler for an event. The handler is called with the decoded payload of every occurrence of the
+        event, one at a time.
+
+        Args:
+            event (SocketEvent or str): The event.
+            handler (Callable[[Any], None]): Called with the payload, decoded as listed in EVENT_MODELS.
+            max_pending (int or None): The number of events queued for the handler before its oldest are dropped.
+                None uses the stream's max_pending.
+        """
+        name = event.value if isinstance(event, Enum) else event
+        subscription = _Subscription(handler, self.max_pending if max_pending is None else max_pending)
+        with self._lock:
+            if name not in self._subscriptions:
+                self._subscriptions[name] = []
+                self._socket.on(name, partial(self._on_event, name))
+            self._subscriptions[name].append(subscription)
+
+    def off(self, event: Union[SocketEvent, str], handler: Callable[[Any], None]):
+        """
+        Unregisters a handler registered with `on`. Events already queued for it are dropped.
+        """
+        name = event.value if isinstance(event, Enum) else event
+        with self._lock:
+            subscriptions = self._subscriptions.get(name, [])
+            for subscription in subscriptions:
+                if subscription.handler == handler:
+                    subscription.pending.clear()
+                    subscriptions.remove(subscription)
+                    return
+        raise ValueError(f"No handler {handler} registered for {name}")
+
+    def connect(self, timeout: float = 10):
+        """
+        Connects to the server and authenticates with the API token.
+
+        Args:
+            timeout (float): Seconds to wait for the server to accept the token.
+
+        Raises:
+            Exception: If the server cannot be reached or does not accept the token in time.
+        """
+        self._socket.connect(timeout=timeout)
+
+    def close(self):
+        """
+        Closes the connection and waits for the handlers running to return. Queued events are dropped.
+        """
+        self._socket.disconnect()
+        with self._lock:
+            self._closed = True
+            for subscriptions in self._subscriptions.values():
+                for subscription in subscriptions:
+                    subscription.pending.clear()
+        self._executor.shutdown(wait=True)
+
+    def _decode(self, name: str, data):
+        model = _MODELS_BY_NAME.get(name)
+        if model is None or data is None:
+            return data
+        cls = getattr(self.models, model)
+        return cls.from_list(data) if isinstance(data, list) else cls.from_dict(data)
+
+    def _on_event(self, name: str, data=None):
+        # runs on the connection's thread, so it only decodes and queues
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(name, ()))
+            if not subscriptions:
+                return
+            self.stats.received += 1
+        try:
+            payload = self._decode(name, data)
+        except Exception:
+            with self._lock:
+                self.stats.failed += 1
+            logger.exception(f"Payload of socket event {name} could not be decoded")
+            return
+
+        with self._lock:
+            if self._closed:
+                return
+            for subscription in subscriptions:
+                if len(subscription.pending) >= subscription.max_pending:
+                    subscription.pending.popleft()
+                    self.stats.dropped += 1
+                subscription.pending.append(payload)
+                if not subscription.scheduled:
+                    subscription.scheduled = True
+                    self._executor.submit(self._drain, name, subscription)
+
+    def _drain(self, name: str, subscription: _Subscription):
+        for _ in range(_BATCH_SIZE):
+            with self._lock:
+                if not subscription.pending:
+                    subscription.scheduled = False
+                    return
+                payload = subscription.pending.popleft()
+            try:
+                subscription.handler(payload)
+            except Exception:
+                # a failing handler must not stop the ones after it
+                logger.exception(f"Handler of socket event {name} failed")
+                with self._lock:
+                    self.stats.failed += 1
+            else:
+                with self._lock:
+                    self.stats.handled += 1
+        # give the handlers of other events a turn before carrying on. Submitting under the lock, close cannot
+        # shut the executor down between the check and the submit
+        with self._lock:
+            if self._closed:
+                subscription.scheduled = False
+                return
+            self._executor.submit(self._drain, name, subscription)
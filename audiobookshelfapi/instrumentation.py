@@ -0,0 +1,347 @@
+"""
+Per-request instrumentation of AudiobookshelfAPI.
+
+With an `Instrumentation` passed to the client, every call to the server produces a `RequestRecord`: the method,
+the endpoint template, the status, the bytes sent and received, and the seconds spent in each phase, waiting for
+the response headers (connecting, sending and the server's own time), downloading the body, parsing the JSON and
+decoding it into the models. Records are passed to hooks, plain callables. `HistogramAggregator` is a hook that
+keeps histograms of every phase by endpoint, and `prometheus_text` renders it in the Prometheus text format, which
+`serve_prometheus` serves for scraping.
+"""
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+__all__ = ['RequestRecord', 'Instrumentation', 'Histogram', 'HistogramAggregator', 'endpoint_template',
+           'prometheus_text', 'serve_prometheus', 'PHASES']
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('wait', 'download', 'parse', 'decode', 'total')
+
+# path segments followed by an ID, which endpoint_template replaces with {id}
+_COLLECTIONS = {'libraries', 'items', 'item', 'collections', 'playlists', 'series', 'authors', 'users', 'podcasts',
+                'sessions', 'episodes', 'progress', 'backups', 'notifications'}
+# fixed path segments that follow a collection name instead of an ID
+_ACTIONS = {'batch', 'search', 'stats', 'filterdata', 'personalized', 'recent-episodes', 'listening-stats',
+            'listening-sessions', 'items-in-progress'}
+
+# seconds, from a cached response to a full listing of a large library
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def endpoint_template(url: str) -> str:
+    """
+    Returns the path of a request URL with its IDs replaced by {id}, to group the requests to an endpoint.
+
+    Example:
+        ```
+        endpoint_template('http://abs:13378/api/libraries/lib_1/items?limit=50')  # '/api/libraries/{id}/items'
+        ```
+    """
+    segments = urlsplit(url).path.split('/')
+    for i in range(1, len(segments)):
+        if segments[i - 1] in _COLLECTIONS and segments[i] and segments[i] not in _ACTIONS:
+            segments[i] = '{id}'
+    return '/'.join(segments)
+
+
+@dataclass
+class RequestRecord:
+    """
+    The timings and sizes of one call to the server.
+
+    Attributes:
+        method (str): The HTTP method.
+        endpoint (str): The path of the URL with its IDs replaced by {id}, see endpoint_template.
+        url (str): The URL requested.
+        status (int or None): The HTTP status. Will be None if no response arrived.
+        request_bytes (int): The size of the request body.
+        response_bytes (int): The size of the response body. For streamed responses, its Content-Length.
+        wait (float): Seconds until the response headers arrived, connecting, sending and the server's time.
+        download (float): Seconds reading the response body.
+        parse (float): Seconds parsing the JSON of the body.
+        decode (float): Seconds decoding the parsed JSON into the models.
+        total (float): Seconds the whole call took, the phases and the client's own work between them.
+        error (str or None): The exception the call raised, None if it succeeded.
+        started_at (float): The time (in s since POSIX epoch) when the call started.
+    """
+    method: str = ''
+    endpoint: str = ''
+    url: str = ''
+    status: Optional[int] = None
+    request_bytes: int = 0
+    response_bytes: int = 0
+    wait: float = 0.0
+    download: float = 0.0
+    parse: float = 0.0
+    decode: float = 0.0
+    total: float = 0.0
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+
+    def phases(self) -> Dict[str, float]:
+        """
+        Returns the seconds of each phase, by name.
+        """
+        return {phase: getattr(self, phase) for phase in PHASES}
+
+
+class Instrumentation:
+    """
+    Passes the record of every call to the server to hooks.
+
+    A hook is a callable taking a RequestRecord. Hooks run on the thread that made the call, right after it, so
+    they should be quick; an exception in a hook is logged and does not fail the call.
+
+    Example:
+        ```
+        stats = HistogramAggregator()
+        a = AudiobookshelfAPI(url, api_token, instrumentation=Instrumentation([stats, print]))
+        a.get_all_libraries()
+        print(prometheus_text(stats))
+        ```
+    """
+
+    def __init__(self, hooks: Iterable[Callable[[RequestRecord], None]] = ()):
+        """
+        Args:
+            hooks (iterable of callables): The hooks to pass records to.
+        """
+        self._hooks: Tuple[Callable[[RequestRecord], None], ...] = tuple(hooks)
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[RequestRecord], None]):
+        """
+        Adds a hook, passed the records of the calls from now on.
+        """
+        with self._lock:
+            self._hooks += (hook,)
+
+    def remove_hook(self, hook: Callable[[RequestRecord], None]):
+        """
+        Removes a hook.
+        """
+        with self._lock:
+            self._hooks = tuple(h for h in self._hooks if h is not hook)
+
+    def emit(self, record: RequestRecord):
+        """
+        Passes a record to every hook.
+        """
+        for hook in self._hooks:
+            try:
+                hook(record)
+            except Exception:
+                logger.exception(f"Instrumentation hook {hook!r} failed")
+
+
+class Histogram:
+    """
+    Counts of observed values by bucket, like a Prometheus histogram.
+
+    Attributes:
+        buckets (tuple of float): The upper bounds of the buckets, ascending; values above the last one are only
+            counted in the total.
+        counts (list of int): The number of values at most each bound, per bucket and not cumulative.
+        count (int): The number of values observed.
+        sum (float): The sum of the values observed.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """
+        Counts a value.
+        """
+        self.count += 1
+        self.sum += value
+        i = bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            self.counts[i] += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile of the values observed, interpolating within its bucket. Values past the last bucket
+        are estimated at its bound.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+        """
+        if self.count == 0:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1]
+
+
+@dataclass
+class _EndpointStats:
+    histograms: Dict[str, Histogram]
+    # responses by status, 0 for calls that got none
+    statuses: Dict[int, int] = field(default_factory=dict)
+    request_bytes: int = 0
+    response_bytes: int = 0
+
+
+class HistogramAggregator:
+    """
+    A hook keeping, for every method and endpoint, a histogram of each phase, the count of calls by status and the
+    bytes transferred.
+
+    An instance can be shared by threads.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets (sequence of float): The upper bounds (in seconds) of the histogram buckets.
+        """
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._endpoints: Dict[Tuple[str, str], _EndpointStats] = {}
+
+    def __call__(self, record: RequestRecord):
+        with self._lock:
+            stats = self._endpoints.get((record.method, record.endpoint))
+            if stats is None:
+                stats = _EndpointStats({phase: Histogram(self.buckets) for phase in PHASES})
+                self._endpoints[(record.method, record.endpoint)] = stats
+            for phase, seconds in record.phases().items():
+                stats.histograms[phase].observe(seconds)
+            status = record.status or 0
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.request_bytes += record.request_bytes
+            stats.response_bytes += record.response_bytes
+
+    def endpoints(self) -> Dict[Tuple[str, str], _EndpointStats]:
+        """
+        Returns the statistics by (method, endpoint). They are the live ones, read them while no call is made.
+        """
+        with self._lock:
+            return dict(self._endpoints)
+
+    def summary(self, phase: str = 'total', q: float = 0.95) -> List[dict]:
+        """
+        Returns a row per endpoint, slowest first by a quantile of a phase.
+
+        Args:
+            phase (str): The phase to rank by, one of PHASES.
+            q (float): The quantile to rank by.
+
+        Returns:
+            list of dict: The method, endpoint, calls, errors, mean and quantile seconds of every phase, and bytes
+                received.
+        """
+        rows = []
+        for (method, endpoint), stats in self.endpoints().items():
+            row = {'method': method, 'endpoint': endpoint, 'calls': stats.histograms['total'].count,
+                   'errors': sum(count for status, count in stats.statuses.items() if status == 0 or status >= 400),
+                   'response_bytes': stats.response_bytes}
+            for name, histogram in stats.histograms.items():
+                row[f'{name}_mean'] = histogram.sum / histogram.count if histogram.count else math.nan
+                row[f'{name}_q'] = histogram.quantile(q)
+            rows.append(row)
+        rows.sort(key=lambda row: row[f'{phase}_q'], reverse=True)
+        return rows
+
+
+def _labels(**labels) -> str:
+    # label values escaped as the text format requires
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def prometheus_text(aggregator: HistogramAggregator, prefix: str = 'audiobookshelf_client') -> str:
+    """
+    Renders the statistics of an aggregator in the Prometheus text exposition format.
+
+    Args:
+        aggregator (HistogramAggregator): The statistics.
+        prefix (str): The prefix of the metric names.
+
+    Returns:
+        str: The metrics: {prefix}_request_seconds, a histogram by method, endpoint and phase,
+            {prefix}_requests_total by method, endpoint and status, and {prefix}_request_bytes_total and
+            {prefix}_response_bytes_total by method and endpoint.
+    """
+    endpoints = sorted(aggregator.endpoints().items())
+    lines = [f"# HELP {prefix}_request_seconds Seconds spent in each phase of a call to the server.",
+             f"# TYPE {prefix}_request_seconds histogram"]
+    for (method, endpoint), stats in endpoints:
+        for phase, histogram in stats.histograms.items():
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                labels = _labels(method=method, endpoint=endpoint, phase=phase, le=f'{bound:g}')
+                lines.append(f"{prefix}_request_seconds_bucket{labels} {cumulative}")
+            labels = _labels(method=method, endpoint=endpoint, phase=phase, le='+Inf')
+            lines.append(f"{prefix}_request_seconds_bucket{labels} {histogram.count}")
+            labels = _labels(method=method, endpoint=endpoint, phase=phase)
+            lines.append(f"{prefix}_request_seconds_sum{labels} {histogram.sum!r}")
+            lines.append(f"{prefix}_request_seconds_count{labels} {histogram.count}")
+    lines += [f"# HELP {prefix}_requests_total Calls to the server by response status, 0 if none arrived.",
+              f"# TYPE {prefix}_requests_total counter"]
+    for (method, endpoint), stats in endpoints:
+        for status, count in sorted(stats.statuses.items()):
+            labels = _labels(method=method, endpoint=endpoint, status=status)
+            lines.append(f"{prefix}_requests_total{labels} {count}")
+    for direction in ('request', 'response'):
+        lines += [f"# HELP {prefix}_{direction}_bytes_total Bytes of the {direction} bodies.",
+                  f"# TYPE {prefix}_{direction}_bytes_total counter"]
+        for (method, endpoint), stats in endpoints:
+            lines.append(f"{prefix}_{direction}_bytes_total{_labels(method=method, endpoint=endpoint)}"
+                         f" {getattr(stats, f'{direction}_bytes')}")
+    return '\n'.join(lines) + '\n'
+
+
+def serve_prometheus(aggregator: HistogramAggregator, port: int = 9464, host: str = '0.0.0.0',
+                     prefix: str = 'audiobookshelf_client') -> ThreadingHTTPServer:
+    """
+    Serves the statistics of an aggregator at /metrics for Prometheus to scrape, from a daemon thread.
+
+    Args:
+        aggregator (HistogramAggregator): The statistics.
+        port (int): The port to listen on, 0 for any free one.
+        host (str): The address to listen on.
+        prefix (str): The prefix of the metric names.
+
+    Returns:
+        ThreadingHTTPServer: The server, call its shutdown method to stop it.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if urlsplit(self.path).path != '/metrics':
+                self.send_error(404)
+                return
+            body = prometheus_text(aggregator, prefix).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,117 @@
+"""
+Pluggable JSON backends for request and response bodies.
+
+Responses are parsed straight from the raw response bytes and payloads are serialized straight to bytes, without
+the intermediate str that `requests`' `response.json()` and `json=` go through. The standard library backend is
+always available; orjson, msgspec and ujson are used when installed.
+"""
+import json
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable
+
+from Objects import Base
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+__all__ = ['JSONBackend', 'available_backends', 'get_backend']
+
+
+def _default(obj):
+    # model objects and enums may be passed in payloads, e.g. the folders and icon of update_library
+    if isinstance(obj, Base):
+        return obj.to_dict()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+@dataclass(frozen=True)
+class JSONBackend:
+    """
+    A JSON implementation.
+
+    Attributes:
+        name (str): The name of the backend.
+        loads (Callable[[bytes], Any]): Parses a JSON document from bytes.
+        dumps (Callable[[Any], bytes]): Serializes an object, model objects and enums included, to JSON bytes.
+    """
+    name: str
+    loads: Callable[[bytes], Any]
+    dumps: Callable[[Any], bytes]
+
+
+def _stdlib_backend():
+    encoder = json.JSONEncoder(default=_default, separators=(',', ':'))
+    return JSONBackend('json', json.loads, lambda obj: encoder.encode(obj).encode())
+
+
+def _orjson_backend():
+    # passing dataclasses through to _default serializes lazy model objects through their fields, not __dict__
+    return JSONBackend('orjson', orjson.loads,
+                       lambda obj: orjson.dumps(obj, default=_default, option=orjson.OPT_PASSTHROUGH_DATACLASS))
+
+
+def _msgspec_backend():
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    return JSONBackend('msgspec', decoder.decode, encoder.encode)
+
+
+def _ujson_backend():
+    return JSONBackend('ujson', ujson.loads, lambda obj: ujson.dumps(obj, default=_default).encode())
+
+
+# fastest first
+_BACKENDS = {
+    'orjson': (orjson, _orjson_backend),
+    'msgspec': (msgspec, _msgspec_backend),
+    'ujson': (ujson, _ujson_backend),
+    'json': (json, _stdlib_backend),
+}
+
+
+def available_backends():
+    """
+    Returns the names of the installed backends, fastest first.
+    """
+    return [name for name, (module, _) in _BACKENDS.items() if module is not None]
+
+
+def get_backend(backend='auto'):
+    """
+    Resolves a JSON backend.
+
+    Args:
+        backend (str or JSONBackend): 'auto' for the fastest installed backend, the name of a backend ('orjson',
+            'msgspec', 'ujson' or 'json'), or a JSONBackend, which is returned as is.
+
+    Returns:
+        JSONBackend: The backend.
+
+    Raises:
+        Exception: If the backend is unknown or not installed.
+    """
+    if isinstance(backend, JSONBackend):
+        return backend
+    if backend == 'auto':
+        backend = available_backends()[0]
+    if backend not in _BACKENDS:
+        raise Exception(f"Unknown JSON backend: {backend}")
+    module, factory = _BACKENDS[backend]
+    if module is None:
+        raise Exception(f"JSON backend {backend} is not installed")
+    return factory()
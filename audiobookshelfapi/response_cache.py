@@ -0,0 +1,198 @@
+"""
+An in-memory cache of decoded responses, for the read-mostly endpoints scripts call over and over.
+
+Entries expire after a time to live set per endpoint, and the least recently used entry is evicted when the cache
+is full. AudiobookshelfAPI invalidates the entries a write makes stale, e.g. update_library drops the cached
+library and the cached list of libraries.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+__all__ = ['CacheStats', 'ResponseCache', 'DEFAULT_TTLS']
+
+# seconds the responses of each endpoint are cached for, endpoints not listed are not cached
+DEFAULT_TTLS = {
+    'libraries': 30,
+    'library': 30,
+    'library_collections': 10,
+    'user_playlists': 10,
+}
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters of a ResponseCache.
+
+    Attributes:
+        hits (int): The lookups answered from the cache.
+        misses (int): The lookups that had to fetch the response, expired entries included.
+        evictions (int): The entries dropped to make room for newer ones.
+        expirations (int): The entries dropped because their time to live had passed.
+        invalidations (int): The entries dropped because a write made them stale.
+        size (int): The number of entries in the cache.
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResponseCache:
+    """
+    A size-bounded LRU cache of decoded responses with a time to live per endpoint.
+
+    Entries are keyed by endpoint and arguments, e.g. ('library', library_id). The cached objects are shared by
+    every caller that gets them, so they should be treated as read only.
+
+    Example:
+        ```
+        cache = ResponseCache(max_entries=128, ttls={'libraries': 60})
+        a = AudiobookshelfAPI(url, api_token, response_cache=cache)
+        a.get_all_libraries()
+        a.get_all_libraries()
+        print(cache.stats())  # CacheStats(hits=1, misses=1, ...)
+        ```
+    """
+
+    def __init__(self, max_entries: int = 256, ttls: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_entries (int): The maximum number of entries before the least recently used one is evicted.
+            ttls (dict or None): Seconds the responses of each endpoint are cached for, by endpoint. Endpoints not
+                listed are not cached. None uses DEFAULT_TTLS.
+            clock (Callable[[], float]): The time source, in seconds.
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.clock = clock
+        self._entries = OrderedDict()
+        # bumped by every invalidation, of a whole endpoint, of one key of an endpoint, or of everything by clear,
+        # so a response fetched while its entry was invalidated is not cached
+        self._generations = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get_or_fetch(self, endpoint: str, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """
+        Returns the cached response of endpoint for key, or fetches and caches it.
+
+        Args:
+            endpoint (str): The endpoint, which sets the time to live.
+            key (Hashable): The arguments the response depends on.
+            fetch (Callable[[], Any]): Fetches and decodes the response on a miss.
+
+        Returns:
+            Any: The decoded response.
+        """
+        ttl = self.ttls.get(endpoint)
+        if not ttl:
+            return fetch()
+        cache_key = (endpoint, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                value, expires = entry
+                if self.clock() < expires:
+                    self._entries.move_to_end(cache_key)
+                    self._stats.hits += 1
+                    return value
+                del self._entries[cache_key]
+                self._stats.expirations += 1
+            self._stats.misses += 1
+            generation = self._generation_of(cache_key)
+        return self._fetch_and_store(cache_key, fetch, ttl, generation)
+
+    def refresh(self, endpoint: str, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """
+        Fetches the response of endpoint for key without looking it up, and caches it in place of the cached one.
+
+        Args:
+            endpoint (str): The endpoint, which sets the time to live.
+            key (Hashable): The arguments the response depends on.
+            fetch (Callable[[], Any]): Fetches and decodes the response.
+
+        Returns:
+            Any: The decoded response.
+        """
+        ttl = self.ttls.get(endpoint)
+        if not ttl:
+            return fetch()
+        cache_key = (endpoint, key)
+        with self._lock:
+            generation = self._generation_of(cache_key)
+        return self._fetch_and_store(cache_key, fetch, ttl, generation)
+
+    def put(self, endpoint: str, key: Hashable, value: Any):
+        """
+        Caches the response of endpoint for key, if endpoint is cached.
+        """
+        ttl = self.ttls.get(endpoint)
+        if not ttl:
+            return
+        with self._lock:
+            self._store((endpoint, key), value, ttl)
+
+    def _fetch_and_store(self, cache_key, fetch, ttl, generation):
+        # fetched outside the lock, so a slow request does not hold up lookups of other entries
+        value = fetch()
+        with self._lock:
+            # an invalidation during the fetch may have come after the server answered, so the response may be
+            # stale already
+            if self._generation_of(cache_key) == generation:
+                self._store(cache_key, value, ttl)
+        return value
+
+    def _generation_of(self, cache_key) -> tuple:
+        return self._generation, self._generations.get(cache_key[0], 0), self._generations.get(cache_key, 0)
+
+    def _store(self, cache_key, value, ttl):
+        self._entries[cache_key] = (value, self.clock() + ttl)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    def invalidate(self, endpoint: str, key: Hashable = None):
+        """
+        Drops the cached responses of endpoint for key, or for every key if key is None.
+        """
+        with self._lock:
+            generation_key = (endpoint, key) if key is not None else endpoint
+            self._generations[generation_key] = self._generations.get(generation_key, 0) + 1
+            if key is not None:
+                stale = [(endpoint, key)] if (endpoint, key) in self._entries else []
+            else:
+                stale = [cache_key for cache_key in self._entries if cache_key[0] == endpoint]
+            for cache_key in stale:
+                del self._entries[cache_key]
+            self._stats.invalidations += len(stale)
+
+    def clear(self):
+        """
+        Drops every cached response. The counters are kept.
+        """
+        with self._lock:
+            self._generation += 1
+            self._stats.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        """
+        Returns a copy of the counters.
+        """
+        with self._lock:
+            return CacheStats(self._stats.hits, self._stats.misses, self._stats.evictions, self._stats.expirations,
+                              self._stats.invalidations, len(self._entries))
@@ -0,0 +1,263 @@
+"""
+Scheduling of M4B encodes: which books to encode next, and whether they finish before the encoding window closes.
+
+An `EncodePolicy` orders the books waiting to be encoded, e.g. shortest first or round robin between authors.
+`EncodeScheduler` fills the free encode slots with the first books in that order that are expected to finish
+inside the window between the configured start and end hours, so long books are started early in the night and
+short ones fill the end of it. It reads the time only from its clock, so it can be driven by a simulated one.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from Objects import LibraryItem, LibraryItemMinified
+
+__all__ = ['EncodePolicy', 'ShortestFirst', 'LargestFirst', 'OldestFirst', 'AuthorFairness', 'PinnedFirst',
+           'POLICIES', 'EncodeScheduler', 'book_author', 'book_size']
+
+Book = Union[LibraryItem, LibraryItemMinified]
+
+
+def book_size(book: Book) -> int:
+    """
+    Returns the total size in bytes of a library item's audio files, from minified or full items.
+    """
+    size = getattr(book, 'size', None)
+    if size is None:
+        size = getattr(book.media, 'size', None)
+    if size is None:
+        size = sum(audio_file.metadata.size for audio_file in book.media.audioFiles)
+    return size
+
+
+def book_author(book: Book) -> str:
+    """
+    Returns the name of a library item's author(s), from minified or full items.
+    """
+    metadata = book.media.metadata
+    author_name = getattr(metadata, 'authorName', None)
+    if author_name is None:
+        author_name = ', '.join(author.name for author in metadata.authors or [])
+    return author_name
+
+
+class EncodePolicy:
+    """
+    Orders the books waiting to be encoded, the first one is encoded next.
+
+    Subclasses implement `order`. Ties are broken by library item ID, so the order is deterministic.
+    """
+
+    def order(self, books: Iterable[Book], started: Sequence[Book]) -> List[Book]:
+        """
+        Args:
+            books (Iterable[LibraryItem or LibraryItemMinified]): The books waiting to be encoded.
+            started (Sequence[LibraryItem or LibraryItemMinified]): The books whose encodes were started before,
+                oldest first.
+
+        Returns:
+            List[LibraryItem or LibraryItemMinified]: The books, in the order to encode them in.
+        """
+        raise NotImplementedError
+
+
+class ShortestFirst(EncodePolicy):
+    """
+    The shortest books first, so the most books are done soonest.
+    """
+
+    def order(self, books, started=()):
+        return sorted(books, key=lambda book: (book.media.duration, book.id))
+
+
+class LargestFirst(EncodePolicy):
+    """
+    The books with the largest audio files first, so the most disk space is reclaimed soonest.
+    """
+
+    def order(self, books, started=()):
+        return sorted(books, key=lambda book: (-book_size(book), book.id))
+
+
+class OldestFirst(EncodePolicy):
+    """
+    The books added to the library first, first.
+    """
+
+    def order(self, books, started=()):
+        return sorted(books, key=lambda book: (book.addedAt, book.id))
+
+
+class AuthorFairness(EncodePolicy):
+    """
+    Takes turns between authors, so a long series does not hold up every other author. The next book is the first,
+    in the order of the base policy, of the authors whose books were started the fewest times.
+    """
+
+    def __init__(self, base: Optional[EncodePolicy] = None):
+        """
+        Args:
+            base (EncodePolicy or None): The order of the books of one author. None is ShortestFirst.
+        """
+        self.base = base or ShortestFirst()
+
+    def order(self, books, started=()):
+        counts = Counter(book_author(book) for book in started)
+        base_order = self.base.order(books, started)
+        # rank of each book in the base order, to pick between authors with the same count
+        rank = {book.id: i for i, book in enumerate(base_order)}
+        # each author's books, the next one last
+        queues = defaultdict(list)
+        for book in reversed(base_order):
+            queues[book_author(book)].append(book)
+
+        ordered = []
+        while queues:
+            author = min(queues, key=lambda name: (counts[name], rank[queues[name][-1].id]))
+            ordered.append(queues[author].pop())
+            counts[author] += 1
+            if not queues[author]:
+                del queues[author]
+        return ordered
+
+
+class PinnedFirst(EncodePolicy):
+    """
+    The pinned books first, in the order they were pinned, then the others in the order of the base policy.
+    """
+
+    def __init__(self, pinned_ids: Sequence[str], base: Optional[EncodePolicy] = None):
+        """
+        Args:
+            pinned_ids (Sequence[str]): The IDs of the library items to encode before any other.
+            base (EncodePolicy or None): The order of the other books. None is ShortestFirst.
+        """
+        self.pinned_ids = list(pinned_ids)
+        self.base = base or ShortestFirst()
+
+    def order(self, books, started=()):
+        position = {book_id: i for i, book_id in enumerate(self.pinned_ids)}
+        books = list(books)
+        pinned = sorted((book for book in books if book.id in position), key=lambda book: position[book.id])
+        return pinned + self.base.order([book for book in books if book.id not in position], started)
+
+
+# the policies by the names used in Config.EncodePolicy
+POLICIES: Dict[str, Callable[[], EncodePolicy]] = {
+    'shortest': ShortestFirst,
+    'largest': LargestFirst,
+    'oldest': OldestFirst,
+    'author': AuthorFairness,
+}
+
+
+class EncodeScheduler:
+    """
+    Picks the books to encode when a slot frees up.
+
+    The window opens at start_hour and closes at end_hour every day, spanning midnight if end_hour is the earlier
+    one; equal hours keep it open all day. Inside it, a book is only started if its estimated encode time fits in
+    what is left of the window. A book longer than the whole window can never fit, so it is started in the first
+    hour of the window instead, when it runs furthest into the window.
+
+    Example:
+        ```
+        scheduler = EncodeScheduler(2, AuthorFairness(), start_hour=22, end_hour=6,
+                                    estimate=lambda book: book.media.duration / 40)
+        for book in scheduler.pick(waiting_books, running=0):
+            a.post_encode_m4b(book.id)
+        ```
+    """
+
+    def __init__(self, slots: int, policy: Optional[EncodePolicy] = None, start_hour: int = 0, end_hour: int = 0,
+                 estimate: Optional[Callable[[Book], float]] = None,
+                 clock: Callable[[], datetime] = datetime.now):
+        """
+        Args:
+            slots (int): The number of books encoded at the same time.
+            policy (EncodePolicy or None): The order to encode books in. None is ShortestFirst.
+            start_hour (int): The hour (24 hour) the window opens.
+            end_hour (int): The hour (24 hour) the window closes, after which no encode is started.
+            estimate (Callable[[Book], float] or None): The expected encode time of a book in seconds. None expects
+                every book to fit.
+            clock (Callable[[], datetime]): The current local time.
+        """
+        self.slots = slots
+        self.policy = policy or ShortestFirst()
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.estimate = estimate or (lambda book: 0.0)
+        self.clock = clock
+        self.started: List[Book] = []
+
+    @property
+    def window_length(self) -> float:
+        """
+        The length of the window in seconds.
+        """
+        return ((self.end_hour - self.start_hour) % 24 or 24) * 3600.0
+
+    def _window_start(self, now: datetime) -> datetime:
+        # the start of the last window to open at or before now
+        start = now.replace(hour=self.start_hour, minute=0, second=0, microsecond=0)
+        return start if start <= now else start - timedelta(days=1)
+
+    def window_remaining(self) -> float:
+        """
+        Returns the seconds left until the window closes, 0 if it is closed.
+        """
+        now = self.clock()
+        elapsed = (now - self._window_start(now)).total_seconds()
+        return max(0.0, self.window_length - elapsed)
+
+    def seconds_until_window(self) -> float:
+        """
+        Returns the seconds until the window next opens, 0 if it is open.
+        """
+        if self.window_remaining() > 0:
+            return 0.0
+        return self.seconds_until_next_window()
+
+    def seconds_until_next_window(self) -> float:
+        """
+        Returns the seconds until the window opens again after the current or last one.
+        """
+        now = self.clock()
+        return (self._window_start(now) + timedelta(days=1) - now).total_seconds()
+
+    def fits(self, book: Book) -> bool:
+        """
+        Whether a book started now is expected to finish before the window closes, or, if it is longer than the
+        whole window, whether the window opened less than an hour ago.
+        """
+        remaining = self.window_remaining()
+        if remaining <= 0:
+            return False
+        estimate = self.estimate(book)
+        if estimate > self.window_length:
+            return remaining > self.window_length - 3600
+        return estimate <= remaining
+
+    def pick(self, books: Iterable[Book], running: int) -> List[Book]:
+        """
+        Picks the books to start now, to fill the free slots, and records them as started.
+
+        Args:
+            books (Iterable[LibraryItem or LibraryItemMinified]): The books waiting to be encoded.
+            running (int): The number of encodes running, each taking a slot.
+
+        Returns:
+            List[LibraryItem or LibraryItemMinified]: At most one book per free slot, in the order of the policy,
+                that fit in the window. Empty if the window is closed or no book fits.
+        """
+        picked = []
+        free_slots = self.slots - running
+        if free_slots <= 0:
+            return picked
+        for book in self.policy.order(books, self.started):
+            if self.fits(book):
+                picked.append(book)
+                if len(picked) == free_slots:
+                    break
+        self.started.extend(picked)
+        return picked
@@ -0,0 +1,153 @@
+"""
+A client for the events the Audiobookshelf server pushes over socket.io.
+
+The server emits an event whenever a task starts or finishes, such as an M4B encode, a library item is added,
+updated or removed, a library is scanned, and so on, see SocketEvent. Reacting to these events replaces polling
+the REST endpoints for the same changes.
+
+Requires the optional python-socketio client: `pip install "python-socketio[client]"`.
+"""
+import logging
+import threading
+from collections import defaultdict
+from enum import Enum
+from typing import Any, Callable, Union
+
+try:
+    import socketio
+except ImportError:
+    socketio = None
+
+from audiobookshelfenums import SocketEvent
+
+__all__ = ['SocketClient']
+
+logger = logging.getLogger(__name__)
+
+
+class SocketClient:
+    """
+    An authenticated socket.io connection to an Audiobookshelf server, dispatching its events to handlers.
+
+    Handlers are called with the event's raw JSON payload on a new thread per event, as python-socketio does, so
+    the handlers of consecutive events can run at the same time and finish out of order.
+
+    After a dropped connection, e.g. a restarted server, the client reconnects and authenticates again on its own;
+    `connected` is False in between, which is when callers should fall back to polling. A disconnect the server
+    asks for is final.
+
+    Example:
+        ```
+        with SocketClient(url, api_token) as socket:
+            socket.on(SocketEvent.TASK_FINISHED, lambda task: print(task['title']))
+            socket.connect()
+            ...
+        ```
+    """
+
+    def __init__(self, url: str, api_token: str, reconnection: bool = True):
+        """
+        Args:
+            url (str): URL of the Audiobookshelf server.
+            api_token (str): API token of the user to act as.
+            reconnection (bool): Whether to reconnect when the connection drops.
+
+        Raises:
+            Exception: If python-socketio is not installed.
+        """
+        if socketio is None:
+            raise Exception('Socket events require python-socketio, install it with'
+                            ' pip install "python-socketio[client]"')
+        self.url = url
+        self.api_token = api_token
+        self._handlers = defaultdict(list)
+        self._authenticated = threading.Event()
+        # set when the server answers the token, either way
+        self._auth_answered = threading.Event()
+
+        self._client = socketio.Client(reconnection=reconnection)
+        self._client.on('connect', self._on_connect)
+        self._client.on('disconnect', self._on_disconnect)
+        self._client.on(SocketEvent.INIT.value, self._on_init)
+        self._client.on(SocketEvent.AUTH_FAILED.value, self._on_auth_failed)
+        self._client.on('*', self._dispatch)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disconnect()
+
+    @property
+    def connected(self) -> bool:
+        """
+        Whether the connection is up and authenticated, i.e. events are being received.
+        """
+        return self._client.connected and self._authenticated.is_set()
+
+    def on(self, event: Union[SocketEvent, str], handler: Callable[[Any], None]):
+        """
+        Registers a handler for an event. Handlers of an event are called in the order they were registered.
+
+        Args:
+            event (SocketEvent or str): The event.
+            handler (Callable[[Any], None]): Called with the payload of every occurrence of the event.
+        """
+        self._handlers[event.value if isinstance(event, Enum) else event].append(handler)
+
+    def off(self, event: Union[SocketEvent, str], handler: Callable[[Any], None]):
+        """
+        Unregisters a handler registered with `on`.
+        """
+        self._handlers[event.value if isinstance(event, Enum) else event].remove(handler)
+
+    def connect(self, timeout: float = 10):
+        """
+        Connects to the server and authenticates with the API token.
+
+        Args:
+            timeout (float): Seconds to wait for the server to accept the token.
+
+        Raises:
+            Exception: If the server cannot be reached or does not accept the token in time.
+        """
+        self._auth_answered.clear()
+        try:
+            self._client.connect(self.url, socketio_path='socket.io', wait_timeout=timeout)
+        except socketio.exceptions.ConnectionError as e:
+            raise Exception(f"Socket connection error: {e}")
+        if not self._auth_answered.wait(timeout) or not self._authenticated.is_set():
+            self._client.disconnect()
+            raise Exception("Socket authentication failed")
+
+    def disconnect(self):
+        """
+        Closes the connection, without reconnecting.
+        """
+        self._client.disconnect()
+        self._authenticated.clear()
+
+    def _on_connect(self):
+        # sent again on every reconnection, the server only sends events to authenticated sockets
+        self._client.emit('auth', self.api_token)
+
+    def _on_disconnect(self, *args):
+        self._authenticated.clear()
+
+    def _on_init(self, data=None):
+        self._authenticated.set()
+        self._auth_answered.set()
+        self._dispatch(SocketEvent.INIT.value, data)
+
+    def _on_auth_failed(self, data=None):
+        self._authenticated.clear()
+        self._auth_answered.set()
+        self._dispatch(SocketEvent.AUTH_FAILED.value, data)
+
+    def _dispatch(self, event: str, data=None):
+        for handler in list(self._handlers.get(event, ())):
+            try:
+                handler(data)
+            except Exception:
+                # a failing handler must not take the connection down with it
+                logger.exception(f"Handler of socket event {event} failed")
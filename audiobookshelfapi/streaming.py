@@ -0,0 +1,125 @@
+"""
+Incremental decoding of large JSON responses.
+
+`iter_json_array` yields the elements of one array of a JSON object while the body is still being downloaded,
+holding only the current chunk and element in memory.
+"""
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+__all__ = ['iter_json_array']
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _JSONStream:
+    """
+    A JSON text read chunk by chunk, parsed value by value with the C scanner of json.JSONDecoder.raw_decode.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self) -> bool:
+        """
+        Appends the next chunk to the text, dropping what was already consumed.
+
+        Returns:
+            bool: False if the body has been read completely.
+        """
+        if self.exhausted:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.exhausted = True
+            added = self._utf8.decode(b'', final=True)
+        else:
+            added = self._utf8.decode(chunk)
+        self.text = self.text[self.pos:] + added
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skips whitespace and returns the next character, or '' at the end of the body.
+        """
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, characters: str) -> str:
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters!r} at position {self.pos}, found {character!r}")
+        self.pos += 1
+        return character
+
+    def value(self) -> Any:
+        """
+        Parses the next JSON value, reading more chunks until it is complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # most likely cut off by the end of the chunk, retry with more text
+                if self.fill():
+                    continue
+                raise
+            # a number at the end of the text may continue in the next chunk
+            if end == len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks: Iterable[bytes], key: str) -> Iterator[Any]:
+    """
+    Yields the elements of the array under `key` in a JSON object, decoding the body as it arrives.
+
+    The other members of the object are parsed and discarded. Iteration stops at the end of the array, without
+    reading the rest of the body.
+
+    Args:
+        chunks (Iterable[bytes]): The body of the response, e.g. `response.iter_content(chunk_size)`.
+        key (str): The member of the top-level object holding the array.
+
+    Returns:
+        Iterator[Any]: The decoded elements of the array.
+
+    Raises:
+        ValueError: If the body is not valid JSON, or the object has no array under key.
+    """
+    stream = _JSONStream(chunks)
+    stream.expect('{')
+    if stream.peek() == '}':
+        raise ValueError(f"No {key!r} array in the response")
+    while True:
+        name = stream.value()
+        stream.expect(':')
+        if name == key:
+            break
+        stream.value()
+        if stream.expect(',}') == '}':
+            raise ValueError(f"No {key!r} array in the response")
+
+    stream.expect('[')
+    if stream.peek() == ']':
+        return
+    while True:
+        yield stream.value()
+        if stream.expect(',]') == ']':
+            return
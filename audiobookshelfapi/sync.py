@@ -0,0 +1,200 @@
+"""
+Incremental synchronization of a library's items.
+
+`LibrarySyncer` keeps a local snapshot of a library's items and, on each sync, asks the server only for the items
+updated since the last one, so a poller does work proportional to what changed rather than to the library size.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+from Objects import LibraryItem, LibraryItemMinified
+from audiobookshelfapi.disk_cache import DiskCache
+from audiobookshelfenums import SortField
+
+__all__ = ['LibrarySyncer', 'SyncDiff']
+
+
+@dataclass
+class SyncDiff:
+    """
+    The changes to a library found by a sync.
+
+    Attributes:
+        added (List[LibraryItem]): The library items that were not in the snapshot.
+        updated (List[LibraryItem]): The library items of the snapshot that changed, as they are now.
+        removed (List[LibraryItem]): The library items of the snapshot that are gone, as they were last seen.
+        full (bool): Whether the whole library was listed to find the changes, rather than only the updated items.
+    """
+    added: List[Union[LibraryItem, LibraryItemMinified]] = field(default_factory=list)
+    updated: List[Union[LibraryItem, LibraryItemMinified]] = field(default_factory=list)
+    removed: List[Union[LibraryItem, LibraryItemMinified]] = field(default_factory=list)
+    full: bool = False
+
+    def __bool__(self):
+        return bool(self.added or self.updated or self.removed)
+
+
+def _version(item) -> tuple:
+    # minified items have no lastScan
+    return item.updatedAt, getattr(item, 'lastScan', None)
+
+
+class LibrarySyncer:
+    """
+    Keeps a snapshot of a library's items, keyed by ID, up to date with the server.
+
+    The first sync lists the whole library. Later syncs page through the items sorted by updatedAt, newest first,
+    and stop at the first item older than the watermark, the highest updatedAt seen so far. Items at or past the
+    watermark are added to or replace their entry in the snapshot.
+
+    Deletions never show up in that listing, so they are found by count: when the server's total differs from the
+    size of the snapshot, the whole library is listed again and every item missing from it is removed. The same
+    full listing is the fallback if the server does not return the items in updatedAt order.
+
+    With a filter, the snapshot holds only the matching items, and items that stop matching are reported as
+    removed. They can only be found by a full listing though, so when items often stop matching, as books do once
+    they are encoded to a single track, sync the library unfiltered and filter the snapshot instead: the changed
+    items then come back as updated.
+
+    Example:
+        ```
+        syncer = LibrarySyncer(a, library_id, minified=True)
+        while True:
+            diff = syncer.sync()
+            for item in diff.updated:
+                if item.media.numAudioFiles == 1:
+                    ...
+            time.sleep(60)
+        ```
+    """
+
+    def __init__(self, api, library_id: str, filter: Optional[str] = None, minified: bool = False,
+                 lazy: bool = False, page_size: int = 50, full_page_size: int = 500, prefetch: int = 4,
+                 cache: Optional[DiskCache] = None):
+        """
+        Args:
+            api (AudiobookshelfAPI): The client to sync through.
+            library_id (str): The ID of the library.
+            filter (str or None): The server's filter expression selecting the items to keep, built with
+                FilterGroup.filter. None keeps every item.
+            minified (bool): Whether to request minified library items, decoded as LibraryItemMinified.
+            lazy (bool): Whether to decode each item's fields only when first read.
+            page_size (int): The number of items per page of the incremental listing. A sync with no changes is a
+                single request for this many items.
+            full_page_size (int): The number of items per page when listing the whole library.
+            prefetch (int): The number of pages requested ahead when listing the whole library.
+            cache (DiskCache or None): A cache the snapshot is saved to after every sync. The first sync starts
+                from the snapshot saved by the last run, if there is one, instead of listing the whole library,
+                and its diff holds the changes since then. Only unfiltered syncers use the cache.
+        """
+        self.api = api
+        self.library_id = library_id
+        self.filter = filter
+        self.minified = minified
+        self.lazy = lazy
+        self.page_size = page_size
+        self.full_page_size = full_page_size
+        self.prefetch = prefetch
+        # a filtered snapshot only holds part of the library, it is not worth keeping
+        self.cache = cache if filter is None else None
+
+        self.items: Dict[str, Union[LibraryItem, LibraryItemMinified]] = {}
+        self.watermark: Optional[int] = None
+
+    def sync(self) -> SyncDiff:
+        """
+        Brings the snapshot up to date with the server.
+
+        Returns:
+            SyncDiff: The items added, updated and removed since the last sync. On the first sync every item is
+                added.
+
+        Raises:
+            Exception: If a request to the server fails or its response is invalid.
+        """
+        if self.watermark is None and self.cache is not None:
+            snapshot = self.cache.load_snapshot(self.library_id, self.minified)
+            if snapshot is not None:
+                self.items, self.watermark = snapshot
+        diff = self._sync()
+        if self.cache is not None:
+            if diff.full:
+                self.cache.save_snapshot(self.library_id, self.minified, self.watermark, self.items.values(),
+                                         full=True)
+            elif diff:
+                self.cache.save_snapshot(self.library_id, self.minified, self.watermark, diff.added + diff.updated)
+        return diff
+
+    def _sync(self) -> SyncDiff:
+        if self.watermark is None:
+            return self._full_sync()
+
+        diff = SyncDiff()
+        changed = {}
+        page = 0
+        while True:
+            library_items_page = self.api.get_library_items_page(
+                self.library_id, self.page_size, page, sort=SortField.UPDATED_AT, desc=True, filter=self.filter,
+                minified=self.minified, lazy=self.lazy)
+            if page == 0:
+                total = library_items_page.total
+            previous = None
+            reached_watermark = False
+            for item in library_items_page.results:
+                if previous is not None and item.updatedAt > previous:
+                    # not sorted by updatedAt, nothing can be concluded from where the listing stops
+                    return self._full_sync()
+                previous = item.updatedAt
+                if item.updatedAt < self.watermark:
+                    reached_watermark = True
+                    break
+                changed[item.id] = item
+            if reached_watermark or len(library_items_page.results) < self.page_size:
+                break
+            page += 1
+
+        for item_id, item in changed.items():
+            known = self.items.get(item_id)
+            if known is None:
+                diff.added.append(item)
+            elif _version(known) != _version(item):
+                diff.updated.append(item)
+
+        if total != len(self.items) + len(diff.added):
+            # items were deleted, or stopped matching the filter
+            return self._full_sync()
+
+        for item in diff.added + diff.updated:
+            self.items[item.id] = item
+        self._advance_watermark(changed.values())
+        return diff
+
+    def _full_sync(self) -> SyncDiff:
+        diff = SyncDiff(full=True)
+        listed = {}
+        for library_items_page in self.api.iter_library_item_pages(
+                self.library_id, self.full_page_size, self.prefetch, sort=SortField.ADDED_AT, filter=self.filter,
+                minified=self.minified, lazy=self.lazy):
+            for item in library_items_page.results:
+                listed[item.id] = item
+
+        for item_id, item in listed.items():
+            known = self.items.get(item_id)
+            if known is None:
+                diff.added.append(item)
+            elif _version(known) != _version(item):
+                diff.updated.append(item)
+        diff.removed = [item for item_id, item in self.items.items() if item_id not in listed]
+
+        self.items = listed
+        self.watermark = None
+        self._advance_watermark(listed.values())
+        if self.watermark is None:
+            # an empty library, every item a later sync sees is new
+            self.watermark = 0
+        return diff
+
+    def _advance_watermark(self, items):
+        for item in items:
+            if self.watermark is None or item.updatedAt > self.watermark:
+                self.watermark = item.updatedAt
@@ -0,0 +1,338 @@
+"""
+Tracing of AudiobookshelfAPI calls and M4B encode jobs in spans compatible with OpenTelemetry.
+
+With a tracer passed to the client, every call of a public method is a span, with a child span for every request
+it makes to the server carrying the endpoint, status, sizes and phase timings of instrumentation. ConvertM4B traces
+every encode job in a span of its own, from its request until the book is single track or the encode fails, which
+the post_encode_m4b call is a child of. Polls slowed down by the encodes running line up with their job spans on
+the same timeline.
+
+Two tracers:
+    - `FileTracer` writes every finished span to a file as a line of OTLP JSON, the format of the OpenTelemetry
+      collector's otlpjsonfile receiver and file exporter, without any dependency;
+    - `OpenTelemetryTracer` hands the spans to OpenTelemetry, exported to a collector over OTLP or wherever the
+      application configured it. Requires `pip install opentelemetry-api`, and for the OTLP export
+      `pip install opentelemetry-sdk opentelemetry-exporter-otlp-proto-http`.
+
+Without a tracer nothing is wrapped, so tracing costs nothing when it is disabled.
+"""
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+__all__ = ['Span', 'FileTracer', 'OpenTelemetryTracer', 'get_tracer']
+
+SCOPE = 'audiobookshelfapi'
+
+# OTLP span kinds and status codes
+_KIND_INTERNAL = 1
+_KIND_CLIENT = 3
+_STATUS_ERROR = 2
+
+
+def _attributes(attributes: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # OpenTelemetry attribute values are str, bool, int, float or lists of them, and never None
+    return {key: value for key, value in (attributes or {}).items() if value is not None}
+
+
+def _otlp_value(value) -> dict:
+    # bool before int, bools are ints. 64 bit ints are strings in OTLP JSON
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    if isinstance(value, (list, tuple)):
+        return {'arrayValue': {'values': [_otlp_value(v) for v in value]}}
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> list:
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items()]
+
+
+class Span:
+    """
+    A span of FileTracer, written to its file when it ends. Has the methods of an OpenTelemetry span the client
+    and ConvertM4B use.
+
+    Attributes:
+        name (str): What the span covers.
+        trace_id (str): The 32 hex digit ID of the trace, shared with the span's parent.
+        span_id (str): The 16 hex digit ID of the span.
+        parent_id (str or None): The ID of the parent span. Will be None for a root span.
+        kind (int): The OTLP span kind, 1 for internal and 3 for a request to the server.
+        start_time (int): The time (in ns since POSIX epoch) when the span started.
+        end_time (int or None): The time (in ns since POSIX epoch) when the span ended. Will be None until it ends.
+        attributes (dict): The attributes of the span.
+        error (str or None): The error message, if the span failed.
+    """
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'kind', 'start_time', 'end_time',
+                 'attributes', 'error')
+
+    def __init__(self, tracer: 'FileTracer', name: str, parent: Optional['Span'], kind: int, start_time: int,
+                 attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.kind = kind
+        self.start_time = start_time
+        self.end_time = None
+        self.attributes = attributes
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_exception(self, exception: BaseException):
+        self.error = f"{type(exception).__name__}: {exception}"
+
+    def end(self, end_time: Optional[int] = None):
+        """
+        Ends the span and writes it to the tracer's file. Ending it again does nothing.
+
+        Args:
+            end_time (int or None): The time (in ns since POSIX epoch) when the span ended, None for now.
+        """
+        if self.end_time is not None:
+            return
+        self.end_time = end_time if end_time is not None else time.time_ns()
+        self.tracer._export(self)
+
+    def to_otlp(self) -> dict:
+        """
+        Returns the span in OTLP JSON.
+        """
+        span = {'traceId': self.trace_id, 'spanId': self.span_id, 'name': self.name, 'kind': self.kind,
+                'startTimeUnixNano': str(self.start_time), 'endTimeUnixNano': str(self.end_time),
+                'attributes': _otlp_attributes(self.attributes)}
+        if self.parent_id is not None:
+            span['parentSpanId'] = self.parent_id
+        if self.error is not None:
+            span['status'] = {'code': _STATUS_ERROR, 'message': self.error}
+        return span
+
+
+class FileTracer:
+    """
+    Writes spans to a file, a line of OTLP JSON per finished span, appended to what the file already holds.
+
+    The current span is kept in a context variable, so the spans started on a thread are children of the span
+    that thread is in.
+
+    Example:
+        ```
+        with FileTracer('traces.jsonl') as tracer, AudiobookshelfAPI(url, api_token, tracer=tracer) as a:
+            a.get_all_library_items(library_id)
+        ```
+    """
+
+    def __init__(self, path: str, service_name: str = 'audiobookshelf-client'):
+        """
+        Args:
+            path (str): The file to append the spans to.
+            service_name (str): The service.name resource attribute of the spans.
+        """
+        self.path = path
+        resource = {'attributes': _otlp_attributes({'service.name': service_name, 'process.pid': os.getpid()})}
+        # every line is an export request of one span, the same but for the span
+        self._line_start = ('{"resourceSpans":[{"resource":' + json.dumps(resource, separators=(',', ':'))
+                            + ',"scopeSpans":[{"scope":{"name":"' + SCOPE + '"},"spans":[')
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._current = contextvars.ContextVar(f'span_{id(self)}', default=None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Flushes the spans written and closes the file.
+        """
+        with self._lock:
+            self._file.close()
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional[Span] = None,
+                   start_time: Optional[int] = None, client: bool = False) -> Span:
+        """
+        Starts a span without making it the current one, for spans that outlive the block they start in.
+
+        Args:
+            name (str): What the span covers.
+            attributes (dict or None): The attributes of the span. None values are left out.
+            parent (Span or None): The parent span. None for the current span, if there is one.
+            start_time (int or None): The time (in ns since POSIX epoch) when the span started, None for now.
+            client (bool): Whether the span is a request to the server.
+
+        Returns:
+            Span: The span, call its end method once what it covers is over.
+        """
+        return Span(self, name, parent if parent is not None else self._current.get(),
+                    _KIND_CLIENT if client else _KIND_INTERNAL,
+                    start_time if start_time is not None else time.time_ns(), _attributes(attributes))
+
+    @contextmanager
+    def use_span(self, span: Span):
+        """
+        Makes a span the current one within the block, without ending it.
+        """
+        token = self._current.set(span)
+        try:
+            yield span
+        finally:
+            self._current.reset(token)
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        """
+        A span covering the block, the current one within it. An exception escaping the block is recorded.
+        """
+        span = self.start_span(name, attributes)
+        try:
+            with self.use_span(span):
+                yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            span.end()
+
+    @staticmethod
+    def set_error(span: Span, message: str):
+        """
+        Marks a span as failed, for failures that are not exceptions.
+        """
+        span.error = message
+
+    def _export(self, span: Span):
+        line = self._line_start + json.dumps(span.to_otlp(), separators=(',', ':')) + ']}]}]}\n'
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line)
+            # a trace is complete once its root span ends
+            if span.parent_id is None:
+                self._file.flush()
+
+
+class OpenTelemetryTracer:
+    """
+    Hands spans to OpenTelemetry, with the same methods as FileTracer.
+
+    Example:
+        ```
+        tracer = OpenTelemetryTracer(endpoint='http://localhost:4318/v1/traces')
+        with AudiobookshelfAPI(url, api_token, tracer=tracer) as a:
+            ...
+        tracer.close()
+        ```
+    """
+
+    def __init__(self, endpoint: Optional[str] = None, service_name: str = 'audiobookshelf-client'):
+        """
+        Args:
+            endpoint (str or None): The URL of the OTLP/HTTP traces endpoint of a collector to export the spans
+                to, batched. None uses the tracer provider the application set up, if any.
+            service_name (str): The service.name resource attribute of the spans exported to endpoint.
+
+        Raises:
+            Exception: If opentelemetry-api is not installed, or the SDK and the OTLP exporter are not when an
+                endpoint is given.
+        """
+        if otel_trace is None:
+            raise Exception("OpenTelemetry tracing requires opentelemetry-api: pip install opentelemetry-api")
+        self._provider = None
+        if endpoint is None:
+            self._tracer = otel_trace.get_tracer(SCOPE)
+            return
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError as e:
+            raise Exception(f"Exporting over OTLP requires opentelemetry-sdk and"
+                            f" opentelemetry-exporter-otlp-proto-http: {e}")
+        self._provider = TracerProvider(resource=Resource.create({'service.name': service_name}))
+        self._provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+        self._tracer = self._provider.get_tracer(SCOPE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Exports the spans still batched and shuts the exporter down, if this tracer set one up.
+        """
+        if self._provider is not None:
+            self._provider.shutdown()
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent=None,
+                   start_time: Optional[int] = None, client: bool = False):
+        """
+        Starts a span without making it the current one, see FileTracer.start_span.
+        """
+        context = otel_trace.set_span_in_context(parent) if parent is not None else None
+        kind = otel_trace.SpanKind.CLIENT if client else otel_trace.SpanKind.INTERNAL
+        return self._tracer.start_span(name, context=context, kind=kind, attributes=_attributes(attributes),
+                                       start_time=start_time)
+
+    @staticmethod
+    def use_span(span):
+        """
+        Makes a span the current one within the block, without ending it.
+        """
+        return otel_trace.use_span(span, end_on_exit=False)
+
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        """
+        A span covering the block, the current one within it. An exception escaping the block is recorded.
+        """
+        return self._tracer.start_as_current_span(name, attributes=_attributes(attributes))
+
+    @staticmethod
+    def set_error(span, message: str):
+        """
+        Marks a span as failed, for failures that are not exceptions.
+        """
+        span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, message))
+
+
+def get_tracer(path: str = '', endpoint: str = '', service_name: str = 'audiobookshelf-client'):
+    """
+    Returns the tracer of a configuration.
+
+    Args:
+        path (str): The file to write spans to with a FileTracer. Empty for none.
+        endpoint (str): The OTLP/HTTP traces endpoint to export spans to with an OpenTelemetryTracer, or 'otel'
+            for the tracer provider the application set up. Empty for none. Takes precedence over path.
+        service_name (str): The service.name resource attribute of the spans.
+
+    Returns:
+        FileTracer or OpenTelemetryTracer or None: The tracer, None if tracing is disabled.
+    """
+    if endpoint:
+        return OpenTelemetryTracer(None if endpoint == 'otel' else endpoint, service_name)
+    if path:
+        return FileTracer(path, service_name)
+    return None
@@ -1,6 +1,7 @@
+import base64
 from enum import Enum
 
-__all__ = ['Icon', 'Provider']
+__all__ = ['Icon', 'Provider', 'FilterGroup', 'TracksFilter', 'ProgressFilter', 'SortField', 'SocketEvent']
 
 class Icon(Enum):
   DATABASE = 'database'
@@ -35,4 +36,90 @@ class Provider(Enum):
   AUDIBLE_IT = 'audible.it'
   AUDIBLE_IN = 'audible.in'
   AUDIBLE_ES = 'audible.es'
-  FANTLAB = 'fantlab'
\ No newline at end of file
+  FANTLAB = 'fantlab'
+
+class FilterGroup(Enum):
+  """
+  The groups library items can be filtered by on the server, see FilterGroup.filter.
+  """
+  GENRES = 'genres'
+  TAGS = 'tags'
+  SERIES = 'series'
+  AUTHORS = 'authors'
+  NARRATORS = 'narrators'
+  PUBLISHERS = 'publishers'
+  LANGUAGES = 'languages'
+  PROGRESS = 'progress'
+  TRACKS = 'tracks'
+  EBOOKS = 'ebooks'
+  MISSING = 'missing'
+  ISSUES = 'issues'
+  FEED_OPEN = 'feed-open'
+
+  def filter(self, value='1'):
+    """
+    Builds the server's filter expression for library items whose group matches value.
+
+    Args:
+      value (str or Enum): The value to match, e.g. the ID of an author or series, a genre, or a TracksFilter or
+        ProgressFilter.
+
+    Returns:
+      str: The filter expression, '<group>.<base64 of value>'.
+
+    Example:
+      ```
+      a.get_all_library_items(library_id, filter=FilterGroup.TRACKS.filter(TracksFilter.MULTI))
+      ```
+    """
+    if isinstance(value, Enum):
+      value = value.value
+    return f"{self.value}.{base64.b64encode(value.encode()).decode()}"
+
+class TracksFilter(Enum):
+  SINGLE = 'single'
+  MULTI = 'multi'
+
+class ProgressFilter(Enum):
+  FINISHED = 'finished'
+  NOT_STARTED = 'not-started'
+  NOT_FINISHED = 'not-finished'
+  IN_PROGRESS = 'in-progress'
+
+class SortField(Enum):
+  """
+  The fields library items can be sorted by on the server.
+  """
+  TITLE = 'media.metadata.title'
+  AUTHOR_NAME = 'media.metadata.authorName'
+  AUTHOR_NAME_LF = 'media.metadata.authorNameLF'
+  PUBLISHED_YEAR = 'media.metadata.publishedYear'
+  DURATION = 'media.duration'
+  SIZE = 'size'
+  ADDED_AT = 'addedAt'
+  UPDATED_AT = 'updatedAt'
+  BIRTHTIME_MS = 'birthtimeMs'
+  MTIME_MS = 'mtimeMs'
+
+class SocketEvent(Enum):
+  """
+  The events the server emits on its socket.io connection.
+  """
+  INIT = 'init'
+  AUTH_FAILED = 'auth_failed'
+  TASK_STARTED = 'task_started'
+  TASK_FINISHED = 'task_finished'
+  ITEM_ADDED = 'item_added'
+  ITEM_UPDATED = 'item_updated'
+  ITEM_REMOVED = 'item_removed'
+  ITEMS_ADDED = 'items_added'
+  ITEMS_UPDATED = 'items_updated'
+  LIBRARY_ADDED = 'library_added'
+  LIBRARY_UPDATED = 'library_updated'
+  LIBRARY_REMOVED = 'library_removed'
+  SCAN_START = 'scan_start'
+  SCAN_COMPLETE = 'scan_complete'
+  EPISODE_DOWNLOAD_QUEUED = 'episode_download_queued'
+  EPISODE_DOWNLOAD_STARTED = 'episode_download_started'
+  EPISODE_DOWNLOAD_FINISHED = 'episode_download_finished'
+  BACKUP_APPLIED = 'backup_applied'
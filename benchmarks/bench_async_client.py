@@ -0,0 +1,61 @@
+"""
+Fetching every library item of a library one request each, with AsyncAudiobookshelfAPI gathering the requests
+against AudiobookshelfAPI sending them one after the other and from a thread pool, on the mock server.
+
+With the server's latency, the sequential client waits for every request in turn; the asyncio client keeps
+max_concurrency requests in flight from one thread. The items are checked to be the same for every client.
+
+Run from the repository root:
+    python -m benchmarks.bench_async_client [num_items] [latency_ms]
+"""
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from audiobookshelfapi.async_api import AsyncAudiobookshelfAPI
+from benchmarks.mock_server import MockServer
+
+CONCURRENCY = 10
+
+
+async def fetch_async(server, library_id):
+    async with AsyncAudiobookshelfAPI(server.url, server.token, max_concurrency=CONCURRENCY) as a:
+        items = await a.get_all_library_items(library_id)
+        return await a.get_library_items([item.id for item in items])
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 10) / 1000
+    with MockServer(items_per_library=num_items, latency=latency) as server:
+        library_id = server.library_ids[0]
+        with AudiobookshelfAPI(server.url, server.token, pool_maxsize=CONCURRENCY) as a:
+            ids = [item.id for item in a.get_all_library_items(library_id)]
+
+            start = time.perf_counter()
+            sequential = [a.get_library_item(item_id, expanded=True) for item_id in ids]
+            sequential_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(CONCURRENCY) as executor:
+                threaded = list(executor.map(lambda item_id: a.get_library_item(item_id, expanded=True), ids))
+            threaded_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        gathered = asyncio.run(fetch_async(server, library_id))
+        async_time = time.perf_counter() - start
+
+    assert [item.id for item in gathered] == ids, "the gathered items are not in the order of the library"
+    assert gathered == sequential == threaded, "the clients decoded different items"
+    print(f"{num_items} library items fetched one request each, {latency * 1000:.0f} ms of latency")
+    print(f"  sync, sequential           {sequential_time * 1000:8.0f} ms")
+    print(f"  sync, {CONCURRENCY} threads            {threaded_time * 1000:8.0f} ms"
+          f" ({sequential_time / threaded_time:.1f}x)")
+    print(f"  asyncio, {CONCURRENCY} in flight       {async_time * 1000:8.0f} ms"
+          f" ({sequential_time / async_time:.1f}x, listing included)")
+
+
+if __name__ == "__main__":
+    main()
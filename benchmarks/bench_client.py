@@ -0,0 +1,136 @@
+"""
+Request throughput, decode time and memory of AudiobookshelfAPI against the mock server, and how it behaves with
+latency and failing requests.
+
+Every section starts its own benchmarks.mock_server.MockServer:
+    - throughput: small requests per second from one thread and from several sharing the connection pool, with
+      and without latency;
+    - decode: time, memory held by the items and peak memory of listing a library full and minified, with
+      Objects, SlottedObjects and lazy decoding;
+    - collections and playlists: time to fetch and decode them;
+    - errors: at an injected error rate, how many calls raise, against how many requests the server failed;
+    - encode: requesting encodes and seeing their books come back single track.
+
+Run from the repository root:
+    python -m benchmarks.bench_client [num_items] [num_requests]
+"""
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import Objects
+import SlottedObjects
+from audiobookshelfapi.api import AudiobookshelfAPI
+from audiobookshelfenums import FilterGroup, TracksFilter
+from benchmarks.mock_server import MockServer
+
+
+def requests_per_second(a, call, num_requests, threads=1):
+    start = time.perf_counter()
+    if threads == 1:
+        for _ in range(num_requests):
+            call(a)
+    else:
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(lambda _: call(a), range(num_requests)))
+    return num_requests / (time.perf_counter() - start)
+
+
+def bench_throughput(num_requests):
+    print("throughput, get_library")
+    for latency in (0.0, 0.005):
+        with MockServer(items_per_library=10, latency=latency) as server:
+            with AudiobookshelfAPI(server.url, server.token, pool_maxsize=8) as a:
+                library_id = server.library_ids[0]
+                for threads in (1, 8):
+                    count = num_requests if latency == 0 else num_requests // 5
+                    rate = requests_per_second(a, lambda a: a.get_library(library_id), count, threads)
+                    print(f"  latency {latency * 1000:3.0f} ms, {threads} thread{'s' if threads > 1 else ' '}"
+                          f" {rate:8.0f} req/s")
+
+
+def measure_decode(a, library_id, minified, lazy):
+    tracemalloc.start()
+    start = time.perf_counter()
+    items = a.get_all_library_items(library_id, minified=minified, lazy=lazy)
+    elapsed = time.perf_counter() - start
+    # held by the decoded items, and at most while parsing and decoding the response
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, held, peak, len(items)
+
+
+def bench_decode(num_items):
+    print(f"decode, get_all_library_items of {num_items} books (tracemalloc slows decoding down)")
+    with MockServer(items_per_library=num_items) as server:
+        library_id = server.library_ids[0]
+        for models in (Objects, SlottedObjects):
+            with AudiobookshelfAPI(server.url, server.token, models=models) as a:
+                for minified in (False, True):
+                    for lazy in (False, True):
+                        server.reset_stats()
+                        elapsed, held, peak, count = measure_decode(a, library_id, minified, lazy)
+                        assert count == num_items
+                        print(f"  {models.__name__:14} {'minified' if minified else 'full':8}"
+                              f" {'lazy' if lazy else 'eager':5} {elapsed * 1000:7.0f} ms, held {held / 2 ** 20:6.1f}"
+                              f" MiB, peak {peak / 2 ** 20:6.1f} MiB, {server.bytes_sent / 2 ** 20:5.1f} MiB received")
+
+
+def bench_lists(num_requests):
+    print("collections and playlists, 5 each of 10 books")
+    with MockServer(items_per_library=200) as server:
+        with AudiobookshelfAPI(server.url, server.token) as a:
+            library_id = server.library_ids[0]
+            for name, call in (('collections', lambda a: a.get_library_collections(library_id)),
+                               ('playlists', lambda a: a.get_user_playlists(library_id))):
+                rate = requests_per_second(a, call, num_requests // 10)
+                print(f"  {name:11} {rate:8.0f} req/s")
+
+
+def bench_errors(num_requests, error_rate=0.05):
+    print(f"errors, {error_rate:.0%} of requests fail")
+    with MockServer(items_per_library=10, error_rate=error_rate) as server:
+        with AudiobookshelfAPI(server.url, server.token) as a:
+            raised = 0
+            for _ in range(num_requests):
+                try:
+                    a.get_library(server.library_ids[0])
+                except Exception:
+                    raised += 1
+            print(f"  {raised} of {num_requests} calls raised, the server failed {server.errors['library']}")
+            assert raised == server.errors['library'], "a failed request did not raise, or was retried"
+
+
+def bench_encode(num_encodes=20):
+    print(f"encode, {num_encodes} books taking 0.2 s each")
+    multitrack = FilterGroup.TRACKS.filter(TracksFilter.MULTI)
+    with MockServer(items_per_library=200, encode_seconds=0.2) as server:
+        with AudiobookshelfAPI(server.url, server.token) as a:
+            library_id = server.library_ids[0]
+            books = a.get_all_library_items(library_id, minified=True, filter=multitrack)
+            start = time.perf_counter()
+            for book in books[:num_encodes]:
+                a.post_encode_m4b(book.id)
+            running = {task['data']['libraryItemId'] for task in a.get_tasks()}
+            assert running <= {book.id for book in books[:num_encodes]}
+            while a.get_tasks():
+                time.sleep(0.05)
+            left = a.get_all_library_items(library_id, minified=True, filter=multitrack)
+            assert len(left) == len(books) - num_encodes
+            print(f"  {len(running)} running after the requests, all single track after"
+                  f" {time.perf_counter() - start:.2f} s, {server.requests['tasks']} task polls")
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    num_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    bench_throughput(num_requests)
+    bench_decode(num_items)
+    bench_lists(num_requests)
+    bench_errors(num_requests // 4)
+    bench_encode()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Time to encode a backlog with a fixed number of concurrent encodes against AdaptiveConcurrency, on a simulated
+server.
+
+The simulated server runs each encode on one core at a fixed speed, shares its cores evenly between the encodes
+running, and loses a share of its throughput to contention for every encode past its number of cores. Time
+advances in small steps. The fixed numbers show what the adaptive one should find; -v prints its decisions as
+ConvertM4B logs them.
+
+Run from the repository root:
+    python -m benchmarks.bench_concurrency [num_books] [cores] [initial] [-v]
+"""
+import logging
+import sys
+
+from audiobookshelfapi.concurrency import AdaptiveConcurrency
+
+SINGLE_SPEED = 20.0
+CONTENTION = 0.85
+STEP = 10.0
+
+
+def server_throughput(running: int, cores: int) -> float:
+    # seconds of audio encoded per wall second by all running encodes together
+    return SINGLE_SPEED * min(running, cores) * CONTENTION ** max(0, running - cores)
+
+
+def simulate(durations, cores, concurrency):
+    """
+    Encodes books of the given durations, at most concurrency.slots at a time, and returns the wall hours taken.
+    """
+    waiting = list(durations)
+    # book ID: [audio seconds left, audio seconds, wall second started]
+    running = {}
+    now = 0.0
+    next_id = 0
+    while waiting or running:
+        while waiting and len(running) < concurrency.slots:
+            duration = waiting.pop()
+            book_id = f'li_{next_id}'
+            next_id += 1
+            running[book_id] = [duration, duration, now]
+            concurrency.started(book_id)
+        per_encode = server_throughput(len(running), cores) / len(running) * STEP
+        now += STEP
+        for book_id, encode in list(running.items()):
+            encode[0] -= per_encode
+            if encode[0] <= 0:
+                del running[book_id]
+                concurrency.finished(book_id, encode[1], now - encode[2])
+    return now / 3600
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '-v']
+    num_books = int(args[0]) if len(args) > 0 else 400
+    cores = int(args[1]) if len(args) > 1 else 4
+    initial = int(args[2]) if len(args) > 2 else 2
+    durations = [3600.0 * (2 + i % 9) for i in range(num_books)]
+    print(f"{num_books} books, {sum(durations) / 3600:.0f} h of audio, server with {cores} cores,"
+          f" {SINGLE_SPEED:g}x realtime per encode")
+    for slots in sorted({1, 2, cores, cores + 2, 8}):
+        hours = simulate(durations, cores, AdaptiveConcurrency(slots, slots, slots))
+        print(f"fixed {slots:2}       {hours:7.1f} h")
+    if '-v' in sys.argv:
+        logging.basicConfig(level=logging.INFO, format='%(message)s')
+    concurrency = AdaptiveConcurrency(initial, 1, 8)
+    hours = simulate(durations, cores, concurrency)
+    actions = [decision.action for decision in concurrency.decisions]
+    measurements = {}
+    for decision in concurrency.decisions:
+        measurements[decision.slots] = measurements.get(decision.slots, 0) + 1
+    print(f"adaptive 1-8   {hours:7.1f} h, {len(actions)} decisions ({actions.count('increase')} increase,"
+          f" {actions.count('decrease')} decrease, {actions.count('hold')} hold), measurements by slots"
+          f" {dict(sorted(measurements.items()))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Time and bytes of polling an unchanged library item list with a ConditionalCache, against downloading and
+decoding it every time.
+
+Starts a local HTTP/1.1 stub server serving a synthetic library listing. With validators on, it sends a strong
+ETag and answers a matching If-None-Match with 304 Not Modified, like Audiobookshelf's Express server does; with
+validators off it always answers in full, leaving the cache only its body hash to recognize the unchanged list.
+Halfway through, the library changes once, and the polls after it must see the change.
+
+Run from the repository root:
+    python -m benchmarks.bench_conditional_get [num_items] [num_polls]
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from audiobookshelfapi.conditional_get import ConditionalCache
+from benchmarks.bench_connection_pool import StubHandler
+from benchmarks.fixtures import make_library_items
+
+
+class ValidatingItemsHandler(StubHandler):
+    body = b''
+    etag = ''
+    validators = True
+    bytes_sent = 0
+
+    def do_GET(self):
+        if not self.path.startswith('/api/libraries/lib_1/items'):
+            super().do_GET()
+            return
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.validators and self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        if self.validators:
+            self.send_header('ETag', self.etag)
+        self.end_headers()
+        self.wfile.write(self.body)
+        ValidatingItemsHandler.bytes_sent += len(self.body)
+
+
+def serve(items):
+    ValidatingItemsHandler.body = json.dumps({'results': items, 'total': len(items)}).encode()
+    ValidatingItemsHandler.etag = f'"{hashlib.sha1(ValidatingItemsHandler.body).hexdigest()}"'
+
+
+def poll(a, items, num_polls):
+    serve(items)
+    ValidatingItemsHandler.bytes_sent = 0
+    elapsed = 0.0
+    for i in range(num_polls):
+        if i == num_polls // 2:
+            items[0]['media']['numAudioFiles'] = 1
+            serve(items)
+        start = time.perf_counter()
+        result = a.get_all_library_items('lib_1')
+        elapsed += time.perf_counter() - start
+        assert (result[0].media.numAudioFiles == 1) == (i >= num_polls // 2), "a poll returned a stale library"
+    items[0]['media']['numAudioFiles'] = 2
+    return elapsed / num_polls, ValidatingItemsHandler.bytes_sent / num_polls
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    num_polls = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    items = make_library_items(num_items)
+    items[0]['media']['numAudioFiles'] = 2
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ValidatingItemsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = {}
+    try:
+        with AudiobookshelfAPI(url, 'token') as a:
+            results['no cache'] = poll(a, items, num_polls)
+        for validators in (True, False):
+            ValidatingItemsHandler.validators = validators
+            cache = ConditionalCache()
+            with AudiobookshelfAPI(url, 'token', conditional_cache=cache) as a:
+                results['ETag, 304' if validators else 'body hash'] = poll(a, items, num_polls)
+            print(f"{'ETag, 304' if validators else 'body hash':10} {cache.stats}")
+    finally:
+        server.shutdown()
+
+    print(f"{num_items} library items, {len(ValidatingItemsHandler.body) / 2 ** 20:.1f} MiB, {num_polls} polls,"
+          f" one change")
+    for name, (elapsed, sent) in results.items():
+        print(f"{name:10} {elapsed * 1000:8.1f} ms, {sent / 2 ** 20:6.2f} MiB per poll")
+
+
+if __name__ == "__main__":
+    main()
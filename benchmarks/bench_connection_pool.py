@@ -0,0 +1,91 @@
+"""
+Requests-per-second of AudiobookshelfAPI's pooled keep-alive transport against a fresh connection per request.
+
+Starts a local HTTP/1.1 stub server that answers /ping and /api/libraries, then issues the same number of
+get_all_libraries calls through both transports.
+
+Run from the repository root:
+    python -m benchmarks.bench_connection_pool [num_requests]
+"""
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+
+LIBRARIES_BODY = (b'{"libraries":[{"id":"lib_1","name":"Audiobooks","folders":[],"displayOrder":1,'
+                  b'"icon":"database","mediaType":"book","provider":"google","settings":{},'
+                  b'"createdAt":0,"lastUpdate":0}]}')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the server keeps connections alive between requests
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, without TCP_NODELAY keep-alive responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        # the client sends a JSON body with its GETs, read it so the connection can be reused
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path == '/ping':
+            body = b'{"success":true}'
+        elif self.path == '/api/libraries':
+            body = LIBRARIES_BODY
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_unpooled(url, headers, num_requests):
+    # the transport AudiobookshelfAPI used before pooling, a new connection for every request
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        response = requests.get(url + '/api/libraries', headers=headers, json={})
+        response.raise_for_status()
+        response.json()
+    return num_requests / (time.perf_counter() - start)
+
+
+def bench_pooled(url, num_requests):
+    with AudiobookshelfAPI(url, 'token') as a:
+        start = time.perf_counter()
+        for _ in range(num_requests):
+            a.get_all_libraries()
+        return num_requests / (time.perf_counter() - start)
+
+
+def main():
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    server = start_stub_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    headers = {'Content-Type': 'application/json', 'Authorization': 'Bearer token'}
+    try:
+        unpooled = bench_unpooled(url, headers, num_requests)
+        pooled = bench_pooled(url, num_requests)
+    finally:
+        server.shutdown()
+
+    print(f"{num_requests} requests")
+    print(f"New connection per request: {unpooled:8.1f} req/s")
+    print(f"Pooled keep-alive session:  {pooled:8.1f} req/s ({pooled / unpooled:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Decode time of a synthetic library listing with the generated decoders against the original reflective
+Base.from_dict.
+
+The reflective path only decoded LibraryItem and, through LibraryItem.__post_init__, its Book; the generated
+decoders build the whole tree of nested objects. For a like for like comparison the reflective path is also timed
+with its checks fixed to match the resolved annotations, so that it builds the same tree. tests/test_objects.py
+checks that every nested field decodes.
+
+The lazy decoders are timed on ConvertM4B's poll, which only reads a handful of fields of each item, and the
+memory they allocate on top of the raw dictionaries is compared with eager decoding.
+
+Run from the repository root:
+    python -m benchmarks.bench_decode [num_items]
+"""
+import sys
+import time
+import tracemalloc
+import typing
+from contextlib import contextmanager
+from dataclasses import fields
+
+import Objects
+from Objects import Book, LibraryItem
+from benchmarks.fixtures import make_library_items
+
+
+def reflective_from_dict(cls, data):
+    # Base.from_dict before the decoders were generated: fields() twice per instance and a second walk over the
+    # fields whose isinstance checks never match
+    valid_data = {field.name: data[field.name] if field.name in data else None for field in fields(cls)}
+    new_instance = cls(**valid_data)
+    for field in fields(new_instance):
+        if isinstance(field.type, Objects.Base):
+            setattr(new_instance, field.type, field.type.from_dict(getattr(new_instance, field.name)))
+        elif isinstance(field.type, list) and hasattr(field.type, '__args__') and len(
+                field.type.__args__) > 0 and isinstance(field.type.__args__[0], Objects.Base):
+            setattr(new_instance, field.name, [field.type.__args__[0].from_dict(item)
+                                               for item in getattr(new_instance, field.name)])
+    # LibraryItem.__post_init__ decoded media
+    if cls is LibraryItem and type(new_instance.media) is dict:
+        new_instance.media = Book.from_dict(new_instance.media)
+    return new_instance
+
+
+# the resolved annotations of the classes decoded by reflective_tree_from_dict
+_hints = {}
+
+
+def reflective_tree_from_dict(cls, data):
+    # the reflective path with its checks matching the annotations, resolved once per class, building the whole tree
+    hints = _hints.get(cls)
+    if hints is None:
+        hints = _hints[cls] = typing.get_type_hints(cls)
+    valid_data = {field.name: data[field.name] if field.name in data else None for field in fields(cls)}
+    new_instance = cls(**valid_data)
+    for field in fields(new_instance):
+        value = getattr(new_instance, field.name)
+        if value is None:
+            continue
+        tp = hints[field.name]
+        if field.name in cls._union_selectors:
+            tp = union_members(tp)[cls._union_selectors[field.name](data)]
+        setattr(new_instance, field.name, reflective_convert(tp, value))
+    return new_instance
+
+
+def union_members(tp):
+    if typing.get_origin(tp) is not typing.Union:
+        return []
+    return [arg for arg in typing.get_args(tp) if arg is not type(None)]
+
+
+def reflective_convert(tp, value):
+    if typing.get_origin(tp) is type:
+        tp = typing.get_args(tp)[0]
+    if isinstance(tp, type) and issubclass(tp, Objects.Base):
+        return tp.from_dict(value)
+    if typing.get_origin(tp) is list:
+        return [reflective_convert(typing.get_args(tp)[0], item) for item in value]
+    members = union_members(tp)
+    # Optional[X]. Unions of several classes without a selector are left as dictionaries
+    return reflective_convert(members[0], value) if len(members) == 1 else value
+
+
+@contextmanager
+def reflective_decoding(from_dict=reflective_from_dict):
+    generated = Objects.Base.__dict__['from_dict']
+    Objects.Base.from_dict = classmethod(from_dict)
+    try:
+        yield
+    finally:
+        Objects.Base.from_dict = generated
+
+
+def time_decode(decode, items, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(items)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def poll(items, lazy):
+    # the fields ConvertM4B.encode_books reads from every library item
+    decoded = LibraryItem.from_list(items, lazy=lazy)
+    for item in decoded:
+        if not item.isMissing and not item.isInvalid and item.media.numAudioFiles > 1:
+            item.id, item.media.duration, item.media.metadata.title
+    return decoded
+
+
+def allocated_by(function):
+    tracemalloc.start()
+    result = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    items = make_library_items(num_items)
+
+    with reflective_decoding():
+        reflective = time_decode(lambda data: [LibraryItem.from_dict(item) for item in data], items)
+    with reflective_decoding(reflective_tree_from_dict):
+        reflective_tree = time_decode(lambda data: [LibraryItem.from_dict(item) for item in data], items)
+        assert [LibraryItem.from_dict(item) for item in items[:100]] == LibraryItem.from_list(items[:100]), \
+            "the reflective and the generated decoders built different trees"
+    generated = time_decode(LibraryItem.from_list, items)
+    eager_poll = time_decode(lambda data: poll(data, lazy=False), items)
+    lazy_poll = time_decode(lambda data: poll(data, lazy=True), items)
+    eager_memory = allocated_by(lambda: poll(items, lazy=False))
+    lazy_memory = allocated_by(lambda: poll(items, lazy=True))
+
+    print(f"{num_items} library items, best of 3")
+    print(f"Reflective Base.from_dict, LibraryItem and Book only: {reflective * 1000:8.1f} ms")
+    print(f"Reflective Base.from_dict, whole tree:                {reflective_tree * 1000:8.1f} ms")
+    print(f"Generated decoders, whole tree:                       {generated * 1000:8.1f} ms"
+          f" ({reflective_tree / generated:.2f}x the reflective whole tree)")
+    print(f"ConvertM4B poll, eager:                               {eager_poll * 1000:8.1f} ms,"
+          f" {eager_memory / 2 ** 20:6.1f} MiB")
+    print(f"ConvertM4B poll, lazy:                                {lazy_poll * 1000:8.1f} ms,"
+          f" {lazy_memory / 2 ** 20:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
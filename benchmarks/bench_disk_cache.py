@@ -0,0 +1,67 @@
+"""
+Startup time of ConvertM4B, up to having the multitrack books to schedule, with a cold and a warm DiskCache.
+
+Starts the stub library server of bench_sync, then runs ConvertM4B's startup twice against the same cache file:
+ping, find the library by name, and sync the library's items. The cold run lists the whole library and fills the
+cache; the warm run serves the libraries from the cache and revalidates the cached snapshot with a single
+incremental page. A few books are changed between the runs to check that the warm run sees them.
+
+Run from the repository root:
+    python -m benchmarks.bench_disk_cache [num_items]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from audiobookshelfapi.disk_cache import DiskCache
+from audiobookshelfapi.sync import LibrarySyncer
+from benchmarks.bench_sync import LibraryHandler, encode
+from benchmarks.fixtures import make_library_item_minified
+
+
+def startup(url, cache_path):
+    start = time.perf_counter()
+    with DiskCache(cache_path, url) as disk_cache:
+        with AudiobookshelfAPI(url, 'token', disk_cache=disk_cache) as a:
+            library = next(lib for lib in a.get_all_libraries() if lib.name == 'Audiobooks')
+            syncer = LibrarySyncer(a, library.id, minified=True, lazy=True, cache=disk_cache)
+            syncer.sync()
+            books = sorted((book for book in syncer.items.values() if book.media.numAudioFiles > 1),
+                           key=lambda book: book.media.duration)
+            elapsed = time.perf_counter() - start
+    return elapsed, [book.id for book in books]
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    LibraryHandler.items = {item['id']: item for item in map(make_library_item_minified, range(num_items))}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), LibraryHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, 'cache.sqlite3')
+        try:
+            LibraryHandler.bytes_sent = 0
+            cold, cold_books = startup(url, cache_path)
+            cold_bytes = LibraryHandler.bytes_sent
+            encode(cold_books[:5], 1700000000000)
+            LibraryHandler.bytes_sent = 0
+            warm, warm_books = startup(url, cache_path)
+            warm_bytes = LibraryHandler.bytes_sent
+            cache_size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        finally:
+            server.shutdown()
+    assert warm_books == cold_books[5:], "the warm start missed changes made since the cold start"
+
+    print(f"{num_items} library items, {len(warm_books)} multitrack books, {cache_size / 2 ** 20:.1f} MiB cache")
+    print(f"Cold start: {cold * 1000:8.1f} ms, {cold_bytes / 2 ** 10:8.1f} KiB of library items")
+    print(f"Warm start: {warm * 1000:8.1f} ms, {warm_bytes / 2 ** 10:8.1f} KiB of library items")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Error of EncodePredictor's encode time estimates against estimating from a fixed encode speed.
+
+Generates encodes of books with various durations, file counts, codecs and bit rates, run next to up to three
+others, whose times follow a made-up server: AAC sources are remuxed quickly, others are transcoded at a cost
+rising with bit rate, encodes sharing the server slow each other down, and every file adds a little. The records
+go through an EncodeHistory on disk; the predictor is fitted to the first ones and scored on the rest.
+
+Run from the repository root:
+    python -m benchmarks.bench_encode_eta [num_records]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from audiobookshelfapi import Config
+from audiobookshelfapi.encode_history import EncodeHistory, EncodePredictor, EncodeRecord
+
+
+def make_records(count, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        duration = rng.uniform(1, 20) * 3600
+        num_audio_files = rng.randint(2, 60)
+        codec = 'aac' if rng.random() < 0.3 else 'mp3'
+        bit_rate = rng.choice([64000, 128000, 192000])
+        concurrent = rng.randint(1, 4)
+        seconds_per_hour = 25 if codec == 'aac' else 90 * (0.8 + 0.2 * bit_rate / 128000)
+        elapsed = (20 + 3 * num_audio_files + duration / 3600 * seconds_per_hour * (1 + 0.35 * (concurrent - 1)))
+        elapsed *= rng.lognormvariate(0, 0.1)
+        records.append(EncodeRecord(f'li_{i}', duration, num_audio_files, int(duration * bit_rate / 8), codec,
+                                    bit_rate, concurrent, elapsed, 1700000000 + i * 600))
+    return records
+
+
+def error(predictor, records):
+    # mean absolute percentage error
+    predictions = predictor.predict_records(records)
+    return statistics.mean(abs(p - r.elapsed) / r.elapsed for p, r in zip(predictions, records)) * 100
+
+
+def main():
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    records = make_records(num_records)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'history.sqlite3')
+        with EncodeHistory(path) as history:
+            for record in records[:num_records // 2]:
+                history.add(record)
+        # read back by a later run
+        with EncodeHistory(path) as history:
+            train = history.records()
+    assert train == records[:num_records // 2], "the history did not round trip"
+    test = records[num_records // 2:]
+
+    print(f"{len(train)} encodes to fit, {len(test)} to score, mean absolute percentage error")
+    fixed = EncodePredictor(fallback_speed=Config.EncodeSpeed)
+    print(f"fixed speed {Config.EncodeSpeed}x      {error(fixed, test):6.1f} %")
+    for size in (15, 30, 100, len(train)):
+        predictor = EncodePredictor(fallback_speed=Config.EncodeSpeed)
+        start = time.perf_counter()
+        predictor.fit(train[-size:])
+        elapsed = time.perf_counter() - start
+        print(f"fitted, {size:3} encodes  {error(predictor, test):6.1f} %, fit in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
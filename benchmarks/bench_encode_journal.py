@@ -0,0 +1,108 @@
+"""
+Crash recovery and cost of EncodeJournal.
+
+A child process requests encodes the way ConvertM4B does, journaling each one before and after the request to a
+fake server, a file of the requested library item IDs, and is killed after a random number of steps, between
+any two of them. The server then finishes some of the encodes it accepted. The journal is reconciled against the
+server, and a restarted run requests every book neither resumed nor finished: no book may be requested twice, and
+none may be left out. Then the cost of journaling an encode, synced to disk, and of reconciling a long journal.
+
+Run from the repository root:
+    python -m benchmarks.bench_encode_journal [crashes] [journal_encodes]
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from audiobookshelfapi.encode_journal import EncodeJournal, FINISHED, LOST
+
+NUM_BOOKS = 20
+
+CHILD = """
+import os, sys
+from audiobookshelfapi.encode_journal import EncodeJournal
+journal = EncodeJournal(sys.argv[1])
+steps = int(sys.argv[3])
+with open(sys.argv[2], 'a') as server:
+    for i in range({num_books}):
+        for step in ('submitting', 'post', 'started'):
+            if steps == 0:
+                os._exit(1)
+            steps -= 1
+            if step == 'submitting':
+                journal.submitting(f'li_{{i}}', 1)
+            elif step == 'post':
+                server.write(f'li_{{i}}\\n')
+                server.flush()
+                os.fsync(server.fileno())
+            else:
+                journal.started(f'li_{{i}}')
+""".format(num_books=NUM_BOOKS)
+
+
+def crash_and_recover(directory, seed):
+    rng = random.Random(seed)
+    journal_path = os.path.join(directory, f'journal_{seed}.sqlite3')
+    server_path = os.path.join(directory, f'server_{seed}.txt')
+    open(server_path, 'w').close()
+    steps = rng.randint(0, 3 * NUM_BOOKS - 1)
+    subprocess.run([sys.executable, '-c', CHILD, journal_path, server_path, str(steps)], check=False)
+
+    with open(server_path) as server:
+        requested = server.read().split()
+    # the server finishes some encodes while nothing runs
+    server_finished = {item_id for item_id in requested if rng.random() < 0.5}
+    running = set(requested) - server_finished
+    multitrack = {f'li_{i}' for i in range(NUM_BOOKS)} - server_finished
+
+    with EncodeJournal(journal_path) as journal:
+        resumed = {entry.libraryItemId for entry in journal.reconcile(running, multitrack)}
+        entries = journal.entries()
+    assert resumed == running, f"resumed {resumed}, the server is running {running}"
+    assert all(entries[item_id].state == FINISHED for item_id in server_finished)
+    assert all(entry.state == LOST for item_id, entry in entries.items() if item_id not in requested)
+    # a restarted run requests the multitrack books it does not wait for
+    requested_again = multitrack - resumed
+    assert not requested_again & set(requested), "a book would be requested twice"
+    assert requested_again | resumed | server_finished == {f'li_{i}' for i in range(NUM_BOOKS)}
+    return len(resumed), len(server_finished), len(requested_again)
+
+
+def main():
+    crashes = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    journal_encodes = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    with tempfile.TemporaryDirectory() as directory:
+        totals = [0, 0, 0]
+        for seed in range(crashes):
+            for i, count in enumerate(crash_and_recover(directory, seed)):
+                totals[i] += count
+        print(f"{crashes} crashes of a run of {NUM_BOOKS} books: {totals[0]} encodes resumed, {totals[1]} found"
+              f" finished, {totals[2]} requested again, none twice")
+
+        with EncodeJournal(os.path.join(directory, 'long.sqlite3')) as journal:
+            start = time.perf_counter()
+            for i in range(200):
+                journal.submitting(f'li_{i}', 2)
+                journal.started(f'li_{i}')
+                journal.finished(f'li_{i}')
+            per_encode = (time.perf_counter() - start) / 200
+            print(f"journaling an encode (3 synced appends) {per_encode * 1000:.2f} ms")
+            for i in range(200, journal_encodes):
+                journal.submitting(f'li_{i}', 2)
+                journal.started(f'li_{i}')
+                if i < journal_encodes - 4:
+                    journal.finished(f'li_{i}')
+            start = time.perf_counter()
+            resumed = journal.reconcile(None, {f'li_{i}' for i in range(journal_encodes)})
+            elapsed = time.perf_counter() - start
+            # the last 4 encodes past the first 200 are left open
+            open_encodes = max(0, journal_encodes - max(200, journal_encodes - 4))
+            assert len(resumed) == open_encodes, f"resumed {len(resumed)} encodes, {open_encodes} were open"
+            print(f"reconciling a journal of {max(200, journal_encodes)} encodes {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
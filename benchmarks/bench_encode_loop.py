@@ -0,0 +1,50 @@
+"""
+Nights, throughput, window utilization, polls and bytes of encoding a synthetic library with ConvertM4B's encode
+loop under different settings, on the simulator's virtual clock.
+
+Every row runs the real encode_books against the same library on a simulated server with 4 cores, see
+benchmarks.encode_simulator. The first row is the default Config, the others change one or two settings.
+
+Run from the repository root:
+    python -m benchmarks.bench_encode_loop [num_books] [cores]
+"""
+import sys
+from dataclasses import replace
+
+from benchmarks.encode_simulator import SimulationConfig, make_books, simulate
+
+
+def main():
+    num_books = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    cores = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    books = make_books(num_books)
+    base = SimulationConfig(cores=cores)
+    configs = {
+        'default (2, poll 60 s)': base,
+        'fixed 1': replace(base, slots=1),
+        f'fixed {cores}': replace(base, slots=cores),
+        f'fixed {cores + 2}': replace(base, slots=cores + 2),
+        'poll 300 s': replace(base, check_interval=300),
+        'socket events': replace(base, socket_events=True),
+        'adaptive 1-8, socket': replace(base, min_slots=1, max_slots=8, socket_events=True),
+        'largest first': replace(base, policy='largest'),
+        'all day window': replace(base, start_hour=0, end_hour=0, start=base.start.replace(hour=0)),
+    }
+
+    print(f"{num_books} books, {cores} cores at {base.server_speed:g}x realtime per encode,"
+          f" window {base.start_hour}:00-{base.end_hour}:00")
+    print(f"{'':24} {'nights':>6} {'audio h/window h':>16} {'utilization':>11} {'h outside':>9} {'polls':>6}"
+          f" {'MB':>7} {'real s':>6}")
+    for name, config in configs.items():
+        result = simulate(books, config)
+        if name == 'default (2, poll 60 s)':
+            # the virtual clock makes a simulation deterministic
+            again = simulate(books, config)
+            assert replace(again, elapsed=0) == replace(result, elapsed=0), "the simulation is not deterministic"
+        print(f"{name:24} {result.nights:6.2f} {result.throughput:16.1f} {result.utilization:11.0%}"
+              f" {result.outside_window_hours:9.1f} {result.polls:6} {result.total_bytes / 1e6:7.1f}"
+              f" {result.elapsed:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+A fast event handler next to a slow one, with EventStream's worker pool and per-handler queues against handlers
+registered on the SocketClient directly.
+
+Starts the local FakeSocketServer and pushes item_updated events with an expanded library item at a steady rate.
+One handler records when each item arrives, the other sleeps longer than the time between events, as a handler
+writing to a slow database would. The socket.io client calls the handlers of an event one after the other, on a
+new thread per event, so registered directly the fast handler waits for the slow one every time, threads pile up,
+one per event the slow handler has not finished, and events overtake each other. On the stream, handlers run on a
+fixed pool, each one at a time, and the slow one drops its oldest events once its queue is full.
+
+Run from the repository root:
+    python -m benchmarks.bench_events [num_events] [interval_ms] [slow_ms] [max_pending]
+"""
+import statistics
+import sys
+import threading
+import time
+
+import Objects
+from audiobookshelfapi.events import EventStream
+from audiobookshelfapi.socket_client import SocketClient
+from audiobookshelfenums import SocketEvent
+from benchmarks.fake_socket_server import FakeSocketServer
+from benchmarks.fixtures import make_library_item_expanded
+
+
+class Recorder:
+    # what the fast handler saw, and the most threads alive while the slow handler ran
+    def __init__(self, num_events):
+        self.num_events = num_events
+        self.arrived = {}
+        self.out_of_order = 0
+        self.peak_threads = 0
+        self.done = threading.Event()
+
+    def fast(self, item):
+        index = int((item['id'] if isinstance(item, dict) else item.id).split('_')[1])
+        self.out_of_order += index < len(self.arrived)
+        self.arrived[index] = time.perf_counter()
+        if len(self.arrived) == self.num_events:
+            self.done.set()
+
+    def slow(self, slow_ms):
+        def handler(item):
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            time.sleep(slow_ms / 1000)
+        return handler
+
+
+def push(server, items, interval_ms, recorder):
+    sent = []
+    start = time.perf_counter()
+    for i, item in enumerate(items):
+        # paced well below what the connection can carry, so only the handlers can fall behind
+        time.sleep(max(0.0, start + i * interval_ms / 1000 - time.perf_counter()))
+        sent.append(time.perf_counter())
+        server.emit(SocketEvent.ITEM_UPDATED.value, item)
+    assert recorder.done.wait(60), "not every event reached the fast handler"
+    return [recorder.arrived[i] - sent[i] for i in range(len(sent))]
+
+
+def run(server, items, interval_ms, slow_ms, max_pending, inline):
+    recorder = Recorder(len(items))
+    if inline:
+        socket = SocketClient(server.url, 'token')
+        socket.on(SocketEvent.ITEM_UPDATED, lambda item: Objects.LibraryItemExpanded.from_dict(item))
+        socket.on(SocketEvent.ITEM_UPDATED, recorder.slow(slow_ms))
+        socket.on(SocketEvent.ITEM_UPDATED, recorder.fast)
+        socket.connect()
+        try:
+            return push(server, items, interval_ms, recorder), recorder, None
+        finally:
+            socket.disconnect()
+
+    with EventStream(server.url, 'token', workers=4) as events:
+        events.on(SocketEvent.ITEM_UPDATED, recorder.slow(slow_ms), max_pending=max_pending)
+        events.on(SocketEvent.ITEM_UPDATED, recorder.fast)
+        events.connect()
+        latencies = push(server, items, interval_ms, recorder)
+        assert events.stats.failed == 0, "a handler failed"
+        return latencies, recorder, events.stats
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    interval_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    slow_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 200
+    max_pending = int(sys.argv[4]) if len(sys.argv) > 4 else 50
+    items = [make_library_item_expanded(i) for i in range(num_events)]
+
+    server = FakeSocketServer('token')
+    server.start()
+    try:
+        results = {'SocketClient': run(server, items, interval_ms, slow_ms, max_pending, inline=True),
+                   'EventStream': run(server, items, interval_ms, slow_ms, max_pending, inline=False)}
+    finally:
+        server.stop()
+
+    print(f"{num_events} item_updated events every {interval_ms:g} ms, slow handler {slow_ms:g} ms per event,"
+          f" slow queue {max_pending} events")
+    for name, (latencies, recorder, stats) in results.items():
+        latencies = sorted(latencies)
+        print(f"{name:12} fast handler: median {statistics.median(latencies) * 1000:6.2f} ms,"
+              f" p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:6.2f} ms,"
+              f" {recorder.out_of_order} out of order; peak threads {recorder.peak_threads}")
+        if stats is not None:
+            print(f"{'':12} {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Overhead and accuracy of the per-request instrumentation of AudiobookshelfAPI against the mock server.
+
+    - overhead: small requests per second without instrumentation, with a no-op hook and with the histogram
+      aggregator;
+    - phases: with an injected latency, that it shows up as wait, and that listing a large library spends its time
+      parsing and decoding;
+    - errors: that failed requests are recorded with their status;
+    - prometheus: the size of the text exposition and that it can be scraped from serve_prometheus.
+
+Run from the repository root:
+    python -m benchmarks.bench_instrumentation [num_items] [num_requests]
+"""
+import sys
+import time
+import urllib.request
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from audiobookshelfapi.instrumentation import HistogramAggregator, Instrumentation, prometheus_text, \
+    serve_prometheus
+from benchmarks.mock_server import MockServer
+
+
+def requests_per_second(a, library_id, num_requests):
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        a.get_library(library_id)
+    return num_requests / (time.perf_counter() - start)
+
+
+def bench_overhead(num_requests):
+    print("overhead, get_library")
+    with MockServer(items_per_library=10) as server:
+        library_id = server.library_ids[0]
+        for name, instrumentation in (('none', None), ('no-op hook', Instrumentation([lambda record: None])),
+                                      ('aggregator', Instrumentation([HistogramAggregator()]))):
+            with AudiobookshelfAPI(server.url, server.token, instrumentation=instrumentation) as a:
+                requests_per_second(a, library_id, num_requests // 10)  # warm up the connection
+                rate = requests_per_second(a, library_id, num_requests)
+                print(f"  {name:10} {rate:8.0f} req/s, {1e6 / rate:6.0f} us/req")
+
+
+def print_summary(aggregator):
+    print(f"  {'':42} {'calls':>5} {'wait':>8} {'download':>8} {'parse':>8} {'decode':>8} {'total':>8} {'KiB':>8}")
+    for row in aggregator.summary():
+        print(f"  {row['method'] + ' ' + row['endpoint']:42} {row['calls']:5}"
+              + ''.join(f" {row[f'{phase}_mean'] * 1000:6.1f}ms"
+                        for phase in ('wait', 'download', 'parse', 'decode', 'total'))
+              + f" {row['response_bytes'] / 1024 / row['calls']:8.1f}")
+
+
+def bench_phases(num_items, latency=0.02):
+    print(f"phases, means per call with {latency * 1000:.0f} ms of latency")
+    aggregator = HistogramAggregator()
+    records = []
+    with MockServer(items_per_library=num_items, latency=latency) as server:
+        with AudiobookshelfAPI(server.url, server.token,
+                               instrumentation=Instrumentation([aggregator, records.append])) as a:
+            library_id = server.library_ids[0]
+            for _ in range(20):
+                a.get_library(library_id)
+            a.get_all_library_items(library_id)
+            a.get_library_collections(library_id)
+            items = a.get_all_library_items(library_id, minified=True)
+            assert a.get_library_item(items[0].id, expanded=True).id == items[0].id
+    print_summary(aggregator)
+
+    library = [record for record in records if record.endpoint == '/api/libraries/{id}']
+    assert all(record.wait >= latency for record in library), "the latency was not attributed to wait"
+    listing = max(records, key=lambda record: record.response_bytes)
+    assert listing.parse > 0 and listing.decode > 0, "parsing and decoding were not timed"
+    for record in records:
+        phases = record.wait + record.download + record.parse + record.decode
+        assert phases <= record.total * 1.01 + 1e-4, f"the phases of {record.endpoint} exceed its total"
+    print(f"  {len(records)} records, the phases of the listing cover"
+          f" {(listing.wait + listing.download + listing.parse + listing.decode) / listing.total:.0%} of its total")
+
+
+def bench_errors(num_requests, error_rate=0.1):
+    print(f"errors, {error_rate:.0%} of requests fail")
+    records = []
+    with MockServer(items_per_library=10, error_rate=error_rate) as server:
+        with AudiobookshelfAPI(server.url, server.token, instrumentation=Instrumentation([records.append])) as a:
+            for _ in range(num_requests):
+                try:
+                    a.get_library(server.library_ids[0])
+                except Exception:
+                    pass
+            failed = [record for record in records if record.error is not None]
+            assert len(failed) == server.errors['library'], "a failed request was not recorded as one"
+            assert all(record.status >= 500 for record in failed)
+            print(f"  {len(failed)} of {len(records)} records carry an error, the server failed"
+                  f" {server.errors['library']}")
+
+
+def bench_prometheus(num_requests):
+    print("prometheus")
+    aggregator = HistogramAggregator()
+    with MockServer(items_per_library=10) as server:
+        with AudiobookshelfAPI(server.url, server.token, instrumentation=Instrumentation([aggregator])) as a:
+            for _ in range(num_requests // 10):
+                a.get_library(server.library_ids[0])
+                a.get_all_libraries(cached=False)
+    start = time.perf_counter()
+    text = prometheus_text(aggregator)
+    rendered = time.perf_counter() - start
+    metrics = serve_prometheus(aggregator, port=0, host='127.0.0.1')
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{metrics.server_address[1]}/metrics") as response:
+            scraped = response.read().decode()
+    finally:
+        metrics.shutdown()
+    assert scraped == text
+    print(f"  {len(text.splitlines())} lines, {len(text) / 1024:.1f} KiB rendered in {rendered * 1000:.2f} ms,"
+          f" scraped from /metrics")
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    num_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    bench_overhead(num_requests)
+    bench_phases(num_items)
+    bench_errors(num_requests // 4)
+    bench_prometheus(num_requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Parse and serialize time of the installed JSON backends on the common Audiobookshelf response shapes.
+
+The baseline is what `requests`' response.json() did: decode the bytes to str, then parse with the standard
+library.
+
+Run from the repository root:
+    python -m benchmarks.bench_json [num_items]
+"""
+import json
+import sys
+import time
+
+from audiobookshelfapi.json_backend import available_backends, get_backend
+from benchmarks.fixtures import make_library_item_expanded, make_library_items
+from audiobookshelfenums import Icon
+
+
+def best_time(function, argument, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    libraries = {'libraries': [{'id': f'lib_{i}', 'name': f'Library {i}', 'folders': [], 'displayOrder': i,
+                                'icon': 'database', 'mediaType': 'book', 'provider': 'google', 'settings': {},
+                                'createdAt': 0, 'lastUpdate': 0} for i in range(5)]}
+    shapes = {
+        'ping': b'{"success":true}',
+        'libraries': json.dumps(libraries).encode(),
+        'expanded item': json.dumps(make_library_item_expanded(0, num_audio_files=20)).encode(),
+        f'{num_items} items': json.dumps({'results': make_library_items(num_items)}).encode(),
+    }
+    payload = {'name': 'Audiobooks', 'displayOrder': 1, 'icon': Icon.BOOK_1,
+               'folders': [{'id': f'fol_{i}', 'fullPath': f'/audiobooks/{i}'} for i in range(5)]}
+
+    backends = available_backends()
+    print(f"microseconds    {'requests .json()':>18}" + ''.join(f'{name:>12}' for name in backends))
+    for shape, body in shapes.items():
+        repeat = 3 if len(body) > 1000000 else 1000
+        baseline = best_time(lambda raw: json.loads(raw.decode()), body, repeat)
+        row = f"{shape:16}{baseline * 1e6:18.1f}"
+        for name in backends:
+            row += f"{best_time(get_backend(name).loads, body, repeat) * 1e6:12.1f}"
+        print(row)
+
+    row = f"{'update payload':16}{'':18}"
+    for name in backends:
+        row += f"{best_time(get_backend(name).dumps, payload, 1000) * 1e6:12.1f}"
+    print(row)
+
+
+if __name__ == "__main__":
+    main()
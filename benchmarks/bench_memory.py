@@ -0,0 +1,54 @@
+"""
+Memory held by decoded library items with the Objects classes against the slotted SlottedObjects classes.
+
+Only the memory allocated while decoding, and still held by the decoded items, is counted; the raw dictionaries
+are built before tracing starts. Every field of the decoded trees is read while tracing, so both sides are
+measured fully built whatever their decoders defer.
+
+Run from the repository root:
+    python -m benchmarks.bench_memory [num_items]
+"""
+import sys
+import tracemalloc
+from dataclasses import fields
+
+import Objects
+import SlottedObjects
+from benchmarks.fixtures import make_library_items
+
+
+def materialize(value):
+    # reads every field of a decoded tree, building whatever was not built yet
+    if isinstance(value, list):
+        for item in value:
+            materialize(item)
+    elif isinstance(value, Objects.Base):
+        for field in fields(value):
+            materialize(getattr(value, field.name))
+
+
+def retained_by_decode(models, items):
+    tracemalloc.start()
+    decoded = models.LibraryItem.from_list(items)
+    materialize(decoded)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del decoded
+    return size
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    items = make_library_items(num_items)
+
+    regular = retained_by_decode(Objects, items)
+    slotted = retained_by_decode(SlottedObjects, items)
+
+    per_10k = 10000 / num_items / 2 ** 20
+    print(f"{num_items} library items, MiB per 10k items")
+    print(f"Objects:        {regular * per_10k:7.1f} MiB")
+    print(f"SlottedObjects: {slotted * per_10k:7.1f} MiB ({slotted / regular:.0%})")
+
+
+if __name__ == "__main__":
+    main()
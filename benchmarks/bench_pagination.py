@@ -0,0 +1,99 @@
+"""
+Wall-clock time and peak memory of walking a library with iter_library_item_pages, at several prefetch depths,
+against get_all_library_items' single response.
+
+Starts a local HTTP/1.1 stub server that pages a synthetic library listing by the limit and page query parameters.
+A real server spends time querying and serializing every item it returns; the stub sleeps for server_ms_per_item
+per item to stand in for it, which is the work prefetching overlaps across pages.
+
+Run from the repository root:
+    python -m benchmarks.bench_pagination [num_items] [page_size] [server_ms_per_item]
+"""
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from benchmarks.bench_connection_pool import StubHandler
+from benchmarks.fixtures import make_library_items
+
+
+class PagedItemsHandler(StubHandler):
+    items = []
+    server_seconds_per_item = 0.0
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != '/api/libraries/lib_1/items':
+            super().do_GET()
+            return
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        query = parse_qs(url.query)
+        limit = int(query.get('limit', ['0'])[0])
+        page = int(query.get('page', ['0'])[0])
+        results = self.items[limit * page:limit * (page + 1)] if limit else self.items
+        time.sleep(len(results) * self.server_seconds_per_item)
+        # the items are serialized up front, so the stub does not compete with the client for the GIL
+        body = (b'{"results":[' + b','.join(results) + b'],' +
+                json.dumps({'total': len(self.items), 'limit': limit, 'page': page, 'sortDesc': False,
+                            'mediaType': 'book', 'minified': False, 'collapseseries': False,
+                            'include': ''}).encode()[1:])
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def multi_file_books(items):
+    # the check ConvertM4B.encode_books makes on every library item
+    return sum(1 for item in items
+               if not item.isMissing and not item.isInvalid and item.media.numAudioFiles > 1)
+
+
+def measure(walk):
+    # timed and traced in separate runs, tracing slows allocations down several times
+    start = time.perf_counter()
+    multi_file = walk()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    walk()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, multi_file
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    server_ms_per_item = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+    PagedItemsHandler.items = [json.dumps(item).encode() for item in make_library_items(num_items, 'lib_1')]
+    PagedItemsHandler.server_seconds_per_item = server_ms_per_item / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PagedItemsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = {}
+    try:
+        with AudiobookshelfAPI(url, 'token') as a:
+            results['get_all_library_items'] = measure(
+                lambda: multi_file_books(a.get_all_library_items('lib_1', lazy=True)))
+            for prefetch in (1, 2, 4, 8):
+                results[f'pages, prefetch {prefetch}'] = measure(
+                    lambda: sum(multi_file_books(page.results) for page in
+                                a.iter_library_item_pages('lib_1', page_size, prefetch, lazy=True)))
+    finally:
+        server.shutdown()
+    assert len({multi_file for _, _, multi_file in results.values()}) == 1, "pages differ from the whole listing"
+
+    print(f"{num_items} library items, {page_size} per page, {server_ms_per_item} ms of server work per item")
+    for name, (elapsed, peak, _) in results.items():
+        print(f"{name:22} {elapsed * 1000:8.1f} ms, peak {peak / 2 ** 20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Time of a script's repeated reads of read-mostly endpoints with and without a ResponseCache.
+
+Starts a local HTTP/1.1 stub server answering the libraries, library, collections and playlists endpoints and
+library updates, then replays the same mix of calls through a client with and without a cache. Every 50th call
+updates the library, which must invalidate the cached library and list of libraries: the names read after it
+are checked to be the updated ones.
+
+Run from the repository root:
+    python -m benchmarks.bench_response_cache [num_calls] [server_ms]
+"""
+import json
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from audiobookshelfapi.response_cache import ResponseCache
+from benchmarks.bench_connection_pool import LIBRARIES_BODY, StubHandler
+from benchmarks.fixtures import make_library_item_expanded
+
+LIBRARY = json.loads(LIBRARIES_BODY)['libraries'][0]
+
+
+def make_collection(index, items):
+    return {'id': f'col_{index}', 'libraryId': 'lib_1', 'userId': 'root', 'name': f'Collection {index}',
+            'description': None, 'books': items, 'lastUpdate': 0, 'createdAt': 0}
+
+
+class ReadMostlyHandler(StubHandler):
+    library = dict(LIBRARY)
+    collections_body = b''
+    server_seconds = 0.0
+
+    def reply(self, body):
+        time.sleep(self.server_seconds)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/api/libraries':
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.reply(json.dumps({'libraries': [self.library]}).encode())
+        elif self.path == '/api/libraries/lib_1':
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.reply(json.dumps(self.library).encode())
+        elif self.path == '/api/libraries/lib_1/collections':
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.reply(self.collections_body)
+        elif self.path == '/api/libraries/lib_1/playlists':
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.reply(b'{"results":[]}')
+        else:
+            super().do_GET()
+
+    def do_PATCH(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        ReadMostlyHandler.library = dict(self.library, **payload)
+        self.reply(json.dumps(self.library).encode())
+
+
+def replay(a, num_calls):
+    for call in range(num_calls):
+        if call % 50 == 49:
+            name = f'Audiobooks {call}'
+            a.update_library('lib_1', name=name)
+            assert a.get_library('lib_1').name == name, "the update did not invalidate the cached library"
+            assert a.get_all_libraries()[0].name == name, "the update did not invalidate the cached libraries"
+        elif call % 4 == 0:
+            a.get_all_libraries()
+        elif call % 4 == 1:
+            a.get_library('lib_1')
+        elif call % 4 == 2:
+            a.get_library_collections('lib_1')
+        else:
+            a.get_user_playlists('lib_1')
+
+
+def main():
+    num_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    ReadMostlyHandler.server_seconds = (float(sys.argv[2]) if len(sys.argv) > 2 else 2.0) / 1000
+    collections = [make_collection(i, [make_library_item_expanded(i * 10 + j) for j in range(10)])
+                   for i in range(5)]
+    ReadMostlyHandler.collections_body = json.dumps({'results': collections}).encode()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ReadMostlyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    cache = ResponseCache()
+    try:
+        with AudiobookshelfAPI(url, 'token') as a:
+            start = time.perf_counter()
+            replay(a, num_calls)
+            uncached = time.perf_counter() - start
+        with AudiobookshelfAPI(url, 'token', response_cache=cache) as a:
+            start = time.perf_counter()
+            replay(a, num_calls)
+            cached = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    print(f"{num_calls} calls, {ReadMostlyHandler.server_seconds * 1000:.1f} ms of server work per request")
+    print(f"Uncached: {uncached * 1000:8.1f} ms")
+    print(f"Cached:   {cached * 1000:8.1f} ms ({uncached / cached:.1f}x), {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
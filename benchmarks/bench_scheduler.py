@@ -0,0 +1,103 @@
+"""
+Nights and overrun of encoding a backlog of multitrack books with each EncodeScheduler policy, on a simulated
+clock.
+
+Every book's encode takes its duration divided by a speed that varies by up to a quarter around the one the
+scheduler estimates with. Encodes started late in the window run past its end, into the morning; the scheduler
+only starts books expected to finish in time. "no packing" is the scheduling ConvertM4B did before, shortest
+first into any free slot while the window is open.
+
+Run from the repository root:
+    python -m benchmarks.bench_scheduler [num_books] [slots] [encode_speed]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from Objects import LibraryItemMinified
+from audiobookshelfapi.scheduler import AuthorFairness, EncodeScheduler, LargestFirst, OldestFirst, PinnedFirst, \
+    ShortestFirst, book_author
+from benchmarks.fixtures import make_library_item_minified
+
+START_HOUR = 22
+END_HOUR = 6
+
+
+class SimulatedClock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def simulate(books, scheduler, clock, speeds):
+    """
+    Encodes every book and returns the nights it took, the hours encodes ran past the end of the window, and the
+    nights until the first book of every author was started.
+    """
+    waiting = {book.id: book for book in books}
+    running = {}
+    start = clock.now
+    overrun = 0.0
+    first_started = {}
+    while waiting or running:
+        picked = scheduler.pick(waiting.values(), len(running))
+        for book in picked:
+            del waiting[book.id]
+            finish = clock.now + timedelta(seconds=book.media.duration / speeds[book.id])
+            window_end = clock.now + timedelta(seconds=scheduler.window_remaining())
+            overrun += max(0.0, (finish - window_end).total_seconds()) / 3600
+            running[book.id] = finish
+            first_started.setdefault(book_author(book), clock.now)
+        if running:
+            # the next encode to finish
+            clock.now = running.pop(min(running, key=running.get))
+        else:
+            clock.now += timedelta(seconds=scheduler.seconds_until_next_window())
+    nights = (clock.now - start).total_seconds() / 86400
+    every_author = (max(first_started.values()) - start).total_seconds() / 86400
+    return nights, overrun, every_author
+
+
+def main():
+    num_books = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    slots = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    encode_speed = float(sys.argv[3]) if len(sys.argv) > 3 else 1.5
+    # 20 authors, with 15 books each by default
+    books = [LibraryItemMinified.from_dict(make_library_item_minified(i * 25, num_audio_files=2 + i % 10))
+             for i in range(num_books)]
+    rng = random.Random(0)
+    speeds = {book.id: encode_speed * rng.uniform(0.75, 1.25) for book in books}
+
+    def estimate(book):
+        return book.media.duration / encode_speed
+
+    schedulers = {
+        'no packing': lambda clock: EncodeScheduler(slots, ShortestFirst(), START_HOUR, END_HOUR, clock=clock),
+        'shortest': lambda clock: EncodeScheduler(slots, ShortestFirst(), START_HOUR, END_HOUR, estimate, clock),
+        'largest': lambda clock: EncodeScheduler(slots, LargestFirst(), START_HOUR, END_HOUR, estimate, clock),
+        'oldest': lambda clock: EncodeScheduler(slots, OldestFirst(), START_HOUR, END_HOUR, estimate, clock),
+        'author': lambda clock: EncodeScheduler(slots, AuthorFairness(), START_HOUR, END_HOUR, estimate, clock),
+        'pinned': lambda clock: EncodeScheduler(slots, PinnedFirst([books[-1].id, books[-2].id]), START_HOUR,
+                                                END_HOUR, estimate, clock),
+    }
+
+    print(f"{num_books} books, {slots} slots, {encode_speed:g}x realtime, window {START_HOUR}:00-{END_HOUR}:00")
+    for name, make in schedulers.items():
+        results = []
+        # twice from the same start, the simulation must be deterministic
+        for _ in range(2):
+            clock = SimulatedClock(datetime(2024, 1, 1, START_HOUR))
+            scheduler = make(clock)
+            results.append(simulate(books, scheduler, clock, speeds))
+            if name == 'pinned':
+                assert [book.id for book in scheduler.started[:2]] == [books[-1].id, books[-2].id]
+        assert results[0] == results[1], "the simulation is not deterministic"
+        nights, overrun, every_author = results[0]
+        print(f"{name:10} {nights:6.2f} nights, {overrun:7.2f} h past {END_HOUR}:00,"
+              f" every author started after {every_author:5.2f} nights")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Bytes transferred and time of one ConvertM4B poll when the multitrack books are filtered and sorted in Python,
+against filtering, sorting and minifying them on the server.
+
+Starts a local HTTP/1.1 stub server that answers /api/libraries/{id}/items with the tracks filter, the
+media.duration sort and minified, like Audiobookshelf does. Every response body is built up front, so only the
+transfer and the client's decoding are timed.
+
+Run from the repository root:
+    python -m benchmarks.bench_server_filter [num_items]
+"""
+import json
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from audiobookshelfenums import FilterGroup, SortField, TracksFilter
+from benchmarks.bench_connection_pool import StubHandler
+from benchmarks.fixtures import make_library_item, make_library_item_minified
+
+MULTITRACK_FILTER = FilterGroup.TRACKS.filter(TracksFilter.MULTI)
+
+
+class FilteringItemsHandler(StubHandler):
+    # response bodies keyed by (filter, sort, minified)
+    bodies = {}
+    bytes_sent = 0
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != '/api/libraries/lib_1/items':
+            super().do_GET()
+            return
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = self.bodies[(query.get('filter'), query.get('sort'), query.get('minified') == '1')]
+        FilteringItemsHandler.bytes_sent += len(body)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def build_bodies(num_items):
+    full = [make_library_item(i) for i in range(num_items)]
+    minified = [make_library_item_minified(i) for i in range(num_items)]
+    multitrack = sorted((item for item in minified if item['media']['numAudioFiles'] > 1),
+                        key=lambda item: item['media']['duration'])
+    return {
+        (None, None, False): json.dumps({'results': full, 'total': len(full)}).encode(),
+        (MULTITRACK_FILTER, SortField.DURATION.value, True):
+            json.dumps({'results': multitrack, 'total': len(multitrack)}).encode(),
+    }
+
+
+def poll_client_side(a):
+    # ConvertM4B.encode_books before the filter and sort were moved to the server
+    books = a.get_all_library_items('lib_1', lazy=True)
+    books = [book for book in books if book.media.numAudioFiles > 1]
+    books.sort(key=lambda book: book.media.duration)
+    return [book.id for book in books]
+
+
+def poll_server_side(a):
+    books = a.get_all_library_items('lib_1', lazy=True, sort=SortField.DURATION, filter=MULTITRACK_FILTER,
+                                    minified=True)
+    return [book.id for book in books]
+
+
+def measure(poll, a, repeat=5):
+    best = float('inf')
+    FilteringItemsHandler.bytes_sent = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ids = poll(a)
+        best = min(best, time.perf_counter() - start)
+    return best, FilteringItemsHandler.bytes_sent // repeat, ids
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    FilteringItemsHandler.bodies = build_bodies(num_items)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FilteringItemsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with AudiobookshelfAPI(url, 'token') as a:
+            client_side = measure(poll_client_side, a)
+            server_side = measure(poll_server_side, a)
+    finally:
+        server.shutdown()
+    assert client_side[2] == server_side[2], "server-side filtering selected different books"
+
+    print(f"{num_items} library items, {len(server_side[2])} multitrack books, best of 5 polls")
+    for name, (elapsed, sent, _) in (('filtered in Python', client_side), ('filtered on server', server_side)):
+        print(f"{name:19} {elapsed * 1000:8.1f} ms, {sent / 2 ** 20:7.2f} MiB per poll")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Latency from an encode finishing on the server to the client knowing about it, with socket events against polling.
+
+Starts the local FakeSocketServer, connects a SocketClient and times task_finished events from emit to handler.
+Polling every TIME_BETWEEN_CHECKS seconds notices a finished encode after half the interval on average. Also
+checks that a wrong token is refused, and that after the server restarts the client reconnects,
+authenticates again and receives events.
+
+Run from the repository root:
+    python -m benchmarks.bench_socket_events [num_events]
+"""
+import statistics
+import sys
+import threading
+import time
+
+from audiobookshelfapi import Config
+from audiobookshelfapi.socket_client import SocketClient
+from audiobookshelfenums import SocketEvent
+from benchmarks.fake_socket_server import FakeSocketServer
+
+
+def encode_finished(item_id):
+    return {'id': f'task_{item_id}', 'action': 'encode-m4b', 'data': {'libraryId': 'lib_1', 'libraryItemId': item_id},
+            'title': f'Encoding {item_id}', 'isFailed': False, 'isFinished': True}
+
+
+def time_events(server, socket, num_events):
+    received = threading.Event()
+    socket.on(SocketEvent.TASK_FINISHED, lambda task: received.set())
+    latencies = []
+    for i in range(num_events):
+        received.clear()
+        start = time.perf_counter()
+        server.emit(SocketEvent.TASK_FINISHED.value, encode_finished(f'li_{i}'))
+        assert received.wait(5), "an event was not delivered"
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def check_wrong_token(server):
+    socket = SocketClient(server.url, 'wrong token', reconnection=False)
+    try:
+        socket.connect(timeout=5)
+    except Exception:
+        return
+    finally:
+        socket.disconnect()
+    raise AssertionError("a wrong token was accepted")
+
+
+def check_reconnection(server, socket):
+    server.restart()
+    deadline = time.monotonic() + 30
+    while not socket.connected:
+        assert time.monotonic() < deadline, "the client did not reconnect"
+        time.sleep(0.05)
+    time_events(server, socket, 1)
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server = FakeSocketServer('token')
+    server.start()
+    try:
+        check_wrong_token(server)
+        with SocketClient(server.url, 'token') as socket:
+            socket.connect()
+            latencies = time_events(server, socket, num_events)
+            check_reconnection(server, socket)
+    finally:
+        server.stop()
+
+    latencies = sorted(latencies)
+    print(f"{num_events} task_finished events")
+    print(f"Socket events: median {statistics.median(latencies) * 1000:6.2f} ms,"
+          f" p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:6.2f} ms")
+    print(f"Polling every {Config.TIME_BETWEEN_CHECKS} s: mean {Config.TIME_BETWEEN_CHECKS / 2 * 1000:8.0f} ms,"
+          f" worst {Config.TIME_BETWEEN_CHECKS * 1000:8.0f} ms, plus a library listing per poll")
+
+
+if __name__ == "__main__":
+    main()
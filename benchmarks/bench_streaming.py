@@ -0,0 +1,81 @@
+"""
+Peak memory and time to the first item of iter_library_items, which decodes /libraries/{id}/items as it is
+downloaded, against get_all_library_items, which reads and decodes the whole response first.
+
+Starts a local HTTP/1.1 stub server that serves a synthetic library listing, then walks it the way
+ConvertM4B.encode_books does, counting the books with more than one audio file, and keeps nothing else.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming [num_items]
+"""
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import ThreadingHTTPServer
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from benchmarks.bench_connection_pool import StubHandler
+from benchmarks.fixtures import make_library_items
+
+
+class ItemsHandler(StubHandler):
+    items_body = b''
+
+    def do_GET(self):
+        if not self.path.startswith('/api/libraries/lib_1/items'):
+            super().do_GET()
+            return
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.items_body)))
+        self.end_headers()
+        self.wfile.write(self.items_body)
+
+
+def walk(items):
+    first = None
+    multi_file = 0
+    for item in items:
+        if first is None:
+            first = time.perf_counter()
+        if not item.isMissing and not item.isInvalid and item.media.numAudioFiles > 1:
+            multi_file += 1
+    return first, multi_file
+
+
+def measure(get_items):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first, multi_file = walk(get_items())
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first - start, total, peak, multi_file
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    ItemsHandler.items_body = json.dumps({'results': make_library_items(num_items, 'lib_1'), 'total': num_items,
+                                          'limit': 0, 'page': 0}).encode()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ItemsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with AudiobookshelfAPI(url, 'token') as a:
+            whole = measure(lambda: a.get_all_library_items('lib_1', lazy=True))
+            streamed = measure(lambda: a.iter_library_items('lib_1', lazy=True))
+    finally:
+        server.shutdown()
+    assert whole[3] == streamed[3], "streamed items differ from the whole response"
+
+    print(f"{num_items} library items, {len(ItemsHandler.items_body) / 2 ** 20:.1f} MiB response")
+    for name, (first, total, peak, _) in (('get_all_library_items', whole), ('iter_library_items', streamed)):
+        print(f"{name:22} first item {first * 1000:8.1f} ms, all items {total * 1000:8.1f} ms,"
+              f" peak {peak / 2 ** 20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Bytes transferred and time of keeping track of a library's multitrack books with LibrarySyncer, against listing
+them, filtered on the server, on every poll.
+
+Starts a local HTTP/1.1 stub server holding a mutable synthetic library. Its /api/libraries/{id}/items pages,
+sorts by updatedAt or addedAt and filters by the tracks filter like Audiobookshelf does. Between polls a few books
+are "encoded", which makes them single track and bumps their updatedAt, and the results of both pollers are
+checked against each other.
+
+Run from the repository root:
+    python -m benchmarks.bench_sync [num_items] [num_polls] [encoded_per_poll]
+"""
+import json
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from audiobookshelfapi.sync import LibrarySyncer
+from audiobookshelfenums import FilterGroup, TracksFilter
+from benchmarks.bench_connection_pool import StubHandler
+from benchmarks.fixtures import make_library_item_minified
+
+MULTITRACK_FILTER = FilterGroup.TRACKS.filter(TracksFilter.MULTI)
+
+
+class LibraryHandler(StubHandler):
+    # minified library items by ID
+    items = {}
+    lock = threading.Lock()
+    bytes_sent = 0
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != '/api/libraries/lib_1/items':
+            super().do_GET()
+            return
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with self.lock:
+            items = list(self.items.values())
+        if query.get('filter') == MULTITRACK_FILTER:
+            items = [item for item in items if item['media']['numAudioFiles'] > 1]
+        if 'sort' in query:
+            items.sort(key=lambda item: item[query['sort']], reverse=query.get('desc') == '1')
+        limit, page = int(query.get('limit', 0)), int(query.get('page', 0))
+        results = items[limit * page:limit * (page + 1)] if limit else items
+        body = json.dumps({'results': results, 'total': len(items), 'limit': limit, 'page': page}).encode()
+        with self.lock:
+            LibraryHandler.bytes_sent += len(body)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def encode(item_ids, now):
+    with LibraryHandler.lock:
+        for item_id in item_ids:
+            item = LibraryHandler.items[item_id]
+            item['media'].update(numAudioFiles=1, numTracks=1)
+            item['updatedAt'] = now
+
+
+def poll_full(a):
+    books = a.get_all_library_items('lib_1', filter=MULTITRACK_FILTER, minified=True)
+    return {book.id for book in books}
+
+
+def multitrack_ids(syncer):
+    return {item.id for item in syncer.items.values() if item.media.numAudioFiles > 1}
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    num_polls = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    encoded_per_poll = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    LibraryHandler.items = {item['id']: item for item in map(make_library_item_minified, range(num_items))}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), LibraryHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    full_time = sync_time = 0.0
+    full_bytes = sync_bytes = 0
+    now = 1700000000000
+    try:
+        with AudiobookshelfAPI(url, 'token') as a:
+            # unfiltered, so encoded books show up as updated rather than as missing from the listing
+            syncer = LibrarySyncer(a, 'lib_1', minified=True)
+            syncer.sync()
+            for poll in range(num_polls):
+                # half the polls see no change at all
+                if poll % 2:
+                    multitrack = sorted(multitrack_ids(syncer))[:encoded_per_poll]
+                    now += 1000
+                    encode(multitrack, now)
+
+                LibraryHandler.bytes_sent = 0
+                start = time.perf_counter()
+                expected = poll_full(a)
+                full_time += time.perf_counter() - start
+                full_bytes += LibraryHandler.bytes_sent
+
+                LibraryHandler.bytes_sent = 0
+                start = time.perf_counter()
+                syncer.sync()
+                sync_time += time.perf_counter() - start
+                sync_bytes += LibraryHandler.bytes_sent
+                assert multitrack_ids(syncer) == expected, "the synced snapshot differs from the full listing"
+    finally:
+        server.shutdown()
+
+    print(f"{num_items} library items, {len(expected)} multitrack books left, {num_polls} polls,"
+          f" {encoded_per_poll} books encoded every other poll")
+    for name, elapsed, sent in (('full listing', full_time, full_bytes), ('LibrarySyncer', sync_time, sync_bytes)):
+        print(f"{name:14} {elapsed / num_polls * 1000:8.1f} ms, {sent / num_polls / 2 ** 10:8.1f} KiB per poll")
+
+
+if __name__ == "__main__":
+    main()
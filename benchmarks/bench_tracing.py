@@ -0,0 +1,121 @@
+"""
+Cost and shape of the traces of AudiobookshelfAPI calls and ConvertM4B encode jobs.
+
+    - overhead: small requests per second without a tracer and with a FileTracer;
+    - client spans: that every request to the mock server is a child span of the method call that made it, in the
+      same trace, and that the file is valid OTLP JSON;
+    - encode jobs: a night of encodes on the simulator traced in virtual time, a span per job with the book's
+      duration and number of audio files, and what tracing adds to the simulation's run time.
+
+Run from the repository root:
+    python -m benchmarks.bench_tracing [num_requests] [num_books]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from audiobookshelfapi.tracing import FileTracer
+from benchmarks.encode_simulator import SimulationConfig, make_books, simulate
+from benchmarks.mock_server import MockServer
+
+
+def read_spans(path):
+    spans = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            for resource_spans in json.loads(line)['resourceSpans']:
+                for scope_spans in resource_spans['scopeSpans']:
+                    spans.extend(scope_spans['spans'])
+    return spans
+
+
+def attribute(span, key):
+    for attr in span['attributes']:
+        if attr['key'] == key:
+            value = next(iter(attr['value'].values()))
+            return int(value) if 'intValue' in attr['value'] else value
+    return None
+
+
+def requests_per_second(a, library_id, num_requests):
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        a.get_library(library_id)
+    return num_requests / (time.perf_counter() - start)
+
+
+def bench_overhead(directory, num_requests):
+    print("overhead, get_library")
+    with MockServer(items_per_library=10) as server:
+        library_id = server.library_ids[0]
+        for name in ('none', 'file'):
+            path = os.path.join(directory, 'overhead.jsonl')
+            tracer = FileTracer(path) if name == 'file' else None
+            with AudiobookshelfAPI(server.url, server.token, tracer=tracer) as a:
+                requests_per_second(a, library_id, num_requests // 10)  # warm up the connection
+                rate = requests_per_second(a, library_id, num_requests)
+            if tracer is not None:
+                tracer.close()
+            print(f"  {name:5} {rate:8.0f} req/s, {1e6 / rate:6.0f} us/req")
+
+
+def bench_client_spans(directory):
+    print("client spans")
+    path = os.path.join(directory, 'client.jsonl')
+    with MockServer(items_per_library=500) as server, FileTracer(path) as tracer:
+        with AudiobookshelfAPI(server.url, server.token, tracer=tracer) as a:
+            library_id = server.library_ids[0]
+            items = a.get_all_library_items(library_id, minified=True)
+            a.get_library_item(items[0].id, expanded=True)
+            a.get_library_collections(library_id)
+            a.post_encode_m4b(next(item.id for item in items if item.media.numAudioFiles > 1))
+    spans = read_spans(path)
+    by_id = {span['spanId']: span for span in spans}
+    requests = [span for span in spans if span['kind'] == 3]
+    for span in requests:
+        parent = by_id.get(span.get('parentSpanId'))
+        assert parent is not None and parent['kind'] == 1, f"request {span['name']} has no method span"
+        assert parent['traceId'] == span['traceId']
+        assert int(parent['startTimeUnixNano']) <= int(span['startTimeUnixNano'])
+    item = next(span for span in spans if span['name'] == 'AudiobookshelfAPI.get_library_item')
+    assert attribute(item, 'abs.item_id') == items[0].id
+    print(f"  {len(spans)} spans, {len(requests)} requests each under its method call:")
+    for name, count in sorted(Counter(span['name'] for span in spans).items()):
+        print(f"    {count:3} {name}")
+
+
+def bench_encode_jobs(directory, num_books):
+    print(f"encode jobs, {num_books} books on the simulator")
+    books = make_books(num_books)
+    config = SimulationConfig()
+    untraced = simulate(books, config)
+    path = os.path.join(directory, 'encodes.jsonl')
+    with FileTracer(path) as tracer:
+        traced = simulate(books, config, tracer=tracer)
+    assert traced.requests == untraced.requests, "tracing changed what the encode loop did"
+
+    jobs = [span for span in read_spans(path) if span['name'] == 'encode_m4b']
+    assert len(jobs) == num_books, f"{len(jobs)} encode spans for {num_books} books"
+    for span in jobs[:5]:
+        hours = (int(span['endTimeUnixNano']) - int(span['startTimeUnixNano'])) / 3.6e12
+        print(f"    {attribute(span, 'abs.title')[:30]:30} {attribute(span, 'abs.num_audio_files'):3} files,"
+              f" {attribute(span, 'abs.duration') / 3600:5.1f} h of audio encoded in {hours:4.2f} h"
+              f" with {attribute(span, 'abs.concurrent')} running")
+    print(f"  {len(jobs)} job spans, simulation {untraced.elapsed:.2f} s untraced, {traced.elapsed:.2f} s traced")
+
+
+def main():
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    num_books = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    with tempfile.TemporaryDirectory() as directory:
+        bench_overhead(directory, num_requests)
+        bench_client_spans(directory)
+        bench_encode_jobs(directory, num_books)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+A discrete-event simulator of ConvertM4B's encode loop, on a virtual clock.
+
+`simulate` runs the real `ConvertM4B.encode_books`, with its LibrarySyncer, scheduler and AdaptiveConcurrency,
+against `SimulatedAPI`, an in-process stand-in for an Audiobookshelf server holding a synthetic library. Time only
+passes when the loop sleeps or waits for an encode, and then jumps straight to when it would wake up, so nights
+of encoding run in seconds.
+
+The simulated server encodes like a machine with a number of cores: each encode runs at a fixed speed on one core,
+the cores are shared evenly between the encodes running, and every encode past the number of cores costs a share
+of the server's throughput to contention. An encoded book comes back from the listing with a single audio file
+and a newer updatedAt, like after the server's rescan.
+
+Example:
+    ```
+    result = simulate(make_books(200), SimulationConfig(slots=2, check_interval=60))
+    print(result.nights, result.utilization, result.requests)
+    ```
+"""
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import ConvertM4B
+import Objects
+from audiobookshelfapi.concurrency import AdaptiveConcurrency
+from audiobookshelfapi.scheduler import EncodeScheduler, POLICIES
+from audiobookshelfenums import SortField
+from benchmarks.fixtures import make_library_item_minified
+
+__all__ = ['VirtualClock', 'SimulatedAPI', 'SimulationConfig', 'SimulationResult', 'make_books', 'simulate']
+
+LIBRARY_ID = 'lib_sim'
+
+
+class VirtualClock:
+    """
+    The current time of a simulation, a datetime called like `datetime.now`. Only sleeping moves it.
+    """
+
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def time(self) -> float:
+        return self.now.timestamp()
+
+    def sleep(self, seconds: float):
+        self.now += timedelta(seconds=max(0.0, seconds))
+
+
+def _window_overlap(start: datetime, end: datetime, start_hour: int, end_hour: int) -> float:
+    # seconds of [start, end] inside the daily window, which spans midnight if end_hour is the earlier one
+    if start_hour == end_hour:
+        return max(0.0, (end - start).total_seconds())
+    overlap = 0.0
+    day = datetime(start.year, start.month, start.day) - timedelta(days=1)
+    while day < end:
+        window_start = day + timedelta(hours=start_hour)
+        window_end = day + timedelta(hours=end_hour, days=1 if end_hour < start_hour else 0)
+        overlap += max(0.0, (min(end, window_end) - max(start, window_start)).total_seconds())
+        day += timedelta(days=1)
+    return overlap
+
+
+def _field(item: dict, path: List[str]):
+    # the value of a sort field, such as media.duration, of a library item
+    for key in path:
+        item = item[key]
+    return item
+
+
+class SimulatedAPI:
+    """
+    The part of AudiobookshelfAPI encode_books uses, answered from a synthetic library that the simulated server
+    encodes in virtual time. Requests and the bytes of the JSON the server would have sent are counted by
+    endpoint.
+    """
+
+    def __init__(self, books: List[dict], clock: VirtualClock, cores: int = 4, speed: float = 20.0,
+                 contention: float = 0.85, start_hour: int = 0, end_hour: int = 0):
+        """
+        Args:
+            books (list of dict): Minified library items, as make_books returns them.
+            clock (VirtualClock): The clock of the simulation.
+            cores (int): The number of encodes the server runs at full speed.
+            speed (float): Seconds of audio one encode gets through per second on a core of its own.
+            contention (float): The share of throughput kept for every encode past the number of cores.
+            start_hour (int): The hour the encode window opens, to measure how much of it encodes use.
+            end_hour (int): The hour the encode window closes.
+        """
+        self.clock = clock
+        self.cores = cores
+        self.speed = speed
+        self.contention = contention
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.items: Dict[str, dict] = {book['id']: book for book in books}
+        self._sizes = {item_id: len(json.dumps(item)) for item_id, item in self.items.items()}
+        # library item ID: seconds of audio left to encode
+        self.running: Dict[str, float] = {}
+        # library item ID: (started, finished)
+        self.encodes: Dict[str, tuple] = {}
+        self.requests: Dict[str, int] = {}
+        self.bytes: Dict[str, int] = {}
+        self.busy_core_seconds = 0.0
+        self.outside_window_seconds = 0.0
+        self.tracer = None
+        self._time = clock.now
+
+    def _count(self, endpoint: str, size: int):
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        self.bytes[endpoint] = self.bytes.get(endpoint, 0) + size
+
+    def _throughput(self, running: int) -> float:
+        # seconds of audio encoded per second by all running encodes together
+        return self.speed * min(running, self.cores) * self.contention ** max(0, running - self.cores)
+
+    def next_finish(self) -> Optional[datetime]:
+        """
+        Returns when the next running encode finishes if nothing else starts, None if none is running.
+        """
+        self.advance()
+        if not self.running:
+            return None
+        rate = self._throughput(len(self.running)) / len(self.running)
+        return self._time + timedelta(seconds=min(self.running.values()) / rate)
+
+    def advance(self):
+        """
+        Runs the encodes up to the current time of the clock.
+        """
+        while self._time < self.clock.now:
+            if not self.running:
+                self._time = self.clock.now
+                break
+            rate = self._throughput(len(self.running)) / len(self.running)
+            first = min(self.running, key=self.running.get)
+            step = min(self.running[first] / rate, (self.clock.now - self._time).total_seconds())
+            end = self._time + timedelta(seconds=step)
+            inside = _window_overlap(self._time, end, self.start_hour, self.end_hour)
+            self.busy_core_seconds += min(len(self.running), self.cores) * inside
+            self.outside_window_seconds += max(0.0, step - inside)
+            for item_id in self.running:
+                self.running[item_id] -= rate * step
+            self._time = end
+            for item_id in [item_id for item_id, left in self.running.items() if left <= 1e-3]:
+                self._finish(item_id)
+
+    def _finish(self, item_id: str):
+        del self.running[item_id]
+        item = self.items[item_id]
+        item['media']['numAudioFiles'] = item['media']['numTracks'] = 1
+        item['updatedAt'] = int(self._time.timestamp() * 1000)
+        self._sizes[item_id] = len(json.dumps(item))
+        self.encodes[item_id] = (self.encodes[item_id][0], self._time)
+
+    def get_library_items_page(self, library_id, limit, page=0, sort=None, desc=False, filter=None,
+                               minified=False, lazy=False):
+        self.advance()
+        items = list(self.items.values())
+        if sort is not None:
+            path = (sort.value if isinstance(sort, SortField) else sort).split('.')
+            items.sort(key=lambda item: _field(item, path), reverse=desc)
+        results = items[limit * page:limit * (page + 1)] if limit else items
+        self._count('library items', 60 + sum(self._sizes[item['id']] for item in results))
+        library_items_page = Objects.LibraryItemsPage.from_dict({'total': len(items), 'limit': limit, 'page': page})
+        # decoded from copies, the server's items change when they are encoded
+        library_items_page.results = Objects.LibraryItemMinified.from_list(json.loads(json.dumps(results)),
+                                                                          lazy=lazy)
+        return library_items_page
+
+    def iter_library_item_pages(self, library_id, page_size=500, prefetch=4, sort=None, desc=False, filter=None,
+                                minified=False, lazy=False):
+        page = 0
+        while True:
+            library_items_page = self.get_library_items_page(library_id, page_size, page, sort, desc, filter,
+                                                             minified, lazy)
+            yield library_items_page
+            page += 1
+            if page * page_size >= library_items_page.total:
+                return
+
+    def post_encode_m4b(self, book_id: str):
+        self.advance()
+        self._count('encode', 20)
+        if book_id in self.running or self.items[book_id]['media']['numAudioFiles'] <= 1:
+            raise Exception(f"Request error: {book_id} is already encoding or encoded")
+        self.running[book_id] = self.items[book_id]['media']['duration']
+        self.encodes[book_id] = (self.clock.now, None)
+
+
+class SimulatedWatcher:
+    # EncodeWatcher on the virtual clock: polling waits check_interval, socket events wake the loop when an encode
+    # finishes, checking every socket_check_interval anyway
+    def __init__(self, api: SimulatedAPI, check_interval: float, socket_events: bool,
+                 socket_check_interval: float = 600):
+        self.api = api
+        self.check_interval = check_interval
+        self.socket_events = socket_events
+        self.socket_check_interval = socket_check_interval
+        self.finished = {}
+
+    def wait(self):
+        clock = self.api.clock
+        if not self.socket_events:
+            clock.sleep(self.check_interval)
+            return
+        next_finish = self.api.next_finish()
+        wake = clock.now + timedelta(seconds=self.socket_check_interval)
+        clock.now = min(wake, next_finish) if next_finish is not None else wake
+        self.api.advance()
+        for item_id, (_, finished) in self.api.encodes.items():
+            if finished is not None:
+                self.finished.setdefault(item_id, False)
+
+    def finished_encodes(self):
+        return dict(self.finished)
+
+
+class _VirtualTime:
+    # the functions of the time module encode_books calls
+    def __init__(self, clock: VirtualClock):
+        self.sleep = clock.sleep
+        self.time = clock.time
+
+
+def _virtual_datetime(clock: VirtualClock):
+    class VirtualDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock.now
+    return VirtualDatetime
+
+
+def make_books(count: int, seed: int = 0, min_hours: float = 1, max_hours: float = 30,
+               multitrack: float = 1.0) -> List[dict]:
+    """
+    Builds a synthetic library of minified books with random durations.
+
+    Args:
+        count (int): The number of books.
+        seed (int): The seed of the random durations, the same seed builds the same library.
+        min_hours (float): The shortest book.
+        max_hours (float): The longest book.
+        multitrack (float): The share of the books that are multitrack and so need encoding.
+
+    Returns:
+        list of dict: The minified library items.
+    """
+    rng = random.Random(seed)
+    books = []
+    for i in range(count):
+        num_audio_files = rng.randint(2, 40) if rng.random() < multitrack else 1
+        book = make_library_item_minified(i, LIBRARY_ID, num_audio_files)
+        book['media']['duration'] = rng.uniform(min_hours, max_hours) * 3600
+        books.append(book)
+    return books
+
+
+@dataclass
+class SimulationConfig:
+    """
+    The settings of ConvertM4B and of the simulated server a simulation runs with.
+
+    Attributes:
+        slots (int): The number of concurrent encodes, Number_of_books_to_encode.
+        min_slots (int or None): The lowest number of concurrent encodes, None for slots, which keeps it fixed.
+        max_slots (int or None): The highest number of concurrent encodes, None for slots.
+        check_interval (float): Seconds between checks on the encodes, TIME_BETWEEN_CHECKS.
+        socket_events (bool): Whether finished encodes are pushed over the socket, UseSocketEvents.
+        start_hour (int): The hour the window opens, StartTime.
+        end_hour (int): The hour the window closes, EndTime.
+        policy (str): The encode policy, EncodePolicy.
+        encode_speed (float): The encode speed the scheduler estimates with, EncodeSpeed.
+        cores (int): The number of encodes the simulated server runs at full speed.
+        server_speed (float): Seconds of audio one encode gets through per second on a core of its own.
+        start (datetime): When the simulation starts.
+    """
+    slots: int = 2
+    min_slots: Optional[int] = None
+    max_slots: Optional[int] = None
+    check_interval: float = 60
+    socket_events: bool = False
+    start_hour: int = 22
+    end_hour: int = 6
+    policy: str = 'shortest'
+    encode_speed: float = 40
+    cores: int = 4
+    server_speed: float = 20.0
+    start: datetime = field(default_factory=lambda: datetime(2024, 1, 1, 22))
+
+
+@dataclass
+class SimulationResult:
+    """
+    What a simulation measured.
+
+    Attributes:
+        nights (float): The days from the start until every book was encoded.
+        audio_hours (float): The hours of audio encoded.
+        throughput (float): Hours of audio encoded per hour of the window.
+        utilization (float): The share of the server's cores busy encoding during the window.
+        outside_window_hours (float): The hours encodes were running outside the window.
+        requests (dict): The number of requests by endpoint.
+        bytes (dict): The bytes of the responses by endpoint.
+        messages (int): The lines encode_books printed.
+        elapsed (float): The real seconds the simulation took.
+    """
+    nights: float
+    audio_hours: float
+    throughput: float
+    utilization: float
+    outside_window_hours: float
+    requests: Dict[str, int]
+    bytes: Dict[str, int]
+    messages: int
+    elapsed: float
+
+    @property
+    def polls(self) -> int:
+        return self.requests.get('library items', 0)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.bytes.values())
+
+
+class _QuietStatus(ConvertM4B.ServerStatus):
+    # counts the lines encode_books prints instead of printing them
+    def __init__(self):
+        super().__init__('sim')
+        self.messages = 0
+
+    def print(self, message):
+        self.messages += 1
+
+
+class _Library:
+    id = LIBRARY_ID
+    name = 'Simulated'
+
+
+def simulate(books: List[dict], config: SimulationConfig, tracer=None) -> SimulationResult:
+    """
+    Encodes a synthetic library with ConvertM4B.encode_books on a virtual clock.
+
+    Args:
+        books (list of dict): Minified library items, as make_books returns them. They are copied.
+        config (SimulationConfig): The settings of ConvertM4B and of the simulated server.
+        tracer (FileTracer or None): Traces the encode jobs, in virtual time, see tracing.
+
+    Returns:
+        SimulationResult: What the simulation measured.
+    """
+    started = time.perf_counter()
+    clock = VirtualClock(config.start)
+    a = SimulatedAPI(json.loads(json.dumps(books)), clock, config.cores, config.server_speed,
+                     start_hour=config.start_hour, end_hour=config.end_hour)
+    a.tracer = tracer
+    watcher = SimulatedWatcher(a, config.check_interval, config.socket_events)
+    concurrency = AdaptiveConcurrency(config.slots, config.min_slots or config.slots,
+                                      config.max_slots or config.slots)
+    scheduler = EncodeScheduler(config.slots, POLICIES[config.policy](), config.start_hour, config.end_hour,
+                                lambda book: book.media.duration / config.encode_speed, clock)
+    status = _QuietStatus()
+
+    # encode_books sleeps and reads the time through its module's time and datetime
+    real_time, real_datetime = ConvertM4B.time, ConvertM4B.datetime
+    ConvertM4B.time, ConvertM4B.datetime = _VirtualTime(clock), _virtual_datetime(clock)
+    try:
+        ConvertM4B.encode_books(a, _Library(), watcher=watcher, scheduler=scheduler, concurrency=concurrency,
+                                status=status)
+    finally:
+        ConvertM4B.time, ConvertM4B.datetime = real_time, real_datetime
+
+    window_seconds = _window_overlap(config.start, clock.now, config.start_hour, config.end_hour)
+    audio_hours = sum(a.items[item_id]['media']['duration'] for item_id in a.encodes) / 3600
+    return SimulationResult(
+        nights=(clock.now - config.start).total_seconds() / 86400,
+        audio_hours=audio_hours,
+        throughput=audio_hours / (window_seconds / 3600) if window_seconds else 0.0,
+        utilization=a.busy_core_seconds / (a.cores * window_seconds) if window_seconds else 0.0,
+        outside_window_hours=a.outside_window_seconds / 3600,
+        requests=dict(a.requests),
+        bytes=dict(a.bytes),
+        messages=status.messages,
+        elapsed=time.perf_counter() - started,
+    )
@@ -0,0 +1,103 @@
+"""
+A local stand-in for the socket.io endpoint of an Audiobookshelf server.
+
+Like the real server, it only pushes events to sockets that authenticated by emitting 'auth' with the API token,
+answering 'init' on success and 'auth_failed' otherwise. Events are pushed with `emit`. Runs python-socketio's
+asyncio server on aiohttp in a background thread.
+"""
+import asyncio
+import threading
+
+import socketio
+from aiohttp import web
+
+
+class FakeSocketServer:
+    """
+    Example:
+        ```
+        server = FakeSocketServer('token')
+        server.start()
+        server.emit('task_finished', {'action': 'encode-m4b', 'data': {'libraryItemId': 'li_1'}})
+        server.stop()
+        ```
+    """
+
+    def __init__(self, api_token: str = 'token'):
+        self.api_token = api_token
+        self.url = None
+        self.port = 0
+        self.authenticated = set()
+        self._server = None
+        self._loop = None
+        self._runner = None
+
+    async def _on_auth(self, sid, token):
+        if token == self.api_token:
+            self.authenticated.add(sid)
+            await self._server.emit('init', {'user': {'id': 'root'}}, to=sid)
+        else:
+            await self._server.emit('auth_failed', to=sid)
+
+    async def _on_disconnect(self, sid, *args):
+        self.authenticated.discard(sid)
+
+    @staticmethod
+    async def _ping(request):
+        return web.Response(text='{"success":true}')
+
+    async def _start(self):
+        self._server = socketio.AsyncServer(async_mode='aiohttp')
+        self._server.on('auth', self._on_auth)
+        self._server.on('disconnect', self._on_disconnect)
+        app = web.Application()
+        # enough of the REST API for AudiobookshelfAPI to connect
+        app.router.add_get('/ping', self._ping)
+        self._server.attach(app)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{self.port}'
+
+    def start(self):
+        """
+        Starts serving, on a free local port the first time, set in url.
+        """
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+
+    async def _stop(self):
+        await self._server.shutdown()
+        await self._runner.cleanup()
+        # the tasks of sockets closed without a goodbye, e.g. their ping loops
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.authenticated.clear()
+
+    def stop(self):
+        """
+        Closes every connection and stops serving.
+        """
+        asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def emit(self, event: str, data=None):
+        """
+        Pushes an event to every authenticated socket and returns once it is sent.
+        """
+        async def send():
+            for sid in list(self.authenticated):
+                await self._server.emit(event, data, to=sid)
+        asyncio.run_coroutine_threadsafe(send(), self._loop).result()
+
+    def restart(self):
+        """
+        Closes every connection and serves again on the same port, as a restarted server would.
+        """
+        self.stop()
+        self.start()
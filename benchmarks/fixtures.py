@@ -0,0 +1,260 @@
+"""
+Synthetic Audiobookshelf JSON payloads for the benchmarks.
+
+The dictionaries follow the shapes the server returns, so they can be fed to the Objects dataclasses or served
+by a stub server.
+"""
+import random
+
+TAG_NAMES = ['tagAlbum', 'tagArtist', 'tagGenre', 'tagTitle', 'tagSeries', 'tagSeriesPart', 'tagTrack', 'tagDisc',
+             'tagSubtitle', 'tagAlbumArtist', 'tagDate', 'tagComposer', 'tagPublisher', 'tagComment',
+             'tagDescription', 'tagEncoder', 'tagEncodedBy', 'tagIsbn', 'tagLanguage', 'tagASIN',
+             'tagOverdriveMediaMarker', 'tagOriginalYear', 'tagReleaseCountry', 'tagReleaseType',
+             'tagReleaseStatus', 'tagISRC', 'tagMusicBrainzTrackId', 'tagMusicBrainzAlbumId',
+             'tagMusicBrainzAlbumArtistId', 'tagMusicBrainzArtistId']
+
+
+def make_file_metadata(path, size, timestamp):
+    filename = path.rsplit('/', 1)[-1]
+    return {
+        'filename': filename,
+        'ext': '.' + filename.rsplit('.', 1)[-1],
+        'path': path,
+        'relPath': filename,
+        'size': size,
+        'mtimeMs': timestamp,
+        'ctimeMs': timestamp,
+        'birthtimeMs': 0,
+    }
+
+
+def make_audio_meta_tags(title, author):
+    tags = dict.fromkeys(TAG_NAMES)
+    tags.update({'tagAlbum': title, 'tagArtist': author, 'tagTitle': title, 'tagGenre': 'Audiobook'})
+    return tags
+
+
+def make_chapter(index, start, end):
+    return {'id': index, 'start': start, 'end': end, 'title': f'Chapter {index + 1}'}
+
+
+def make_audio_file(index, folder, title, author, duration, timestamp):
+    size = int(duration * 16000)
+    return {
+        'index': index + 1,
+        'ino': str(1000000 + index),
+        'metadata': make_file_metadata(f'{folder}/{index + 1:02d} - {title}.mp3', size, timestamp),
+        'addedAt': timestamp,
+        'updatedAt': timestamp,
+        'trackNumFromMeta': index + 1,
+        'discNumFromMeta': None,
+        'trackNumFromFilename': index + 1,
+        'discNumFromFilename': None,
+        'manuallyVerified': False,
+        'invalid': False,
+        'exclude': False,
+        'error': None,
+        'format': 'MP2/3 (MPEG audio layer 2/3)',
+        'duration': duration,
+        'bitRate': 128000,
+        'language': None,
+        'codec': 'mp3',
+        'timeBase': '1/14112000',
+        'channels': 2,
+        'channelLayout': 'stereo',
+        'chapters': [],
+        'embeddedCoverArt': None,
+        'metaTags': make_audio_meta_tags(title, author),
+        'mimeType': 'audio/mpeg',
+    }
+
+
+def make_book_metadata(index, title, author):
+    return {
+        'title': title,
+        'subtitle': None,
+        'authors': [{'id': f'aut_{index % 500}', 'name': author}],
+        'narrators': ['Narrator'],
+        'series': [{'id': f'ser_{index % 300}', 'name': f'Series {index % 300}', 'sequence': str(index % 7 + 1)}],
+        'genres': ['Fantasy'],
+        'publishedYear': '2001',
+        'publishedDate': None,
+        'publisher': 'Publisher',
+        'description': 'A synthetic book used for benchmarking.',
+        'isbn': None,
+        'asin': None,
+        'language': 'English',
+        'explicit': False,
+    }
+
+
+def make_book(index, folder, title, author, num_audio_files, timestamp):
+    file_duration = 1800.0 + index % 7 * 60
+    audio_files = [make_audio_file(i, folder, title, author, file_duration, timestamp)
+                   for i in range(num_audio_files)]
+    chapters = [make_chapter(i, i * file_duration, (i + 1) * file_duration) for i in range(num_audio_files)]
+    return {
+        'id': f'book_{index}',
+        'metadata': make_book_metadata(index, title, author),
+        'coverPath': f'{folder}/cover.jpg',
+        'tags': [],
+        'numAudioFiles': num_audio_files,
+        'audioFiles': audio_files,
+        'chapters': chapters,
+        'missingParts': [],
+        'ebookFile': None,
+        'duration': file_duration * num_audio_files,
+    }
+
+
+def make_library_item(index, library_id='lib_1', num_audio_files=None):
+    """
+    Builds a book library item as returned in the results of /api/libraries/{id}/items.
+
+    Args:
+        index (int): The position of the item, used to derive its ID and contents.
+        library_id (str): The ID of the library the item belongs to.
+        num_audio_files (int or None): The number of audio files of the book, derived from index if None.
+
+    Returns:
+        dict: The library item.
+    """
+    if num_audio_files is None:
+        num_audio_files = 1 if index % 3 else 1 + index % 11
+    title = f'Book {index}'
+    author = f'Author {index % 500}'
+    folder = f'/audiobooks/{author}/{title}'
+    timestamp = 1650000000000 + index * 1000
+    return {
+        'id': f'li_{index}',
+        'ino': str(649641337522215266 + index),
+        'libraryId': library_id,
+        'folderId': 'fol_1',
+        'path': folder,
+        'relPath': f'{author}/{title}',
+        'isFile': False,
+        'mtimeMs': timestamp,
+        'ctimeMs': timestamp,
+        'birthtimeMs': 0,
+        'addedAt': timestamp,
+        'updatedAt': timestamp,
+        'lastScan': timestamp,
+        'scanVersion': '2.2.0',
+        'isMissing': False,
+        'isInvalid': False,
+        'mediaType': 'book',
+        'media': make_book(index, folder, title, author, num_audio_files, timestamp),
+    }
+
+
+def make_audio_track(index, audio_file, start_offset):
+    return {
+        'index': index + 1,
+        'startOffset': start_offset,
+        'duration': audio_file['duration'],
+        'title': audio_file['metadata']['filename'],
+        'contentUrl': f"/s/item/{audio_file['ino']}/{audio_file['metadata']['filename']}",
+        'mimeType': audio_file['mimeType'],
+        'metadata': audio_file['metadata'],
+    }
+
+
+def make_library_file(audio_file):
+    return {
+        'ino': audio_file['ino'],
+        'metadata': audio_file['metadata'],
+        'addedAt': audio_file['addedAt'],
+        'updatedAt': audio_file['updatedAt'],
+        'fileType': 'audio',
+    }
+
+
+def make_library_item_expanded(index, library_id='lib_1', num_audio_files=None):
+    """
+    Builds a book library item as returned by /api/items/{id}?expanded=1.
+
+    Args:
+        index (int): The position of the item, used to derive its ID and contents.
+        library_id (str): The ID of the library the item belongs to.
+        num_audio_files (int or None): The number of audio files of the book, derived from index if None.
+
+    Returns:
+        dict: The expanded library item.
+    """
+    item = make_library_item(index, library_id, num_audio_files)
+    book = item['media']
+    audio_files = book['audioFiles']
+    metadata = book['metadata']
+    size = sum(audio_file['metadata']['size'] for audio_file in audio_files)
+    item['media'] = {
+        'libraryItemId': item['id'],
+        'metadata': dict(metadata,
+                         titleIgnorePrefix=metadata['title'],
+                         authorName=metadata['authors'][0]['name'],
+                         authorNameLF=metadata['authors'][0]['name'],
+                         narratorName=', '.join(metadata['narrators']),
+                         seriesName=metadata['series'][0]['name']),
+        'coverPath': book['coverPath'],
+        'tags': book['tags'],
+        'audioFiles': audio_files,
+        'chapters': book['chapters'],
+        'missingParts': book['missingParts'],
+        'ebookFile': book['ebookFile'],
+        'duration': book['duration'],
+        'size': size,
+        'tracks': [make_audio_track(i, audio_file, i * audio_file['duration'])
+                   for i, audio_file in enumerate(audio_files)],
+    }
+    item['libraryFiles'] = [make_library_file(audio_file) for audio_file in audio_files]
+    item['size'] = size
+    return item
+
+
+def make_library_item_minified(index, library_id='lib_1', num_audio_files=None):
+    """
+    Builds a book library item as returned in the results of /api/libraries/{id}/items?minified=1.
+
+    Args:
+        index (int): The position of the item, used to derive its ID and contents.
+        library_id (str): The ID of the library the item belongs to.
+        num_audio_files (int or None): The number of audio files of the book, derived from index if None.
+
+    Returns:
+        dict: The minified library item.
+    """
+    item = make_library_item(index, library_id, num_audio_files)
+    del item['lastScan'], item['scanVersion']
+    book = item['media']
+    metadata = book['metadata']
+    size = sum(audio_file['metadata']['size'] for audio_file in book['audioFiles'])
+    item['media'] = {
+        'metadata': {
+            'titleIgnorePrefix': metadata['title'],
+            'authorName': metadata['authors'][0]['name'],
+            'authorNameLF': metadata['authors'][0]['name'],
+            'narratorName': ', '.join(metadata['narrators']),
+            'seriesName': metadata['series'][0]['name'],
+            **{key: value for key, value in metadata.items() if key not in ('authors', 'narrators', 'series')},
+        },
+        'coverPath': book['coverPath'],
+        'numTracks': book['numAudioFiles'],
+        'numAudioFiles': book['numAudioFiles'],
+        'numChapters': len(book['chapters']),
+        'numMissingParts': 0,
+        'numInvalidAudioFiles': 0,
+        'duration': book['duration'],
+        'size': size,
+        'ebookFormat': None,
+    }
+    item['numFiles'] = book['numAudioFiles'] + 1
+    item['size'] = size
+    return item
+
+
+def make_library_items(count, library_id='lib_1', seed=0):
+    """
+    Builds count library items, shuffled deterministically by seed.
+    """
+    items = [make_library_item(i, library_id) for i in range(count)]
+    random.Random(seed).shuffle(items)
+    return items
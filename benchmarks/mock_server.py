@@ -0,0 +1,364 @@
+"""
+A local mock Audiobookshelf server, to measure AudiobookshelfAPI offline.
+
+`MockServer` generates libraries of synthetic books, with collections and playlists of them, and serves them over
+HTTP/1.1 keep-alive like Audiobookshelf does:
+
+    GET  /ping
+    GET  /api/libraries
+    GET  /api/libraries/{id}
+    GET  /api/libraries/{id}/items       limit, page, sort, desc, minified and the tracks filter
+    GET  /api/libraries/{id}/collections
+    GET  /api/libraries/{id}/playlists
+    GET  /api/items/{id}
+    POST /api/tools/item/{id}/encode-m4b
+    GET  /api/tasks
+
+Every response except /ping can be delayed by a latency with random jitter, and fail with a 500 at an error rate.
+Requests, errors and response bytes are counted by route. An encode makes the book single track after
+encode_seconds, and shows as a running task until then.
+
+Run from the repository root to serve until interrupted:
+    python -m benchmarks.mock_server [items_per_library] [port]
+
+Example:
+    ```
+    with MockServer(items_per_library=5000, latency=0.005, error_rate=0.01) as server:
+        with AudiobookshelfAPI(server.url, server.token) as a:
+            a.get_all_library_items(server.library_ids[0])
+        print(server.requests, server.bytes_sent)
+    ```
+"""
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from audiobookshelfenums import FilterGroup, TracksFilter
+from benchmarks.fixtures import make_library_item, make_library_item_minified
+
+__all__ = ['MockServer']
+
+_FILTERS = {
+    FilterGroup.TRACKS.filter(TracksFilter.MULTI): lambda item: item['media']['numAudioFiles'] > 1,
+    FilterGroup.TRACKS.filter(TracksFilter.SINGLE): lambda item: item['media']['numAudioFiles'] == 1,
+}
+
+_ROUTES = [
+    ('GET', re.compile(r'/ping'), 'ping'),
+    ('GET', re.compile(r'/api/libraries'), 'libraries'),
+    ('GET', re.compile(r'/api/libraries/(?P<library_id>[^/]+)'), 'library'),
+    ('GET', re.compile(r'/api/libraries/(?P<library_id>[^/]+)/items'), 'items'),
+    ('GET', re.compile(r'/api/libraries/(?P<library_id>[^/]+)/collections'), 'collections'),
+    ('GET', re.compile(r'/api/libraries/(?P<library_id>[^/]+)/playlists'), 'playlists'),
+    ('GET', re.compile(r'/api/items/(?P<item_id>[^/]+)'), 'item'),
+    ('POST', re.compile(r'/api/tools/item/(?P<item_id>[^/]+)/encode-m4b'), 'encode'),
+    ('GET', re.compile(r'/api/tasks'), 'tasks'),
+]
+
+
+def _field(item: dict, path: List[str]):
+    # the value of a sort field, such as media.duration, of a library item
+    for key in path:
+        item = item.get(key) if isinstance(item, dict) else None
+    return item
+
+
+class _Library:
+    # a generated library, its items as dictionaries and as the JSON of their full and minified forms
+    def __init__(self, index: int, num_items: int, num_collections: int, num_playlists: int, books_per_list: int):
+        self.id = f'lib_{index + 1}'
+        self.data = {'id': self.id, 'name': 'Audiobooks' if index == 0 else f'Audiobooks {index + 1}', 'folders': [],
+                     'displayOrder': index + 1, 'icon': 'database', 'mediaType': 'book', 'provider': 'google',
+                     'settings': {}, 'createdAt': 0, 'lastUpdate': 0}
+        offset = index * num_items
+        self.items: Dict[str, dict] = {}
+        self.minified: Dict[str, dict] = {}
+        self.bodies: Dict[str, bytes] = {}
+        self.minified_bodies: Dict[str, bytes] = {}
+        for i in range(offset, offset + num_items):
+            self.set_item(make_library_item(i, self.id), make_library_item_minified(i, self.id))
+        ids = list(self.items)
+        self.collections = [
+            {'id': f'col_{self.id}_{c}', 'libraryId': self.id, 'userId': 'root', 'name': f'Collection {c}',
+             'description': None, 'books': [self.items[item_id] for item_id in ids[c::max(1, num_collections)]
+                                             [:books_per_list]], 'lastUpdate': 0, 'createdAt': 0}
+            for c in range(num_collections)]
+        self.playlists = [
+            {'id': f'pl_{self.id}_{p}', 'libraryId': self.id, 'userId': 'root', 'name': f'Playlist {p}',
+             'description': None, 'coverPath': None, 'lastUpdate': 0, 'createdAt': 0,
+             'items': [{'libraryItemId': item_id, 'episodeId': None, 'libraryItem': self.items[item_id]}
+                       for item_id in ids[p::max(1, num_playlists)][:books_per_list]]}
+            for p in range(num_playlists)]
+
+    def set_item(self, item: dict, minified: dict):
+        self.items[item['id']] = item
+        self.minified[item['id']] = minified
+        self.bodies[item['id']] = json.dumps(item).encode()
+        self.minified_bodies[item['id']] = json.dumps(minified).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the server keeps connections alive between requests
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, without TCP_NODELAY keep-alive responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method: str):
+        mock: MockServer = self.server.mock
+        # the client sends a JSON body with its GETs, read it so the connection can be reused
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        for route_method, pattern, route in _ROUTES:
+            match = pattern.fullmatch(url.path)
+            if match and route_method == method:
+                break
+        else:
+            self._reply(404, b'Not Found', 'unknown')
+            return
+
+        if route != 'ping':
+            if self.headers.get('Authorization') != f'Bearer {mock.token}':
+                self._reply(401, b'Unauthorized', route)
+                return
+            delay, fail = mock._draw()
+            if delay:
+                time.sleep(delay)
+            if fail:
+                self._reply(500, b'{"error":"injected failure"}', route)
+                return
+        try:
+            body = getattr(mock, f'_{route}')(query, **match.groupdict())
+        except KeyError:
+            self._reply(404, b'Not Found', route)
+            return
+        except ValueError as e:
+            self._reply(400, str(e).encode(), route)
+            return
+        self._reply(200, body, route)
+
+    def _reply(self, status: int, body: bytes, route: str):
+        self.server.mock._count(route, status, len(body))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer:
+    """
+    A mock Audiobookshelf server on a local port, serving generated libraries from a background thread.
+
+    Attributes:
+        url (str): The URL of the server, once started.
+        library_ids (list of str): The IDs of the libraries, lib_1, lib_2 and so on.
+        requests (Counter): The requests answered, by route.
+        errors (Counter): The requests answered with an error status, by route.
+        bytes_sent (int): The bytes of the response bodies.
+        encoded (list of str): The IDs of the library items whose encode was requested, in order.
+    """
+
+    def __init__(self, num_libraries: int = 1, items_per_library: int = 1000, num_collections: int = 5,
+                 num_playlists: int = 5, books_per_list: int = 10, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, encode_seconds: float = 0.0, token: str = 'token', port: int = 0,
+                 seed: int = 0):
+        """
+        Args:
+            num_libraries (int): The number of libraries.
+            items_per_library (int): The number of books in each library, a third of them multitrack.
+            num_collections (int): The number of collections in each library.
+            num_playlists (int): The number of playlists in each library.
+            books_per_list (int): The number of books in each collection and playlist.
+            latency (float): Seconds every response but /ping is delayed by.
+            jitter (float): The most seconds added to latency at random.
+            error_rate (float): The share of requests but /ping answered with a 500 error.
+            encode_seconds (float): Seconds an encode takes before its book becomes single track.
+            token (str): The API token requests must carry.
+            port (int): The port to listen on, 0 for any free one.
+            seed (int): The seed of the jitter and the errors, the same seed fails the same requests.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.encode_seconds = encode_seconds
+        self.token = token
+        self.port = port
+        self.libraries = {library.id: library for library in
+                          (_Library(i, items_per_library, num_collections, num_playlists, books_per_list)
+                           for i in range(num_libraries))}
+        self.library_ids = list(self.libraries)
+        self.requests = Counter()
+        self.errors = Counter()
+        self.bytes_sent = 0
+        self.encoded: List[str] = []
+        # library item ID: (monotonic time the encode was requested, task ID)
+        self._encodes: Dict[str, tuple] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.url: Optional[str] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        """
+        Starts serving on a background thread.
+        """
+        self._server = ThreadingHTTPServer(('127.0.0.1', self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self.port = self._server.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        """
+        Stops serving and closes the listening socket.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def reset_stats(self):
+        """
+        Zeroes the counts of requests, errors and bytes.
+        """
+        with self._lock:
+            self.requests.clear()
+            self.errors.clear()
+            self.bytes_sent = 0
+
+    def _count(self, route: str, status: int, size: int):
+        with self._lock:
+            self.requests[route] += 1
+            if status >= 400:
+                self.errors[route] += 1
+            self.bytes_sent += size
+
+    def _draw(self):
+        with self._lock:
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            return delay, self._rng.random() < self.error_rate
+
+    def _library_of(self, item_id: str) -> _Library:
+        for library in self.libraries.values():
+            if item_id in library.items:
+                return library
+        raise KeyError(item_id)
+
+    def _finish_encodes(self):
+        # the encodes that took encode_seconds are done, their books single track and updated
+        now = time.monotonic()
+        with self._lock:
+            done = [item_id for item_id, (started, _) in self._encodes.items()
+                    if now - started >= self.encode_seconds]
+            for item_id in done:
+                del self._encodes[item_id]
+                library = self._library_of(item_id)
+                item, minified = library.items[item_id], library.minified[item_id]
+                updated_at = int(time.time() * 1000)
+                for data in (item, minified):
+                    data['updatedAt'] = updated_at
+                    data['media']['numAudioFiles'] = 1
+                minified['media']['numTracks'] = 1
+                library.set_item(item, minified)
+
+    def _ping(self, query):
+        return b'{"success":true}'
+
+    def _libraries(self, query):
+        return json.dumps({'libraries': [library.data for library in self.libraries.values()]}).encode()
+
+    def _library(self, query, library_id):
+        return json.dumps(self.libraries[library_id].data).encode()
+
+    def _items(self, query, library_id):
+        self._finish_encodes()
+        library = self.libraries[library_id]
+        minified = query.get('minified') == '1'
+        items = list(library.minified.values() if minified else library.items.values())
+        if 'filter' in query:
+            if query['filter'] not in _FILTERS:
+                raise ValueError(f"Unsupported filter {query['filter']}")
+            items = [item for item in items if _FILTERS[query['filter']](item)]
+        if 'sort' in query:
+            path = query['sort'].split('.')
+            items.sort(key=lambda item: (_field(item, path) is None, _field(item, path) or 0),
+                       reverse=query.get('desc') == '1')
+        limit, page = int(query.get('limit', 0)), int(query.get('page', 0))
+        results = items[limit * page:limit * (page + 1)] if limit else items
+        bodies = library.minified_bodies if minified else library.bodies
+        head = json.dumps({'total': len(items), 'limit': limit, 'page': page, 'sortBy': query.get('sort'),
+                           'sortDesc': query.get('desc') == '1', 'filterBy': query.get('filter'),
+                           'mediaType': 'book', 'minified': minified, 'collapseseries': False, 'include': ''})
+        return (head[:-1] + ', "results": [').encode() + b','.join(bodies[item['id']] for item in results) + b']}'
+
+    def _collections(self, query, library_id):
+        return json.dumps({'results': self.libraries[library_id].collections}).encode()
+
+    def _playlists(self, query, library_id):
+        return json.dumps({'results': self.libraries[library_id].playlists}).encode()
+
+    def _item(self, query, item_id):
+        self._finish_encodes()
+        return self._library_of(item_id).bodies[item_id]
+
+    def _encode(self, query, item_id):
+        library = self._library_of(item_id)
+        with self._lock:
+            if item_id in self._encodes or library.items[item_id]['media']['numAudioFiles'] <= 1:
+                raise ValueError(f"Library item {item_id} is already encoding or single track")
+            self._encodes[item_id] = (time.monotonic(), f'task_{len(self.encoded)}')
+            self.encoded.append(item_id)
+        self._finish_encodes()
+        return b'OK'
+
+    def _tasks(self, query):
+        self._finish_encodes()
+        with self._lock:
+            tasks = [{'id': task_id, 'action': 'encode-m4b', 'data': {'libraryItemId': item_id},
+                      'title': 'Encoding M4b', 'isFailed': False, 'isFinished': False}
+                     for item_id, (_, task_id) in self._encodes.items()]
+        return json.dumps({'tasks': tasks}).encode()
+
+
+def main():
+    items_per_library = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 13378
+    server = MockServer(items_per_library=items_per_library, port=port)
+    server.start()
+    print(f"Serving {items_per_library} books at {server.url}, API token {server.token}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import unittest
+
+import requests
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from benchmarks.mock_server import MockServer
+
+
+def make_response(body):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    return response
+
+
+class LibraryItemsPageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer(items_per_library=10)
+        self.server.start()
+        self.api = AudiobookshelfAPI(self.server.url, self.server.token)
+
+    def tearDown(self):
+        self.api.close()
+        self.server.stop()
+
+    def test_page_without_results_is_empty(self):
+        self.api._send_get_request = lambda url, params=None, headers=None: make_response(
+            b'{"total": 0, "limit": 10, "page": 3, "mediaType": "book"}')
+        for lazy in (False, True):
+            page = self.api.get_library_items_page('lib_1', limit=10, page=3, lazy=lazy)
+            self.assertEqual(page.results, [])
+            self.assertEqual(page.page, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from audiobookshelfapi.concurrency import AdaptiveConcurrency
+
+
+class AdaptiveConcurrencyTest(unittest.TestCase):
+
+    def test_throughput_counts_the_encodes_running(self):
+        concurrency = AdaptiveConcurrency(initial=4, max_slots=8, sample_size=2)
+        # 4 slots, but only 2 books to encode, running together
+        concurrency.started('li_1')
+        concurrency.started('li_2')
+        concurrency.finished('li_1', 3600, 600)
+        decision = concurrency.finished('li_2', 3600, 600)
+        self.assertEqual(decision.slots, 4)
+        self.assertEqual(decision.throughput, 6 * 2)
+
+    def test_throughput_counts_the_encodes_each_ran_alongside(self):
+        concurrency = AdaptiveConcurrency(initial=2, sample_size=2)
+        concurrency.started('li_1')
+        concurrency.finished('li_1', 3600, 600)
+        concurrency.started('li_2')
+        decision = concurrency.finished('li_2', 3600, 600)
+        self.assertEqual(decision.throughput, 6)
+
+    def test_failed_encodes_are_not_running(self):
+        concurrency = AdaptiveConcurrency(initial=2, sample_size=2)
+        concurrency.started('li_1')
+        concurrency.failed('li_1')
+        concurrency.started('li_2')
+        concurrency.started('li_3')
+        concurrency.finished('li_2', 3600, 600)
+        decision = concurrency.finished('li_3', 3600, 600)
+        self.assertEqual(decision.throughput, 6 * 2)
+
+    def test_encodes_of_an_earlier_number_are_not_measured(self):
+        concurrency = AdaptiveConcurrency(initial=1, sample_size=1)
+        concurrency.started('li_1')
+        concurrency.started('li_2')
+        self.assertEqual(concurrency.finished('li_1', 3600, 600).new_slots, 2)
+        self.assertIsNone(concurrency.finished('li_2', 3600, 600))
+
+
+if __name__ == '__main__':
+    unittest.main()
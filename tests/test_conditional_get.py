@@ -0,0 +1,51 @@
+import json
+import unittest
+
+import requests
+
+from audiobookshelfapi.conditional_get import ConditionalCache
+
+
+def make_response(status, body=b'', etag=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    if etag is not None:
+        response.headers['ETag'] = etag
+    return response
+
+
+class ConditionalCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ConditionalCache()
+        self.refetched = 0
+
+    def decode(self, response):
+        return json.loads(response.content)
+
+    def refetch(self):
+        self.refetched += 1
+        return make_response(200, b'{"id": "lib_1"}', etag='"v2"')
+
+    def test_not_modified_answers_from_the_cache(self):
+        self.cache.resolve('key', make_response(200, b'{"id": "lib_1"}', etag='"v1"'), self.decode, self.refetch)
+        self.assertEqual(self.cache.request_headers('key'), {'If-None-Match': '"v1"'})
+        value = self.cache.resolve('key', make_response(304), self.decode, self.refetch)
+        self.assertEqual(value, {'id': 'lib_1'})
+        self.assertEqual(self.cache.stats.not_modified, 1)
+        self.assertEqual(self.refetched, 0)
+
+    def test_not_modified_after_eviction_refetches(self):
+        self.cache.resolve('key', make_response(200, b'{"id": "lib_1"}', etag='"v1"'), self.decode, self.refetch)
+        self.cache.request_headers('key')
+        # another thread evicts the entry between sending the validators and resolving the answer
+        self.cache.clear()
+        value = self.cache.resolve('key', make_response(304), self.decode, self.refetch)
+        self.assertEqual(value, {'id': 'lib_1'})
+        self.assertEqual(self.refetched, 1)
+        self.assertEqual(self.cache.request_headers('key'), {'If-None-Match': '"v2"'})
+
+
+if __name__ == '__main__':
+    unittest.main()
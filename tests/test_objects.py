@@ -0,0 +1,70 @@
+import pickle
+import unittest
+
+import Objects
+import SlottedObjects
+from Objects import Book, BookExpanded, FileMetadata, LibraryFile, LibraryItem, LibraryItemExpanded
+from benchmarks.fixtures import make_library_item_expanded, make_library_items
+
+
+class DecodeTest(unittest.TestCase):
+
+    def test_expanded_library_item_round_trips(self):
+        data = make_library_item_expanded(0, num_audio_files=3)
+        item = LibraryItemExpanded.from_dict(data)
+        self.assertIsInstance(item.media, BookExpanded)
+        self.assertIsInstance(item.media.tracks[0].metadata, FileMetadata)
+        self.assertIsInstance(item.libraryFiles[0], LibraryFile)
+        self.assertEqual(item.to_dict(), data)
+
+    def test_nested_fields_decode_up_front(self):
+        data = make_library_items(1)[0]
+        item = LibraryItem.from_dict(data)
+        self.assertIsInstance(item.__dict__['media'], Book)
+        self.assertIsInstance(item.__dict__['media'].__dict__['metadata'], Objects.BookMetadata)
+        self.assertIs(type(data['media']), dict)
+
+    def test_from_list_matches_from_dict(self):
+        data = make_library_items(5)
+        self.assertEqual(LibraryItem.from_list(data), [LibraryItem.from_dict(item) for item in data])
+
+    def test_slotted_classes_decode_up_front(self):
+        data = make_library_item_expanded(0, num_audio_files=3)
+        item = SlottedObjects.LibraryItemExpanded.from_dict(data)
+        self.assertIsInstance(item.media, SlottedObjects.BookExpanded)
+        self.assertEqual(item.to_dict(), data)
+
+    def test_missing_fields_are_none(self):
+        item = Objects.SeriesSequence.from_dict({'id': 'ser_1', 'name': 'Series'})
+        self.assertIsNone(item.sequence)
+
+
+class LazyDecodeTest(unittest.TestCase):
+
+    def test_lazy_fields_decode_on_first_read(self):
+        data = make_library_item_expanded(0, num_audio_files=3)
+        item = LibraryItemExpanded.from_dict(data, lazy=True)
+        self.assertNotIn('media', item.__dict__)
+        self.assertEqual(item.media.tracks[0].metadata.filename, data['media']['tracks'][0]['metadata']['filename'])
+        self.assertIn('media', item.__dict__)
+
+    def test_lazy_equals_eager(self):
+        data = make_library_item_expanded(0, num_audio_files=3)
+        lazy = LibraryItemExpanded.from_dict(data, lazy=True)
+        eager = LibraryItemExpanded.from_dict(data)
+        self.assertEqual(lazy, eager)
+        self.assertEqual(eager, lazy)
+        self.assertNotEqual(lazy, LibraryItemExpanded.from_dict(make_library_item_expanded(1, num_audio_files=3),
+                                                                lazy=True))
+
+    def test_lazy_instances_pickle(self):
+        data = make_library_items(3)
+        items = LibraryItem.from_list(data, lazy=True)
+        items[0].media.metadata.title
+        restored = pickle.loads(pickle.dumps(items))
+        self.assertIs(type(restored[0]), Objects.LazyLibraryItem)
+        self.assertEqual(restored, LibraryItem.from_list(data))
+
+
+if __name__ == '__main__':
+    unittest.main()
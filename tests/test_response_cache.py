@@ -0,0 +1,86 @@
+import threading
+import unittest
+
+from audiobookshelfapi.response_cache import ResponseCache
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_hit_after_miss(self):
+        cache = ResponseCache(ttls={'library': 30})
+        self.assertEqual(cache.get_or_fetch('library', 'lib_1', lambda: 'v1'), 'v1')
+        self.assertEqual(cache.get_or_fetch('library', 'lib_1', lambda: 'v2'), 'v1')
+        self.assertEqual(cache.stats().hits, 1)
+
+    def test_invalidation_during_fetch_is_not_lost(self):
+        cache = ResponseCache(ttls={'library': 30})
+
+        def fetch():
+            # a write lands while the stale response is on its way
+            cache.invalidate('library', 'lib_1')
+            return 'stale'
+
+        self.assertEqual(cache.get_or_fetch('library', 'lib_1', fetch), 'stale')
+        self.assertEqual(cache.get_or_fetch('library', 'lib_1', lambda: 'fresh'), 'fresh')
+
+    def test_endpoint_invalidation_and_clear_during_fetch(self):
+        cache = ResponseCache(ttls={'library': 30})
+        for invalidate in (lambda: cache.invalidate('library'), cache.clear):
+            def fetch():
+                invalidate()
+                return 'stale'
+
+            cache.get_or_fetch('library', 'lib_1', fetch)
+            self.assertEqual(cache.get_or_fetch('library', 'lib_1', lambda: 'fresh'), 'fresh')
+            cache.clear()
+
+    def test_invalidation_of_another_key_keeps_the_response(self):
+        cache = ResponseCache(ttls={'library': 30})
+
+        def fetch():
+            cache.invalidate('library', 'lib_2')
+            return 'v1'
+
+        cache.get_or_fetch('library', 'lib_1', fetch)
+        self.assertEqual(cache.get_or_fetch('library', 'lib_1', lambda: 'v2'), 'v1')
+
+    def test_invalidation_from_another_thread_during_fetch(self):
+        cache = ResponseCache(ttls={'library': 30})
+        fetching, invalidated = threading.Event(), threading.Event()
+
+        def fetch():
+            fetching.set()
+            invalidated.wait(5)
+            return 'stale'
+
+        def write():
+            fetching.wait(5)
+            cache.invalidate('library', 'lib_1')
+            invalidated.set()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        cache.get_or_fetch('library', 'lib_1', fetch)
+        writer.join()
+        self.assertEqual(cache.get_or_fetch('library', 'lib_1', lambda: 'fresh'), 'fresh')
+
+    def test_refresh_replaces_the_cached_response(self):
+        cache = ResponseCache(ttls={'libraries': 30})
+        cache.get_or_fetch('libraries', None, lambda: 'v1')
+        self.assertEqual(cache.refresh('libraries', None, lambda: 'v2'), 'v2')
+        self.assertEqual(cache.get_or_fetch('libraries', None, lambda: 'v3'), 'v2')
+
+    def test_refresh_across_an_invalidation_is_not_cached(self):
+        cache = ResponseCache(ttls={'libraries': 30})
+
+        def fetch():
+            # create_library lands while the refresh is on its way
+            cache.invalidate('libraries')
+            return 'stale'
+
+        self.assertEqual(cache.refresh('libraries', None, fetch), 'stale')
+        self.assertEqual(cache.get_or_fetch('libraries', None, lambda: 'fresh'), 'fresh')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import threading
+import time
+import unittest
+
+try:
+    import aiohttp
+    import socketio
+except ImportError:
+    aiohttp = socketio = None
+
+from audiobookshelfenums import SocketEvent
+
+
+def encode_finished(item_id, failed=False):
+    return {'id': f'task_{item_id}', 'action': 'encode-m4b', 'data': {'libraryId': 'lib_1', 'libraryItemId': item_id},
+            'title': f'Encoding {item_id}', 'isFailed': failed, 'isFinished': True}
+
+
+@unittest.skipIf(socketio is None or aiohttp is None, "requires python-socketio[client] and aiohttp")
+class SocketEventsTest(unittest.TestCase):
+
+    def setUp(self):
+        from benchmarks.fake_socket_server import FakeSocketServer
+        self.server = FakeSocketServer('token')
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_task_finished_reaches_the_handler(self):
+        from audiobookshelfapi.socket_client import SocketClient
+        received = []
+        delivered = threading.Event()
+        with SocketClient(self.server.url, 'token') as socket:
+            socket.on(SocketEvent.TASK_FINISHED, lambda task: (received.append(task), delivered.set()))
+            socket.connect(timeout=5)
+            self.server.emit(SocketEvent.TASK_FINISHED.value, encode_finished('li_1'))
+            self.assertTrue(delivered.wait(5))
+        self.assertEqual(received, [encode_finished('li_1')])
+
+    def test_wrong_token_is_refused(self):
+        from audiobookshelfapi.socket_client import SocketClient
+        socket = SocketClient(self.server.url, 'wrong token', reconnection=False)
+        try:
+            with self.assertRaises(Exception):
+                socket.connect(timeout=5)
+        finally:
+            socket.disconnect()
+
+    def test_encode_watcher_collects_finished_encodes(self):
+        from ConvertM4B import EncodeWatcher
+        from audiobookshelfapi.api import AudiobookshelfAPI
+        with AudiobookshelfAPI(self.server.url, 'token') as a:
+            watcher = EncodeWatcher()
+            watcher.connect(a)
+            self.assertIsNotNone(watcher.events)
+            self.server.emit(SocketEvent.TASK_FINISHED.value, encode_finished('li_1'))
+            self.server.emit(SocketEvent.TASK_FINISHED.value, encode_finished('li_2', failed=True))
+            self.server.emit(SocketEvent.TASK_FINISHED.value, {'action': 'scan', 'data': {'libraryItemId': 'li_3'}})
+            deadline = time.monotonic() + 5
+            while len(watcher.finished_encodes()) < 2 and time.monotonic() < deadline:
+                watcher.wake.wait(0.1)
+            self.assertEqual(watcher.finished_encodes(), {'li_1': False, 'li_2': True})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import gc
+import json
+import os
+import tempfile
+import unittest
+import weakref
+
+from audiobookshelfapi.api import AudiobookshelfAPI
+from audiobookshelfapi.tracing import FileTracer
+from benchmarks.mock_server import MockServer
+
+
+def read_spans(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line)['resourceSpans'][0]['scopeSpans'][0]['spans'][0] for line in f]
+
+
+class TracingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer(items_per_library=250)
+        self.server.start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'traces.jsonl')
+        self.tracer = FileTracer(self.path)
+
+    def tearDown(self):
+        self.tracer.close()
+        self.server.stop()
+        self.directory.cleanup()
+
+    def test_traced_client_is_freed_without_the_cycle_collector(self):
+        a = AudiobookshelfAPI(self.server.url, self.server.token, tracer=self.tracer)
+        a.get_library(self.server.library_ids[0])
+        a.close()
+        client = weakref.ref(a)
+        gc.disable()
+        try:
+            del a
+            self.assertIsNone(client())
+        finally:
+            gc.enable()
+
+    def test_untraced_client_is_not_wrapped(self):
+        with AudiobookshelfAPI(self.server.url, self.server.token) as a:
+            self.assertIs(type(a), AudiobookshelfAPI)
+
+    def test_prefetched_pages_are_children_of_the_iteration(self):
+        with AudiobookshelfAPI(self.server.url, self.server.token, tracer=self.tracer) as a:
+            pages = list(a.iter_library_item_pages(self.server.library_ids[0], page_size=50, prefetch=2))
+        self.tracer.close()
+        self.assertEqual(len(pages), 5)
+        spans = read_spans(self.path)
+        iteration = next(span for span in spans if span['name'] == 'AudiobookshelfAPI.iter_library_item_pages')
+        page_spans = [span for span in spans if span['name'] == 'AudiobookshelfAPI.get_library_items_page']
+        self.assertEqual(len(page_spans), 5)
+        for span in page_spans:
+            self.assertEqual(span.get('parentSpanId'), iteration['spanId'])
+            self.assertEqual(span['traceId'], iteration['traceId'])
+
+    def test_stopping_iteration_early_is_not_an_error(self):
+        with AudiobookshelfAPI(self.server.url, self.server.token, tracer=self.tracer) as a:
+            for _ in a.iter_library_item_pages(self.server.library_ids[0], page_size=50):
+                break
+        self.tracer.close()
+        iteration = next(span for span in read_spans(self.path)
+                         if span['name'] == 'AudiobookshelfAPI.iter_library_item_pages')
+        self.assertNotIn('status', iteration)
+
+
+if __name__ == '__main__':
+    unittest.main()